@@ -0,0 +1,106 @@
+"""Import-time regression guard for the CLI and the pytest plugin.
+
+The pytest plugin is registered as a ``pytest11`` entry point, so it is imported by every
+pytest run in any environment where API Ninja is installed. This script imports each
+entry module in a fresh interpreter with ``python -X importtime`` and fails when the
+cumulative import time exceeds its budget or when one of the heavy LLM dependencies is
+pulled in at import time.
+
+Usage::
+
+    uv run python benchmarks/import_time.py
+    uv run python benchmarks/import_time.py --runs 10 --budget api_ninja.plugin=80
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_BUDGETS_MS = {
+    "api_ninja.plugin": 25.0,
+    "api_ninja.cli": 250.0,
+}
+
+# Modules that are already loaded whenever the entry module is, and so are not charged to it.
+PRELOADED = {
+    "api_ninja.plugin": "pytest",
+}
+
+# Modules that must only be imported once an agent actually runs.
+FORBIDDEN = ("agents", "openai")
+
+
+def measure(module: str) -> tuple[float, set[str]]:
+    """Return the cumulative import time of ``module`` in ms and the modules it loaded."""
+    preload = f"import {PRELOADED[module]}; " if module in PRELOADED else ""
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{preload}import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+
+    cumulative_us = None
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        loaded.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    if cumulative_us is None:
+        raise RuntimeError(f"No import time reported for {module}")
+    return cumulative_us / 1000, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="MODULE=MS",
+        help="Override the budget for a module (repeatable)",
+    )
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for item in args.budget:
+        module, _, ms = item.partition("=")
+        budgets[module] = float(ms)
+
+    failed = False
+    for module, budget in budgets.items():
+        timings = []
+        loaded = set()
+        for _ in range(args.runs):
+            elapsed, loaded = measure(module)
+            timings.append(elapsed)
+        median = statistics.median(timings)
+        heavy = sorted(
+            name for name in loaded if name.split(".")[0] in FORBIDDEN and "." not in name
+        )
+        status = "ok"
+        if median > budget:
+            status = "OVER BUDGET"
+            failed = True
+        if heavy:
+            status = f"imports {', '.join(heavy)}"
+            failed = True
+        print(f"{module:<20} median {median:8.1f} ms  budget {budget:8.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
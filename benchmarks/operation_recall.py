@@ -0,0 +1,105 @@
+"""Recall benchmark for the planner's candidate-operation retrieval.
+
+For every flow in the demo suite, checks whether the operations it needs (labelled by hand
+below) are among the candidates ``OperationIndex`` selects, for several values of k, and
+how much smaller the spec shown to the planner gets. "bm25 only" is the plain top-k search;
+"candidates" adds operations named in the flow text and their id-producing dependencies.
+
+Usage::
+
+    uv run python benchmarks/operation_recall.py
+    uv run python benchmarks/operation_recall.py --k 2 4 6
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import yaml  # noqa: E402
+
+from api_ninja.openapi import slice_spec  # noqa: E402
+from api_ninja.retrieval import OperationIndex  # noqa: E402
+
+# The operations each demo flow has to call, as implemented by demo/app.py.
+EXPECTED = {
+    "create_and_delete_user": ["POST /users", "GET /users/{user_id}", "DELETE /users/{user_id}"],
+    "delete_nonexistent_user": ["DELETE /users/{user_id}"],
+    "batch_user_operations": ["POST /batch", "GET /users", "DELETE /users/{user_id}"],
+    "search_user_by_name_city": ["POST /users", "GET /search"],
+    "invalid_email_update": ["GET /users", "PUT /users/{user_id}"],
+    "missing_required_fields": ["POST /users"],
+    "deactivate_user": ["POST /users", "PATCH /users/{user_id}/deactivate"],
+    "tag_user": ["POST /users", "POST /users/{user_id}/tags"],
+    "fetch_user_stats": ["POST /batch", "GET /stats"],
+    "access_profile_without_auth": ["POST /users", "POST /login/{user_id}/profile"],
+    "access_without_token": ["POST /users", "GET /login/"],
+    "access_with_valid_token": ["POST /users", "GET /login/"],
+}
+
+
+def query(flow: dict) -> str:
+    return "\n".join(str(flow.get(key) or "") for key in ("description", "notes", "expectations"))
+
+
+def spec_size(spec: dict, operations: list[str]) -> int:
+    pairs = [tuple(reversed(operation.split(" ", 1))) for operation in operations]
+    return len(json.dumps(slice_spec(spec, pairs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 3, 5, 8])
+    parser.add_argument("--spec", default=os.path.join(ROOT, "demo", "openapi.json"))
+    parser.add_argument("--config", default=os.path.join(ROOT, "demo", "config.yaml"))
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    with open(args.config) as f:
+        flows = yaml.safe_load(f)["flows"]
+
+    started = time.perf_counter()
+    index = OperationIndex.build(spec)
+    build_ms = (time.perf_counter() - started) * 1000
+    full_size = len(json.dumps(spec))
+    print(
+        f"{len(index.operations)} operations, {len(EXPECTED)} flows, "
+        f"index built in {build_ms:.1f} ms, full spec {full_size / 1024:.1f} KiB\n"
+    )
+    print(f"{'k':>3}  {'':<11} {'recall':>7} {'complete':>9} {'ops/flow':>9} {'spec size':>10}")
+
+    for k in args.k:
+        for label, select in (
+            ("bm25 only", lambda text: [op for op, _ in index.search(text, k)]),
+            ("candidates", lambda text: index.candidates(text, k)),
+        ):
+            found = needed = complete = selected = size = 0
+            for flow_id, expected in EXPECTED.items():
+                chosen = select(query(flows[flow_id]))
+                hits = sum(1 for operation in expected if operation in chosen)
+                found += hits
+                needed += len(expected)
+                complete += hits == len(expected)
+                selected += len(chosen)
+                size += spec_size(spec, chosen)
+            print(
+                f"{k:>3}  {label:<11} {found / needed:>7.0%} {complete:>5}/{len(EXPECTED):<3} "
+                f"{selected / len(EXPECTED):>9.1f} {size / len(EXPECTED) / full_size:>10.0%}"
+            )
+
+    started = time.perf_counter()
+    rounds = 200
+    for _ in range(rounds):
+        for flow_id in EXPECTED:
+            index.candidates(query(flows[flow_id]), 5)
+    per_query = (time.perf_counter() - started) * 1000 / (rounds * len(EXPECTED))
+    print(f"\nCandidate selection: {per_query:.3f} ms per flow")
+
+
+if __name__ == "__main__":
+    main()
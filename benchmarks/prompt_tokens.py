@@ -0,0 +1,169 @@
+"""Token benchmark for the pretty and compact prompt formats.
+
+Builds the evaluator prompt for each step of a set of demo-API steps in both formats. It also
+builds the memory context the request generator sees after the steps, and reports the tokens
+each one takes. The steps come from ``MockAPI`` serving the demo spec by default, each
+labelled with the verdict a correct evaluator gives. With ``--results``, the steps come from
+a ``run-all --results-out`` file instead, labelled with the verdicts recorded in that run.
+``--evaluate`` also runs the evaluator on every step in both formats (needs OPENAI_API_KEY)
+and reports how often each format reaches the labelled verdict.
+
+Tokens are counted with tiktoken when it is installed, and estimated as characters / 4
+otherwise.
+
+Usage::
+
+    uv run python benchmarks/prompt_tokens.py
+    uv run python benchmarks/prompt_tokens.py --results results.jsonl --evaluate
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from api_ninja.agents.result_evaluation import ResultEvaluationAgent  # noqa: E402
+from api_ninja.agents.serialization import COMPACT, PRETTY, memory_format  # noqa: E402
+from api_ninja.contract import RequestSynthesizer  # noqa: E402
+from api_ninja.memory_store import MemoryStore  # noqa: E402
+from api_ninja.mock import MockAPI  # noqa: E402
+from api_ninja.results import StepResult  # noqa: E402
+
+CITIES = ["Lisbon", "Austin", "Osaka", "Nairobi", "Quito", "Tallinn"]
+
+
+def counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return "chars/4", lambda text: len(text) // 4
+    encoding = tiktoken.get_encoding("o200k_base")
+    return "tiktoken", lambda text: len(encoding.encode(text))
+
+
+def step(index, method, path, payload, status, body, expected_status, check, verdict):
+    result = StepResult(
+        index=index,
+        method=method,
+        path=path,
+        url=path,
+        headers={"Content-Type": "application/json"},
+        payload=payload,
+        parameters={},
+        status=status,
+        body=body,
+        expected_status=expected_status,
+        response_check=check,
+    )
+    return result, verdict
+
+
+def demo_steps(users: int) -> list[tuple[StepResult, str]]:
+    """Steps against MockAPI on the demo spec, each with the verdict it should get."""
+    with open(os.path.join(ROOT, "demo", "openapi.json")) as f:
+        spec = json.load(f)
+    mock = MockAPI(spec, seed=7)
+    template = RequestSynthesizer(spec).example(
+        spec["paths"]["/users"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    )
+
+    def user(i):
+        body = json.loads(json.dumps(template))
+        body.update(name=f"User {i}", age=20 + i % 50, tags=["beta", f"team-{i % 4}"])
+        if isinstance(body.get("address"), dict):
+            body["address"]["city"] = CITIES[i % len(CITIES)]
+        return body
+
+    steps = []
+    first = user(0)
+    status, created = mock.handle("POST", "/users", first)
+    steps.append(step(0, "POST", "/users", first, status, created, 201, "Returns the user", "PASS"))
+    batch = [user(i) for i in range(1, users)]
+    status, body = mock.handle("POST", "/batch", batch)
+    steps.append(
+        step(1, "POST", "/batch", batch, status, body, 201, "All users are created", "PASS")
+    )
+    status, body = mock.handle("GET", "/users")
+    steps.append(step(2, "GET", "/users", {}, status, body, 200, f"Lists {users} users", "PASS"))
+    user_id = created.get("id") if isinstance(created, dict) else "missing"
+    status, body = mock.handle("GET", f"/users/{user_id}")
+    steps.append(
+        step(3, "GET", f"/users/{user_id}", {}, status, body, 200, "Name is User 0", "PASS")
+    )
+    status, body = mock.handle("GET", f"/users/{user_id}")
+    steps.append(
+        step(4, "GET", f"/users/{user_id}", {}, status, body, 200, "Name is User 7", "FAIL")
+    )
+    bad = {"name": "No Age"}
+    status, body = mock.handle("POST", "/users", bad)
+    steps.append(
+        step(5, "POST", "/users", bad, status, body, 422, "Rejects the missing fields", "PASS")
+    )
+    status, body = mock.handle("POST", "/users", bad)
+    steps.append(step(6, "POST", "/users", bad, status, body, 201, "Creates the user", "FAIL"))
+    status, body = mock.handle("DELETE", f"/users/{user_id}")
+    steps.append(step(7, "DELETE", f"/users/{user_id}", {}, status, body, 204, "", "PASS"))
+    return steps
+
+
+def recorded_steps(path: str) -> list[tuple[StepResult, str]]:
+    fields = set(StepResult.__slots__)
+    steps = []
+    with open(path) as f:
+        for line in f:
+            for data in json.loads(line)["steps"]:
+                if data.get("verdict") in ("PASS", "FAIL"):
+                    result = StepResult(**{k: v for k, v in data.items() if k in fields})
+                    steps.append((result, data["verdict"]))
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", help="results.jsonl from `run-all --results-out`")
+    parser.add_argument("--users", type=int, default=25, help="Users in the demo data")
+    parser.add_argument("--evaluate", action="store_true", help="Also compare verdicts")
+    args = parser.parse_args()
+
+    steps = recorded_steps(args.results) if args.results else demo_steps(args.users)
+    method, count = counter()
+    formats = {"pretty": PRETTY, "compact": COMPACT}
+    agents = {name: ResultEvaluationAgent(prompt_format=fmt) for name, fmt in formats.items()}
+
+    print(f"{len(steps)} steps, tokens counted with {method}\n")
+    print(f"{'step':<32} {'pretty':>8} {'compact':>8} {'saved':>6}")
+    totals = dict.fromkeys(formats, 0)
+    for result, _ in steps:
+        sizes = {name: count(agent.prompt("", result)) for name, agent in agents.items()}
+        for name, size in sizes.items():
+            totals[name] += size
+        label = f"{result.method} {result.path}"[:32]
+        saved = 1 - sizes["compact"] / sizes["pretty"]
+        print(f"{label:<32} {sizes['pretty']:>8} {sizes['compact']:>8} {saved:>6.0%}")
+    saved = 1 - totals["compact"] / totals["pretty"]
+    print(f"{'evaluator prompts':<32} {totals['pretty']:>8} {totals['compact']:>8} {saved:>6.0%}")
+
+    memories = {name: MemoryStore(memory_format(fmt).dumps) for name, fmt in formats.items()}
+    for result, _ in steps:
+        for memory in memories.values():
+            memory.store(result.body, label=f"{result.method} {result.path}")
+    sizes = {name: count(memory.get_context()) for name, memory in memories.items()}
+    saved = 1 - sizes["compact"] / sizes["pretty"]
+    print(f"{'generator memory':<32} {sizes['pretty']:>8} {sizes['compact']:>8} {saved:>6.0%}")
+
+    if args.evaluate:
+        print(f"\n{'format':<8} {'correct':>8} {'agree':>6}")
+        verdicts = {}
+        for name, agent in agents.items():
+            verdicts[name] = [agent.run("", result).status.upper() for result, _ in steps]
+        for name in formats:
+            correct = sum(v == label for v, (_, label) in zip(verdicts[name], steps))
+            agree = sum(a == b for a, b in zip(verdicts[name], verdicts["pretty"]))
+            print(f"{name:<8} {correct:>5}/{len(steps):<2} {agree / len(steps):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Micro-benchmark for response schema validation throughput.
+
+Compares validating with the per-operation validator cached by ``ValidatorRegistry``
+against compiling a fresh validator for every response, on a synthetic spec with nested
+objects, $refs, nullable fields and a discriminated union.
+
+Usage::
+
+    uv run python benchmarks/validation_throughput.py
+    uv run python benchmarks/validation_throughput.py --items 500 --seconds 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from api_ninja.validation import SchemaCompiler, ValidatorRegistry  # noqa: E402
+
+
+def _ref(name):
+    return {"$ref": f"#/components/schemas/{name}"}
+
+
+SPEC = {
+    "openapi": "3.0.3",
+    "paths": {
+        "/users": {
+            "get": {
+                "responses": {
+                    "200": {
+                        "content": {
+                            "application/json": {"schema": {"type": "array", "items": _ref("User")}}
+                        }
+                    }
+                }
+            }
+        }
+    },
+    "components": {
+        "schemas": {
+            "Address": {
+                "type": "object",
+                "required": ["street", "city", "zip_code"],
+                "properties": {
+                    "street": {"type": "string", "minLength": 1},
+                    "city": {"type": "string"},
+                    "zip_code": {"type": "string", "pattern": "^[0-9]{5}$"},
+                },
+            },
+            "Email": {
+                "type": "object",
+                "required": ["kind", "email"],
+                "properties": {"kind": {"type": "string"}, "email": {"type": "string"}},
+            },
+            "Phone": {
+                "type": "object",
+                "required": ["kind", "number"],
+                "properties": {"kind": {"type": "string"}, "number": {"type": "string"}},
+            },
+            "User": {
+                "type": "object",
+                "required": ["id", "name", "age", "address", "contacts"],
+                "properties": {
+                    "id": {"type": "string"},
+                    "name": {"type": "string", "maxLength": 100},
+                    "age": {"type": "integer", "minimum": 0, "maximum": 130},
+                    "nickname": {"type": "string", "nullable": True},
+                    "address": _ref("Address"),
+                    "tags": {"type": "array", "items": {"type": "string"}},
+                    "contacts": {
+                        "type": "array",
+                        "items": {
+                            "oneOf": [_ref("Email"), _ref("Phone")],
+                            "discriminator": {"propertyName": "kind"},
+                        },
+                    },
+                },
+            },
+        }
+    },
+}
+
+
+def make_body(items: int) -> list:
+    return [
+        {
+            "id": f"user-{i}",
+            "name": f"User {i}",
+            "age": 20 + i % 50,
+            "nickname": None if i % 2 else f"u{i}",
+            "address": {"street": f"{i} Main St", "city": "Springfield", "zip_code": "12345"},
+            "tags": ["a", "b", "c"],
+            "contacts": [
+                {"kind": "Email", "email": f"user{i}@example.com"},
+                {"kind": "Phone", "number": "555-0100"},
+            ],
+        }
+        for i in range(items)
+    ]
+
+
+def run(label: str, validate, body, seconds: float, size: int):
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        errors = validate(body)
+        count += 1
+    elapsed = time.perf_counter() - started
+    assert not errors, errors
+    print(
+        f"{label:<28} {count / elapsed:10.1f} bodies/s  "
+        f"{count * size / elapsed / 1e6:8.2f} MB/s  {elapsed / count * 1e3:8.3f} ms/body"
+    )
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100, help="Users per response body")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time per measurement")
+    args = parser.parse_args()
+
+    body = make_body(args.items)
+    size = len(json.dumps(body))
+    print(f"Response body: {args.items} users, {size / 1024:.1f} KiB\n")
+
+    registry = ValidatorRegistry(SPEC)
+
+    def cached(value):
+        return registry.validate_response("/users", "get", 200, value)
+
+    schema = SPEC["paths"]["/users"]["get"]["responses"]["200"]["content"]["application/json"]
+
+    def uncached(value):
+        errors = []
+        SchemaCompiler(SPEC).compile(schema["schema"])(value, "", errors)
+        return errors
+
+    fast = run("registry (compiled once)", cached, body, args.seconds, size)
+    slow = run("compile per response", uncached, body, args.seconds, size)
+    print(f"\nSpeed-up from caching: {fast / slow:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import asyncio
+from dataclasses import dataclass
+
+
+@dataclass
+class UsageTracker:
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, result):
+        usage = result.context_wrapper.usage
+        self.requests += usage.requests
+        self.input_tokens += usage.input_tokens
+        self.output_tokens += usage.output_tokens
+
+    def __str__(self) -> str:
+        return f"{self.requests} LLM calls, {self.total_tokens:,} tokens"
+
+
+def run_agent(
+    *,
+    model: str,
+    name: str,
+    instructions: str,
+    output_type,
+    input: str,
+    usage: UsageTracker | None = None,
+    timeout: float | None = None,
+):
+    # The agents SDK (and the openai client it pulls in) is slow to import, so it is
+    # only loaded the first time an agent actually runs.
+    from agents import Agent, Runner
+
+    agent = Agent(
+        model=model,
+        name=name,
+        instructions=instructions,
+        output_type=output_type,
+    )
+    run = Runner.run(agent, input=input)
+    if timeout is not None:
+        # Cancels the model call on expiry; the caller sees TimeoutError.
+        run = asyncio.wait_for(run, timeout)
+    result = asyncio.run(run)
+    if usage is not None:
+        usage.add(result)
+    return result
@@ -1,88 +1,170 @@
-import asyncio
 import json
-import os
+import time
 from typing import List
 
-from agents import Agent, Runner
-from langchain_openai import ChatOpenAI
-from ragas.dataset_schema import SingleTurnSample
-from ragas.llms import LangchainLLMWrapper
-from ragas.metrics import AnswerAccuracy
+from api_ninja.agents.base import UsageTracker
+from api_ninja.agents.routing import ModelRouter
+from api_ninja.models import FlowModel, FlowScoreModel
+from api_ninja.openapi import HTTP_METHODS, operation_catalogue, slice_operation
 
-from api_ninja.models import FlowModel
+DEFAULT_SCENARIOS = [
+    "happy path",
+    "error handling",
+    "authentication",
+    "boundary value",
+    "schema validation",
+]
 
-LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1")
 
+def generation_input(method: str, path: str) -> str:
+    return f"Generate test flows maximum of one for each scenario. {method} {path}"
 
-def evaluate_flow(flow: FlowModel, method: str, path: str, openapi_spec: dict, scorer) -> tuple:
-    sample = SingleTurnSample(
-        user_input=f"Generate test flow for {method} {path}",
-        response=f"{flow.description}\n{flow.expectations}\n{flow.notes}",
-        reference=f"This is a reference flow for {method} {path}.\nOpenAPI Spec:\n{json.dumps(openapi_spec)}",
+
+def collection_name(method: str, path: str) -> str:
+    return method.lower() + path.replace("/", "_").replace("{", "").replace("}", "")
+
+
+def flows_config(flows: List[FlowModel]) -> dict[str, dict]:
+    """{flow id: flow} as written to a flows config."""
+    return {
+        flow.id: {
+            "description": flow.description,
+            "expectations": flow.expectations,
+            "notes": flow.notes,
+        }
+        for flow in flows
+    }
+
+
+def _flows_as_json(flows: List[FlowModel]) -> str:
+    return json.dumps([flow.model_dump() for flow in flows], indent=2)
+
+
+def score_instructions(flows: List[FlowModel], method: str, path: str, operation_spec: dict) -> str:
+    return f"""
+        You are a strict reviewer of API test flows. Each flow below was generated to test
+        the endpoint `{method.upper()} {path}` and will later be executed by an LLM agent that
+        only sees the flow text and the OpenAPI spec.
+
+        ## Operation spec:
+        {json.dumps(operation_spec)}
+
+        ## Flows:
+        {_flows_as_json(flows)}
+
+        Score each flow from 0.0 to 1.0 for accuracy and executability:
+        - It only uses fields, parameters and status codes documented for the operation.
+        - It describes concrete, ordered steps with realistic sample data.
+        - Its expectations are specific (status codes, fields to check), not vague goals.
+        - Setup steps may call other endpoints of the same API (e.g. creating a resource
+          before deleting it); do not penalise them for not appearing in the operation spec.
+
+        For every flow give actionable feedback describing exactly what to change. Return one
+        entry per flow, using the flow's id unchanged.
+    """.strip()
+
+
+def score_flows(
+    flows: List[FlowModel],
+    method: str,
+    path: str,
+    operation_spec: dict,
+    model: str | None = None,
+    usage: UsageTracker | None = None,
+    router: ModelRouter | None = None,
+) -> dict[str, FlowScoreModel]:
+    """
+    Scores every flow for one endpoint in a single judge call, against only the slice of
+    the spec that describes the operation.
+    """
+    instructions = score_instructions(flows, method, path, operation_spec)
+    scores = (router or ModelRouter()).run(
+        "scorer",
+        model=model,
+        name=f"Flow Scorer for {method.upper()} {path}",
+        instructions=instructions,
+        output_type=List[FlowScoreModel],
+        input="Score the flows.",
+        usage=usage,
     )
-    score = asyncio.run(scorer.single_turn_ascore(sample))
-    return score, sample
+    return {score.id: score for score in scores}
 
 
-def regenerate_failed_flow(
+def regenerate_instructions(
     method: str,
     path: str,
-    scenario: str,
     openapi_spec: dict,
-    failed_flow: dict,
-) -> FlowModel:
-    improvement_prompt = f"""
-        You are an expert API test flow designer. A test flow was generated for the scenario: \"{scenario}\" for the endpoint `{method.upper()} {path}`,
-        but it was rated poorly (score: {failed_flow['score']:.2f}).
-
-        ## Reason for failure:
-        {failed_flow.get('feedback', 'No feedback provided.')}
+    operation_spec: dict,
+    failed: List[tuple[FlowModel, FlowScoreModel]],
+) -> str:
+    failures = [
+        {**flow.model_dump(), "score": round(score.score, 2), "feedback": score.feedback}
+        for flow, score in failed
+    ]
+    return f"""
+        You are an expert API test flow designer. The test flows below were generated for the
+        endpoint `{method.upper()} {path}`, but a reviewer rated them poorly. Each flow comes
+        with its score and the reviewer's feedback.
+
+        ## Rejected flows:
+        {json.dumps(failures, indent=2)}
 
         ## Your task:
-        Regenerate a **single improved test flow** for the scenario: \"{scenario}\". You MUST address the feedback above and ensure the flow is:
+        Regenerate an **improved version of every rejected flow**, keeping each flow's id
+        and scenario. You MUST address each flow's feedback and ensure the flow is:
         - Accurate
         - Clear in setup steps
         - Has realistic payloads and headers
         - Includes proper expectations and validations
         - Aligns strictly with the OpenAPI spec
 
+        ## Operation spec:
+        {json.dumps(operation_spec)}
 
-        ## OpenAPI Spec:
-        {json.dumps(openapi_spec)}
-
-        ## Previous (failed) flow:
-        - Description: {failed_flow['description']}
-        - Expectations: {failed_flow['expectations']}
-        - Notes: {failed_flow['notes']}
+        ## Other operations available for setup steps:
+        {operation_catalogue(openapi_spec)}
 
         - Instead of vague goals, describe each test as a series of concrete steps and LLM should be able to generate the flow from the output. For example:
 
         1. Make a POST request to `/users` with a valid JSON body to create a user.
         2. Capture the returned `id` from the response.
-        3. Make a GET request to `/users/{id}` using the captured ID.
+        3. Make a GET request to `/users/{{id}}` using the captured ID.
         4. Assert that the response matches the schema and includes the expected values.
 
         - Be step-oriented. Each test flow should describe what exact sequence of API calls are made, with sample data, and how the tester knows the API is working as expected.
 
-        Return a valid JSON object like:
+        Return a JSON array with one object per rejected flow like:
         {{
-        "id": "{failed_flow['id']}",
+        "id": "<same id as the rejected flow>",
         "description": "...",
         "expectations": "...",
         "notes": "..."
         }}
     """
 
-    agent = Agent(
-        model=LLM_MODEL,
-        name=f"Regenerator for {failed_flow['id']}",
+
+def regenerate_failed_flows(
+    method: str,
+    path: str,
+    openapi_spec: dict,
+    operation_spec: dict,
+    failed: List[tuple[FlowModel, FlowScoreModel]],
+    usage: UsageTracker | None = None,
+    router: ModelRouter | None = None,
+) -> List[FlowModel]:
+    """
+    Regenerates all of an endpoint's failing flows together, each with its own feedback.
+    """
+    improvement_prompt = regenerate_instructions(method, path, openapi_spec, operation_spec, failed)
+    return (router or ModelRouter()).run(
+        "flow_generator",
+        name=f"Regenerator for {method.upper()} {path}",
         instructions=improvement_prompt,
-        output_type=FlowModel,
+        output_type=List[FlowModel],
+        input="Regenerate the improved flows.",
+        usage=usage,
     )
 
-    result = asyncio.run(Runner.run(agent, input="Regenerate the improved flow."))
-    return result.final_output
-
 
 def self_correct_flows(
     method: str,
@@ -91,57 +173,81 @@ def self_correct_flows(
     flows: List[FlowModel],
     threshold: float = 0.9,
     max_retries: int = 3,
+    min_improvement: float = 0.05,
+    scoring_model: str | None = None,
+    usage: UsageTracker | None = None,
+    scoring_usage: UsageTracker | None = None,
+    router: ModelRouter | None = None,
 ) -> List[FlowModel]:
-    evaluator_llm = LangchainLLMWrapper(ChatOpenAI(model=LLM_MODEL))
-    scorer = AnswerAccuracy(llm=evaluator_llm)
-    evaluated_flows = []
-    failed_flows = []
-
+    """
+    Scores an endpoint's flows and regenerates the ones below `threshold` in rounds, until
+    they all pass, `max_retries` rounds have run, or a round improves the mean score of the
+    failing flows by less than `min_improvement`. Flows that never pass are dropped.
+    """
+    operation_spec = slice_operation(openapi_spec, method, path)
+    router = router or ModelRouter()
+    scores = score_flows(
+        flows, method, path, operation_spec, scoring_model, scoring_usage, router=router
+    )
+    best = {}
     for flow in flows:
-        score, _ = evaluate_flow(flow, method, path, openapi_spec, scorer)
-        print(f"Flow ID: {flow.id}, Score: {score:.2f}")
-        if score >= threshold:
-            evaluated_flows.append(flow)
-        else:
-            scenario_name = " ".join(flow.id.split("_")[-2:])
-            failed_flows.append(
-                {
-                    "id": flow.id,
-                    "scenario": scenario_name,
-                    "description": flow.description,
-                    "expectations": flow.expectations,
-                    "notes": flow.notes,
-                    "score": score,
-                    "feedback": "Expectation unclear. Please make expected result more specific.",
-                }
-            )
-
-    for failed in failed_flows:
-        retries = 0
-        while retries < max_retries:
-            improved_flow = regenerate_failed_flow(
-                method=method,
-                path=path,
-                scenario=failed["scenario"],
-                openapi_spec=openapi_spec,
-                failed_flow=failed,
-            )
-            score, _ = evaluate_flow(improved_flow, method, path, openapi_spec, scorer)
-            print(f"Improved Flow ID: {improved_flow.id}, Score: {score:.2f}")
-            if score >= threshold:
-                evaluated_flows.append(improved_flow)
-                break
-            else:
-                failed["score"] = score
-                failed["feedback"] = (
-                    "Still vague expectations or missing schema reference. Improve clarity."
-                )
-                retries += 1
-
-    return evaluated_flows
+        score = scores.get(flow.id) or FlowScoreModel(
+            id=flow.id, score=0.0, feedback="The reviewer did not score this flow."
+        )
+        best[flow.id] = (flow, score)
+        print(f"Flow ID: {flow.id}, Score: {score.score:.2f}")
+
+    pending = [flow_id for flow_id, (_, score) in best.items() if score.score < threshold]
+    previous = _mean_score(best, pending)
+    for _ in range(max_retries):
+        if not pending:
+            break
+        improved = regenerate_failed_flows(
+            method=method,
+            path=path,
+            openapi_spec=openapi_spec,
+            operation_spec=operation_spec,
+            failed=[best[flow_id] for flow_id in pending],
+            usage=usage,
+            router=router,
+        )
+        improved = [flow for flow in improved if flow.id in pending]
+        if not improved:
+            break
+        new_scores = score_flows(
+            improved, method, path, operation_spec, scoring_model, scoring_usage, router=router
+        )
+        for flow in improved:
+            score = new_scores.get(flow.id)
+            if score is None:
+                continue
+            print(f"Improved Flow ID: {flow.id}, Score: {score.score:.2f}")
+            if score.score > best[flow.id][1].score:
+                best[flow.id] = (flow, score)
+
+        current = _mean_score(best, pending)
+        pending = [flow_id for flow_id in pending if best[flow_id][1].score < threshold]
+        if pending and current - previous < min_improvement:
+            print(f"Score stopped improving ({previous:.2f} -> {current:.2f}), giving up.")
+            break
+        previous = current
+
+    return [flow for flow, score in best.values() if score.score >= threshold]
+
+
+def _mean_score(best: dict, flow_ids: List[str]) -> float:
+    if not flow_ids:
+        return 1.0
+    return sum(best[flow_id][1].score for flow_id in flow_ids) / len(flow_ids)
 
 
 class FlowGeneratorAgent:
+    def __init__(self, scoring_model: str | None = None, router: ModelRouter | None = None):
+        self.router = router or ModelRouter()
+        if scoring_model:
+            self.router.models["scorer"] = scoring_model
+        self.scoring_model = self.router.model("scorer")
+
     def prompt(
         self,
         method: str,
@@ -215,82 +321,87 @@ class FlowGeneratorAgent:
         method: str,
         path: str,
         openapi_spec: dict,
-        scenarios: List[str] = [
-            "happy path",
-            "error handling",
-            "authentication",
-            "boundary value",
-            "schema validation",
-        ],
+        scenarios: List[str] = DEFAULT_SCENARIOS,
+        usage: UsageTracker | None = None,
     ) -> List[FlowModel]:
         instructions = self.prompt(method, path, openapi_spec, "\n".join(scenarios))
-        agent = Agent(
-            model=LLM_MODEL,
+        return self.router.run(
+            "flow_generator",
             name=f"Flow Generator for {method} {path}",
             instructions=instructions,
             output_type=List[FlowModel],
+            input=generation_input(method, path),
+            usage=usage,
         )
-        result = asyncio.run(
-            Runner.run(
-                agent,
-                input=f"Generate test flows maximum of one for each scenario. {method} {path}",
-            )
-        )
-        return result.final_output
 
     def generate_and_correct_flows(
         self,
         method: str,
         path: str,
         openapi_spec: dict,
-        scenarios: List[str] = [
-            "happy path",
-            "error handling",
-            "authentication",
-            "boundary value",
-            "schema validation",
-        ],
+        scenarios: List[str] = DEFAULT_SCENARIOS,
+        usage: UsageTracker | None = None,
+        scoring_usage: UsageTracker | None = None,
     ) -> List[FlowModel]:
         raw_flows = self.generate_flows_for_endpoint(
-            method=method, path=path, openapi_spec=openapi_spec, scenarios=scenarios
+            method=method, path=path, openapi_spec=openapi_spec, scenarios=scenarios, usage=usage
         )
         corrected_flows = self_correct_flows(
-            method=method, path=path, openapi_spec=openapi_spec, flows=raw_flows
+            method=method,
+            path=path,
+            openapi_spec=openapi_spec,
+            flows=raw_flows,
+            usage=usage,
+            scoring_usage=scoring_usage,
+            router=self.router,
         )
         return corrected_flows
 
-    def generate_flows_for_spec(self, openapi_spec: dict) -> dict:
+    def generate_flows_for_spec(self, openapi_spec: dict, on_collection=None) -> dict:
+        """
+        Generates flows for every operation. With on_collection, each endpoint's collection is
+        handed to on_collection(name, description, flows) as soon as it is done instead of
+        being kept for the returned dict.
+        """
         paths = openapi_spec.get("paths", {})
         print(f"Found {len(paths)} paths in the OpenAPI spec.")
         collections = {}
         flow_restructured = {}
         for path, methods in paths.items():
             for method, entry in methods.items():
-                collection_name = method.lower() + path.replace("/", "_").replace("{", "").replace(
-                    "}", ""
-                )
+                name = collection_name(method, path)
                 # if path != "/users/{user_id}":
                 #     continue
-                if method.lower() not in ["get", "post", "put", "patch", "delete"]:
+                if method.lower() not in HTTP_METHODS:
                     continue
                 print(f"Generating flows for {method.upper()} {path}...")
+                usage = UsageTracker()
+                scoring_usage = UsageTracker()
+                started = time.time()
                 try:
                     flows = self.generate_and_correct_flows(
-                        method=method, path=path, openapi_spec=openapi_spec
+                        method=method,
+                        path=path,
+                        openapi_spec=openapi_spec,
+                        usage=usage,
+                        scoring_usage=scoring_usage,
                     )
-                    flows = [flow.model_dump() for flow in flows]
-                    flow_ids = [flow["id"] for flow in flows]
-                    collections[collection_name] = {
-                        "flows": flow_ids,
-                        "description": f"Flows for {method.upper()} {path}",
-                    }
-                    for flow in flows:
-                        flow_restructured[flow["id"]] = {
-                            "description": flow["description"],
-                            "expectations": flow["expectations"],
-                            "notes": flow["notes"],
+                    description = f"Flows for {method.upper()} {path}"
+                    restructured = flows_config(flows)
+                    if on_collection is not None:
+                        on_collection(name, description, restructured)
+                    else:
+                        collections[name] = {
+                            "flows": list(restructured),
+                            "description": description,
                         }
-                    print(f"Generated {len(flows)} flows for {method.upper()} {path}.")
+                        flow_restructured.update(restructured)
+                    print(
+                        f"Generated {len(flows)} flows for {method.upper()} {path} "
+                        f"in {time.time() - started:.1f}s "
+                        f"(generation: {usage}; "
+                        f"scoring with {self.scoring_model}: {scoring_usage})."
+                    )
                 except Exception as e:
                     print(f"Error generating flows for {method} {path}: {e}")
         return {"flows": flow_restructured, "collections": collections}
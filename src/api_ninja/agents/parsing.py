@@ -0,0 +1,59 @@
+import json
+import re
+from functools import lru_cache
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+
+class OutputParseError(ValueError):
+    """Model output that could not be parsed into the expected type, even tolerantly."""
+
+    def __init__(self, text: str, error: str):
+        self.text = text
+        self.error = error
+        super().__init__(f"Could not parse model output: {error}")
+
+
+def extract_json(text: str) -> str | None:
+    """
+    Returns the first complete JSON object or array in `text`, ignoring code fences and any
+    prose before or after it, or None when there is none.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            _, end = decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            continue
+        return text[match.start() : end]
+    return None
+
+
+@lru_cache(maxsize=None)
+def output_schema(output_type, strict_json_schema: bool = True):
+    """
+    An AgentOutputSchema for `output_type` that, when the model's output does not validate,
+    retries on the JSON found inside it (fenced, or followed by trailing text) before raising
+    OutputParseError with the raw output.
+    """
+    from agents import AgentOutputSchema
+    from agents.exceptions import ModelBehaviorError
+
+    class TolerantOutputSchema(AgentOutputSchema):
+        def validate_json(self, json_str: str):
+            try:
+                return super().validate_json(json_str)
+            except ModelBehaviorError as e:
+                error = e.__cause__ or e
+            candidate = extract_json(json_str)
+            if candidate is not None and candidate != json_str:
+                try:
+                    return super().validate_json(candidate)
+                except ModelBehaviorError as e:
+                    error = e.__cause__ or e
+            raise OutputParseError(json_str, str(error))
+
+    return TolerantOutputSchema(output_type, strict_json_schema=strict_json_schema)
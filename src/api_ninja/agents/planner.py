@@ -1,15 +1,14 @@
-import asyncio
 import json
-import os
 
-from agents import Agent, Runner
-
-from api_ninja.models import ApiCallModel, GoalModel
-
-LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1")
+from api_ninja.agents.base import UsageTracker
+from api_ninja.agents.routing import ModelRouter
+from api_ninja.models import ApiCallModel, GoalModel, TemplatePlanModel
 
 
 class PlannerAgent:
+    def __init__(self, router: ModelRouter | None = None):
+        self.router = router or ModelRouter()
+
     def prompt(self, context: str = "", openapi_spec: dict = {}) -> str:
         prompt = f"""
             You are an expert API call planner.
@@ -59,18 +58,45 @@ class PlannerAgent:
         """.strip()
         return prompt
 
-    def run(self, context: str, openapi_spec: dict = {}) -> list[ApiCallModel]:
+    def template_instructions(self) -> str:
+        return """
+            Request templates:
+            - In addition to the fields above, write the complete request for every step, so it can be
+              executed without asking you again:
+            - resolved_path: the concrete path to call.
+            - payload_json: the JSON request body as a string ("{}" if there is none), with realistic values that satisfy the schema.
+            - parameters_json: the query parameters as a JSON object string ("{}" if none).
+            - headers_json: the request headers as a JSON object string ("{}" if none).
+            - When a value comes from an earlier step's response, write a binding instead of a value:
+              {{$.steps[N].body.<field>}} where N is the 0-based index of the earlier step, for example
+              "resolved_path": "/users/{{$.steps[0].body.id}}". Array elements use [i], e.g.
+              {{$.steps[1].body[0].id}}. A binding that is the whole JSON string value keeps the bound value's type.
+            - Never leave spec placeholders such as {user_id} in resolved_path.
+        """.strip()
+
+    def run(
+        self,
+        context: str,
+        openapi_spec: dict = {},
+        usage: UsageTracker | None = None,
+        templates: bool = False,
+        timeout: float | None = None,
+    ) -> list[ApiCallModel]:
+        """
+        Plans the flow's API calls. With `templates`, every step is a RequestTemplateModel
+        that carries the full request, with bindings to earlier responses, so most steps can
+        be executed without a request generator call.
+        """
         prompt = self.prompt(context, openapi_spec)
-        agent = Agent(
-            model=LLM_MODEL,
+        if templates:
+            prompt = f"{prompt}\n\n{self.template_instructions()}"
+        output = self.router.run(
+            "planner",
             name="API Call Planner",
             instructions=prompt,
-            output_type=GoalModel,
-        )
-        result = asyncio.run(
-            Runner.run(
-                agent,
-                input="Show me all the steps to do. Refer to the OpenAPI spec for details.",
-            )
+            output_type=TemplatePlanModel if templates else GoalModel,
+            input="Show me all the steps to do. Refer to the OpenAPI spec for details.",
+            usage=usage,
+            timeout=timeout,
         )
-        return result.final_output.steps
+        return output.steps
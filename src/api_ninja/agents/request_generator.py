@@ -1,21 +1,51 @@
-import asyncio
 import json
-import os
-
-from agents import Agent, Runner
-
-from api_ninja.models import ApiCallModel
-
-LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1")
+import time
+
+from api_ninja.agents.base import UsageTracker
+from api_ninja.agents.parsing import OutputParseError, output_schema
+from api_ninja.agents.routing import ModelRouter, time_left
+from api_ninja.models import ApiCallModel, RequestModel
+from api_ninja.uploads import DEFAULT_FIXTURE, MULTIPART, is_json, request_body_content
+
+REPAIR_INSTRUCTIONS = """
+    Your previous output could not be parsed as the API request object. Return the same
+    request as a single JSON object with method, path, payload, parameters and headers,
+    fixing only what the parse error points at.
+""".strip()
+
+
+def body_instructions(content_type: str, files: list[dict] | None) -> str:
+    """Extra instructions for request bodies that are not JSON, with upload file metadata."""
+    if is_json(content_type):
+        return ""
+    if content_type == MULTIPART:
+        shape = (
+            "Write `payload` as an object of form fields. For a file field, write "
+            '{"$file": "<name>"} with the name of one of the files below.'
+        )
+    elif content_type == "application/x-www-form-urlencoded":
+        shape = "Write `payload` as a flat object of form fields."
+    else:
+        shape = 'Write `payload` as {"$file": "<name>"} with the name of one of the files below.'
+    return f"""
+        ### Request Body Encoding:
+        The request body is sent as `{content_type}`. {shape}
+        Files available for upload (metadata only; their contents are sent for you):
+        {json.dumps(files or [DEFAULT_FIXTURE.metadata()])}
+    """
 
 
 class RequestGeneratorAgent:
+    def __init__(self, router: ModelRouter | None = None):
+        self.router = router or ModelRouter()
+
     def prompt(
         self,
         step: ApiCallModel,
         context: str = "",
         openapi_spec: dict = {},
         schema: dict = {},
+        body_instructions: str = "",
     ) -> str:
         """
         Generates API request components (payload, parameters, headers, and optionally resolved path)
@@ -55,6 +85,7 @@ class RequestGeneratorAgent:
         ---
         The expected output schema is as follows:
         {json.dumps(schema)}
+        {body_instructions}
 
         ### Output JSON Format:
         {{{{  
@@ -70,29 +101,59 @@ class RequestGeneratorAgent:
 
         return prompt
 
-    def run(self, step: ApiCallModel, context: str = "", openapi_spec: dict = {}) -> dict:
-        payload_schema = get_request_body_schema(openapi_spec, step.path, step.method) or ""
-        prompt = self.prompt(step, context, openapi_spec, payload_schema)
-        agent = Agent(
-            model=LLM_MODEL,
-            name="API Request Agent",
-            instructions=prompt,
-            output_type=str,
+    def run(
+        self,
+        step: ApiCallModel,
+        context: str = "",
+        openapi_spec: dict = {},
+        usage: UsageTracker | None = None,
+        timeout: float | None = None,
+        files: list[dict] | None = None,
+    ) -> dict:
+        """`files` is metadata (name, size, content_type) of the files an upload may use."""
+        content_type, payload_schema = request_body_content(openapi_spec, step.path, step.method)
+        prompt = self.prompt(
+            step,
+            context,
+            openapi_spec,
+            payload_schema or "",
+            body_instructions(content_type, files),
         )
-        result = asyncio.run(
-            Runner.run(
-                agent,
+        # Payloads are free-form JSON, which strict structured output cannot describe.
+        schema = output_schema(RequestModel, strict_json_schema=False)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            # Unparseable output is repaired below rather than escalated straight away.
+            request = self.router.run(
+                "generator",
+                name="API Request Agent",
+                instructions=prompt,
+                output_type=schema,
                 input="Generate the API request components based on the provided details.",
+                usage=usage,
+                timeout=timeout,
+                escalate=False,
             )
-        )
-        if result.final_output.startswith("```json"):
-            result.final_output = result.final_output[7:-3]
-        return json.loads(result.final_output)
+        except OutputParseError as e:
+            # One repair round trip that carries only the bad output and the parse error. It
+            # (and its escalation, if the repair is unparseable too) gets what is left of the
+            # call's budget.
+            request = self.router.run(
+                "generator",
+                name="API Request Repair",
+                instructions=REPAIR_INSTRUCTIONS,
+                output_type=schema,
+                input=f"Parse error: {e.error}\n\nOutput to fix:\n{e.text}",
+                usage=usage,
+                timeout=time_left(deadline),
+            )
+        return request.model_dump()
 
 
 def get_request_body_schema(openapi_spec: dict, path: str, method: str) -> dict | None:
     """
-    Returns the JSON schema for the requestBody of a given path and method, if available.
+    Returns the schema for the requestBody of a given path and method, if available: the JSON
+    one, or else the multipart, form-encoded or binary one (see request_body_content).
 
     Parameters:
         openapi_spec (dict): The OpenAPI specification as a dict.
@@ -102,21 +163,4 @@ def get_request_body_schema(openapi_spec: dict, path: str, method: str) -> dict
     Returns:
         dict | None: JSON schema for the payload or None if not found.
     """
-    path_item = openapi_spec.get("paths", {}).get(path)
-    if not path_item:
-        return None
-
-    operation = path_item.get(method.lower())
-    if not operation:
-        return None
-
-    request_body = operation.get("requestBody")
-    if not request_body:
-        return None
-
-    # Handle application/json only for now
-    content = request_body.get("content", {}).get("application/json")
-    if not content:
-        return None
-
-    return content.get("schema")
+    return request_body_content(openapi_spec, path, method)[1]
@@ -1,17 +1,45 @@
-import asyncio
-import json
-import os
+from api_ninja.agents.base import UsageTracker
+from api_ninja.agents.routing import ModelRouter
+from api_ninja.agents.serialization import PRETTY, PromptFormat
+from api_ninja.models import EvaluationResult
+from api_ninja.results import StepResult
 
-from agents import Agent, Runner
 
-from api_ninja.models import EvaluationResult
+def format_schema_errors(errors: list[str] | None) -> str:
+    if errors is None:
+        return "No response schema is declared for this status code."
+    if not errors:
+        return "The body matches the response schema declared in the OpenAPI spec."
+    shown = "\n".join(f"- {error}" for error in errors[:20])
+    more = f"\n- ... and {len(errors) - 20} more" if len(errors) > 20 else ""
+    return f"The body does NOT match the declared response schema:\n{shown}{more}"
+
+
+def format_probe(summary: dict | None, prompt_format: PromptFormat = PRETTY) -> str:
+    if not summary:
+        return ""
+    return f"""
+            ### Concurrency Probe
+            This request was sent {summary["requests"]} times at once; the response above is one
+            of them. Judge the combined outcome against the expectations: e.g. a unique creation
+            must succeed exactly once with the others rejected, no request may fail with 5xx or
+            a connection error, and a latency spread far beyond the median suggests contention.
+            {prompt_format.dumps(summary)}
 
-LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1")
+            ---"""
+
+
+def is_conclusive(verdict: EvaluationResult) -> bool:
+    return verdict.status.strip().upper() in ("PASS", "FAIL") and bool(verdict.reason.strip())
 
 
 class ResultEvaluationAgent:
+    def __init__(self, router: ModelRouter | None = None, prompt_format: PromptFormat = PRETTY):
+        self.router = router or ModelRouter()
+        self.prompt_format = prompt_format
 
-    def prompt(self, context: str = "", result: dict = {}) -> str:
+    def prompt(self, context: str, result: StepResult) -> str:
+        dumps = self.prompt_format.dumps
 
         prompt = f"""
             You are an API test evaluator and debugger.
@@ -19,26 +47,30 @@ class ResultEvaluationAgent:
 
             ---
             ### Request
-            - Method: {result['method']}
-            - Path: {result['path']}
+            - Method: {result.method}
+            - Path: {result.path}
 
             - Headers:
-            {json.dumps(result['headers'], indent=2)}
+            {dumps(result.headers)}
             - Payload:
-            {json.dumps(result['payload'], indent=2)}
+            {dumps(result.payload)}
             - Parameters:
-            {json.dumps(result['parameters'], indent=2)}
+            {dumps(result.parameters)}
 
             ---
             ### Response
-            - Status Code: {result['response_status']}
+            - Status Code: {result.status}
             - Body:
-            {json.dumps(result['response_body'], indent=2)}
+            {dumps(result.body)}
 
             ---
+            ### Local Schema Validation
+            {format_schema_errors(result.schema_errors)}
+
+            ---{format_probe(result.probe, self.prompt_format)}
             ### Expectations
-            - Expected Status Code: {result['expected_status']}
-            - Response Check: {result['response_check']}
+            - Expected Status Code: {result.expected_status}
+            - Response Check: {result.response_check}
 
             ---
             ### Evaluation Task
@@ -46,6 +78,7 @@ class ResultEvaluationAgent:
             You must:
             1. Determine whether the status code matches the expected status.
             2. Determine whether the response body satisfies the natural-language response check.
+               Treat local schema validation errors as facts about the body; only fail on them when the expectations call for a valid response.
             3. Provide a clear reason for your evaluation.
             4. If the result is FAIL, suggest what could be fixed or investigated (e.g., wrong headers, missing field, etc.).
             5. Make sure you understand the context of the API call. There could be negative scenarios where the API should return an error code. In that case, you should not suggest to fix it.
@@ -69,15 +102,21 @@ class ResultEvaluationAgent:
         """.strip()
         return prompt
 
-    def run(self, context: str, result: dict = {}) -> EvaluationResult:
+    def run(
+        self,
+        context: str,
+        result: StepResult,
+        usage: UsageTracker | None = None,
+        timeout: float | None = None,
+    ) -> EvaluationResult:
         prompt = self.prompt(context, result)
-        agent = Agent(
-            model=LLM_MODEL,
+        return self.router.run(
+            "evaluator",
+            accept=is_conclusive,
             name="API Evaluator",
             instructions=prompt,
             output_type=EvaluationResult,
+            input="Evaluate the result of API call to expectations.",
+            usage=usage,
+            timeout=timeout,
         )
-        output = asyncio.run(
-            Runner.run(agent, input="Evaluate the result of API call to expectations.")
-        )
-        return output.final_output
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from api_ninja.agents.base import run_agent
+from api_ninja.stats import percentile
+
+ROLES = ("planner", "generator", "evaluator", "flow_generator", "scorer")
+DEFAULT_MODEL = "gpt-4.1"
+
+
+@dataclass
+class RoleStats:
+    calls: int = 0
+    escalations: int = 0
+    parse_failures: int = 0
+    latencies_ms: list[float] = field(default_factory=list)
+
+    @property
+    def p50_ms(self) -> float | None:
+        return percentile(self.latencies_ms, 50)
+
+    @property
+    def p95_ms(self) -> float | None:
+        return percentile(self.latencies_ms, 95)
+
+
+def _parse_assignments(specs, what: str) -> dict[str, str]:
+    """Parses "role=value" strings, e.g. from repeated CLI options."""
+    assignments = {}
+    for spec in specs:
+        role, sep, value = spec.partition("=")
+        role = role.strip().lower()
+        if not sep or role not in ROLES or not value.strip():
+            roles = ", ".join(ROLES)
+            raise ValueError(f"expected ROLE={what} with ROLE one of {roles}, got {spec!r}")
+        assignments[role] = value.strip()
+    return assignments
+
+
+def time_left(deadline: float | None) -> float | None:
+    """
+    Seconds left before a time.monotonic() deadline (None for no deadline), for a retry that
+    has to fit in the budget of the call it retries. Raises TimeoutError once it has passed.
+    """
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("no time left to retry the model call")
+    return left
+
+
+def _is_parse_error(error: Exception) -> bool:
+    # Structured output the SDK could not validate surfaces as ModelBehaviorError; our own
+    # parsers raise ValueError (json.JSONDecodeError and pydantic's ValidationError included).
+    from agents.exceptions import ModelBehaviorError
+
+    return isinstance(error, (ModelBehaviorError, ValueError))
+
+
+class ModelRouter:
+    """
+    Picks the model for each agent role: the explicit `models` mapping first, then the
+    LLM_MODEL_<ROLE> environment variable, then LLM_MODEL. When a role has an escalation
+    model, a call whose output fails to parse, or that `accept` rejects, is retried once on
+    it. Keeps per-role call latency and escalation counts for the run summary.
+    """
+
+    def __init__(
+        self, models: dict[str, str] | None = None, escalation: dict[str, str] | None = None
+    ):
+        self.models = dict(models or {})
+        self.escalation = dict(escalation or {})
+        self.stats = {role: RoleStats() for role in ROLES}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, model_specs=(), escalation_specs=()) -> "ModelRouter":
+        """
+        Builds a router from "role=model" strings. An escalation spec without a role ("gpt-4.1")
+        applies to every role.
+        """
+        escalation = {}
+        for spec in escalation_specs:
+            if "=" in spec:
+                escalation.update(_parse_assignments([spec], "MODEL"))
+            else:
+                escalation.update({role: spec.strip() for role in ROLES})
+        return cls(_parse_assignments(model_specs, "MODEL"), escalation)
+
+    def model(self, role: str) -> str:
+        return (
+            self.models.get(role)
+            or os.getenv(f"LLM_MODEL_{role.upper()}")
+            or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        )
+
+    def escalation_model(self, role: str) -> str | None:
+        model = (
+            self.escalation.get(role)
+            or os.getenv(f"LLM_ESCALATION_MODEL_{role.upper()}")
+            or os.getenv("LLM_ESCALATION_MODEL")
+        )
+        return model if model and model != self.model(role) else None
+
+    def _run(self, role: str, model: str, parse, **kwargs):
+        started = time.perf_counter()
+        unparseable = False
+        try:
+            result = run_agent(model=model, **kwargs)
+            return parse(result.final_output) if parse is not None else result.final_output
+        except Exception as e:
+            unparseable = _is_parse_error(e)
+            raise
+        finally:
+            with self._lock:
+                stats = self.stats[role]
+                stats.calls += 1
+                stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+                if unparseable:
+                    stats.parse_failures += 1
+
+    def run(
+        self,
+        role: str,
+        *,
+        model: str | None = None,
+        parse=None,
+        accept=None,
+        escalate: bool = True,
+        **kwargs,
+    ):
+        """
+        Runs an agent for `role` (kwargs as for run_agent) and returns its parsed output.
+        `parse` turns the raw final output into the result and may raise ValueError;
+        `accept` returns False for an output that should be escalated (an inconclusive verdict).
+        With escalate=False the caller handles bad output itself. An escalated call gets what
+        is left of `timeout`, so the two calls together stay within it.
+        """
+        escalate_to = self.escalation_model(role) if escalate else None
+        timeout = kwargs.get("timeout")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            output = self._run(role, model or self.model(role), parse, **kwargs)
+        except Exception as e:
+            if escalate_to is None or not _is_parse_error(e):
+                raise
+        else:
+            if escalate_to is None or accept is None or accept(output):
+                return output
+        kwargs["timeout"] = time_left(deadline)
+        with self._lock:
+            self.stats[role].escalations += 1
+        return self._run(role, escalate_to, parse, **kwargs)
+
+    def summary_rows(self) -> list[tuple[str, str]]:
+        """(label, value) rows for the roles that made calls, for the run summary."""
+        rows = []
+        for role, stats in self.stats.items():
+            if not stats.calls:
+                continue
+            value = f"{stats.calls} calls, p50 {stats.p50_ms:,.0f} ms, p95 {stats.p95_ms:,.0f} ms"
+            if stats.parse_failures:
+                rate = stats.parse_failures / stats.calls
+                value += f", {stats.parse_failures} unparseable ({rate:.0%})"
+            if stats.escalations:
+                value += f", {stats.escalations} escalated"
+            rows.append((f"{role} ({self.model(role)})", value))
+        return rows
@@ -0,0 +1,98 @@
+import json
+from dataclasses import dataclass
+
+from api_ninja.agents.routing import ROLES, _parse_assignments
+
+FORMATS = ("pretty", "compact")
+
+
+@dataclass(frozen=True, slots=True)
+class PromptFormat:
+    """
+    How JSON values (request payloads, response bodies, headers) are written into prompts.
+    "pretty" is indented JSON. "compact" is minified JSON with sorted keys, so identical data
+    always yields identical prompt text. Strings longer than `max_string` and arrays longer
+    than `max_items` are cut with an elision marker. Arrays of objects that share their keys
+    are written as a table: {"$columns": [...], "$rows": [[...], ...]}. "minified" is the
+    same JSON with sorted keys and nothing cut or reshaped.
+    """
+
+    name: str = "pretty"
+    max_string: int = 500
+    max_items: int = 20
+
+    def dumps(self, value) -> str:
+        if self.name == "pretty":
+            return json.dumps(value, indent=2, default=str)
+        return json.dumps(
+            value if self.name == "minified" else self._shrink(value),
+            separators=(",", ":"),
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+
+    def _shrink(self, value):
+        if isinstance(value, str):
+            if len(value) > self.max_string:
+                return f"{value[: self.max_string]}…[+{len(value) - self.max_string} chars]"
+            return value
+        if isinstance(value, dict):
+            return {str(key): self._shrink(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            items = [self._shrink(item) for item in value[: self.max_items]]
+            more = len(value) - len(items)
+            columns = _columns(items)
+            if columns is not None:
+                table = {"$columns": columns, "$rows": [[row[c] for c in columns] for row in items]}
+                if more:
+                    table["$more"] = more
+                return table
+            if more:
+                items.append(f"…[+{more} more items]")
+            return items
+        return value
+
+
+def _columns(items: list) -> list[str] | None:
+    """The shared, sorted keys of a list of at least two objects, or None."""
+    if len(items) < 2 or not all(isinstance(item, dict) for item in items):
+        return None
+    keys = set(items[0])
+    if not keys or any(set(item) != keys for item in items[1:]):
+        return None
+    return sorted(keys)
+
+
+PRETTY = PromptFormat()
+COMPACT = PromptFormat("compact")
+MINIFIED = PromptFormat("minified")
+
+
+def memory_format(prompt_format: PromptFormat) -> PromptFormat:
+    """
+    The format MemoryStore records responses in for a generator using `prompt_format`. The
+    generator copies ids and tokens out of memory, so compact becomes minified: nothing in it
+    may be cut.
+    """
+    return PRETTY if prompt_format.name == "pretty" else MINIFIED
+
+
+def parse_prompt_formats(specs=()) -> dict[str, PromptFormat]:
+    """
+    Builds {role: PromptFormat} from "role=format" strings; a bare format ("compact")
+    applies to every role.
+    """
+    names = {}
+    for spec in specs:
+        if "=" in spec:
+            names.update(_parse_assignments([spec], "FORMAT"))
+        else:
+            names.update({role: spec.strip() for role in ROLES})
+    formats = {}
+    for role, name in names.items():
+        name = name.lower()
+        if name not in FORMATS:
+            raise ValueError(f"expected a prompt format in {', '.join(FORMATS)}, got {name!r}")
+        formats[role] = PRETTY if name == "pretty" else COMPACT
+    return formats
@@ -0,0 +1,243 @@
+import base64
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from api_ninja.templates import UnresolvedBinding, lookup
+
+_ENV_VAR = re.compile(r"\$\{(\w+)\}")
+
+
+class AuthError(Exception):
+    pass
+
+
+def expand_env(value):
+    """Replaces ${NAME} with the environment variable NAME in every string of `value`."""
+    if isinstance(value, str):
+
+        def replace(match):
+            name = match.group(1)
+            if name not in os.environ:
+                raise AuthError(f"Environment variable {name} is not set")
+            return os.environ[name]
+
+        return _ENV_VAR.sub(replace, value)
+    if isinstance(value, dict):
+        return {key: expand_env(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand_env(item) for item in value]
+    return value
+
+
+def _body_value(body, expression: str):
+    """Evaluates a JSONPath like "$.data.access_token" (or "data.access_token") on a body."""
+    if not expression.startswith("$"):
+        expression = "$." + expression
+    try:
+        return lookup("$.steps[0].body" + expression[1:], [{"body": body}])
+    except UnresolvedBinding:
+        return None
+
+
+@dataclass(slots=True)
+class Token:
+    value: str
+    expires_at: float | None = None
+
+
+class AuthManager:
+    """
+    Authenticates requests on behalf of every flow in a run. Schemes come from the spec's
+    `securitySchemes`, credentials from an auth config keyed by scheme name; an entry may also
+    describe a scheme the spec does not declare (`type`, `in`, `name`, `scheme`), which then
+    applies to every request. Tokens that have to be fetched (OAuth2 token URLs or a `login`
+    request) are fetched once, shared by all flows and refreshed shortly before they expire.
+    """
+
+    def __init__(
+        self,
+        openapi_spec: dict,
+        credentials: dict,
+        api_base_url: str,
+        refresh_margin: float = 30.0,
+    ):
+        declared = openapi_spec.get("components", {}).get("securitySchemes", {})
+        self.openapi_spec = openapi_spec
+        self.api_base_url = api_base_url.rstrip("/")
+        self.refresh_margin = refresh_margin
+        self.credentials = expand_env(credentials or {})
+        self.schemes = {}
+        for name, entry in self.credentials.items():
+            scheme = {**declared.get(name, {}), **entry}
+            if "type" not in scheme:
+                raise AuthError(f"Auth scheme {name!r} is not in the spec and has no type")
+            self.schemes[name] = scheme
+        # Schemes only the auth config knows about apply to every operation.
+        self.global_schemes = [name for name in self.schemes if name not in declared]
+        self._tokens: dict[str, Token] = {}
+        self._locks = {name: threading.Lock() for name in self.schemes}
+        self._requirements: dict[tuple[str, str], list[str]] = {}
+        self.fetches = 0
+
+    @classmethod
+    def load(cls, path: str, openapi_spec: dict, api_base_url: str) -> "AuthManager":
+        import yaml
+
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+        refresh_margin = float(config.pop("refresh_margin", 30.0))
+        return cls(openapi_spec, config, api_base_url, refresh_margin=refresh_margin)
+
+    def reset(self):
+        """Forgets fetched tokens, so the next run authenticates afresh."""
+        self._tokens.clear()
+
+    def describe(self) -> str:
+        """The note that tells the agents authentication is taken care of."""
+        names = ", ".join(
+            f"{name} ({self._location(scheme)})" for name, scheme in self.schemes.items()
+        )
+        return (
+            "Authentication:\n"
+            f"Requests are authenticated automatically with {names}. Do not plan login or token "
+            "requests and do not add credentials to headers or parameters yourself, unless the "
+            "flow is testing authentication itself."
+        )
+
+    def _location(self, scheme: dict) -> str:
+        if scheme["type"] == "apiKey":
+            return f"{scheme.get('in', 'header')} {scheme.get('name')}"
+        return "Authorization header"
+
+    def requirement(self, path: str, method: str) -> list[str]:
+        """
+        The configured schemes to apply to an operation: the first of its security
+        requirements (or the spec's global ones) that the auth config can satisfy.
+        """
+        key = (path, method.lower())
+        if key not in self._requirements:
+            operation = self.openapi_spec.get("paths", {}).get(path, {}).get(method.lower())
+            requirements = (operation or {}).get("security")
+            if requirements is None:
+                requirements = self.openapi_spec.get("security", [])
+            chosen = []
+            for requirement in requirements:
+                if requirement and all(name in self.schemes for name in requirement):
+                    chosen = list(requirement)
+                    break
+            self._requirements[key] = chosen + [
+                name for name in self.global_schemes if name not in chosen
+            ]
+        return self._requirements[key]
+
+    def apply(
+        self,
+        path: str,
+        method: str,
+        headers: dict,
+        params: dict,
+        session,
+        timeout: float | None = None,
+    ) -> tuple[dict, dict, dict]:
+        """
+        Returns (headers, params, cookies) with the operation's credentials added. Credentials
+        the request already carries (a flow sending a deliberately bad token) are left alone.
+        """
+        headers = dict(headers or {})
+        params = dict(params or {})
+        cookies = {}
+        present = {name.lower() for name in headers}
+        for name in self.requirement(path, method):
+            scheme = self.schemes[name]
+            if scheme["type"] == "apiKey":
+                location = scheme.get("in", "header")
+                key = scheme["name"]
+                if location == "header" and key.lower() not in present:
+                    headers[key] = self._token(name, session, timeout)
+                elif location == "query" and key not in params:
+                    params[key] = self._token(name, session, timeout)
+                elif location == "cookie":
+                    cookies[key] = self._token(name, session, timeout)
+            elif "authorization" not in present:
+                headers["Authorization"] = self._authorization(name, scheme, session, timeout)
+                present.add("authorization")
+        return headers, params, cookies
+
+    def _authorization(self, name: str, scheme: dict, session, timeout) -> str:
+        if scheme["type"] == "http" and scheme.get("scheme", "").lower() == "basic":
+            pair = f"{scheme['username']}:{scheme['password']}".encode("utf-8")
+            return "Basic " + base64.b64encode(pair).decode("ascii")
+        prefix = scheme.get("scheme", "bearer") if scheme["type"] == "http" else "bearer"
+        return f"{prefix.capitalize()} {self._token(name, session, timeout)}"
+
+    def _token(self, name: str, session, timeout: float | None) -> str:
+        token = self._tokens.get(name)
+        if token is not None and not self._expiring(token):
+            return token.value
+        with self._locks[name]:
+            # Another flow may have fetched it while this one waited.
+            token = self._tokens.get(name)
+            if token is None or self._expiring(token):
+                token = self._tokens[name] = self._fetch(name, session, timeout)
+                self.fetches += 1
+            return token.value
+
+    def _expiring(self, token: Token) -> bool:
+        if token.expires_at is None:
+            return False
+        return token.expires_at - self.refresh_margin <= time.time()
+
+    def _fetch(self, name: str, session, timeout: float | None) -> Token:
+        scheme = self.schemes[name]
+        static = scheme.get("token", scheme.get("value"))
+        if static is not None:
+            return Token(str(static))
+        if "login" in scheme:
+            return self._login(name, scheme["login"], session, timeout)
+        token_url = scheme.get("token_url")
+        grants = scheme.get("flows", {})
+        grant = "password" if "username" in scheme else "clientCredentials"
+        token_url = token_url or grants.get(grant, {}).get("tokenUrl")
+        if scheme["type"] in ("oauth2", "openIdConnect") and token_url:
+            data = {
+                "grant_type": "password" if grant == "password" else "client_credentials",
+                "client_id": scheme.get("client_id"),
+                "client_secret": scheme.get("client_secret"),
+                "scope": " ".join(scheme["scopes"]) if "scopes" in scheme else None,
+                "username": scheme.get("username"),
+                "password": scheme.get("password"),
+            }
+            data = {key: value for key, value in data.items() if value is not None}
+            login = {"method": "POST", "path": token_url, "data": data}
+            return self._login(name, login, session, timeout)
+        raise AuthError(f"Auth scheme {name!r} needs a token, value, login or token URL")
+
+    def _login(self, name: str, login: dict, session, timeout: float | None) -> Token:
+        path = login["path"]
+        url = path if "://" in path else f"{self.api_base_url}/{path.lstrip('/')}"
+        resp = session.request(
+            login.get("method", "POST").upper(),
+            url,
+            json=login.get("json"),
+            data=login.get("data"),
+            headers=login.get("headers"),
+            timeout=timeout,
+        )
+        try:
+            body = resp.json()
+        except ValueError:
+            body = resp.text
+        if resp.status_code >= 400:
+            raise AuthError(f"Authenticating {name} failed with HTTP {resp.status_code}: {body}")
+        value = _body_value(body, login.get("token", "$.access_token"))
+        if value is None:
+            expression = login.get("token", "$.access_token")
+            raise AuthError(f"Authenticating {name}: {expression} is not in the response {body}")
+        expires_in = login.get("expires_in", "$.expires_in")
+        if isinstance(expires_in, str):
+            expires_in = _body_value(body, expires_in)
+        expires_at = time.time() + float(expires_in) if expires_in is not None else None
+        return Token(str(value), expires_at)
@@ -0,0 +1,428 @@
+import importlib
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from api_ninja.agents.base import UsageTracker
+from api_ninja.agents.flow_generator import (
+    DEFAULT_SCENARIOS,
+    FlowGeneratorAgent,
+    _mean_score,
+    collection_name,
+    flows_config,
+    generation_input,
+    regenerate_instructions,
+    score_instructions,
+)
+from api_ninja.agents.parsing import output_schema
+from api_ninja.cache import fingerprint
+from api_ninja.models import FlowModel, FlowScoreModel
+from api_ninja.openapi import HTTP_METHODS, slice_operation
+
+# Batch states after which nothing more will happen to a batch.
+FINISHED = ("completed", "expired", "failed", "cancelled")
+
+
+class BatchError(Exception):
+    pass
+
+
+def batch_request(
+    custom_id: str, model: str, instructions: str, input: str, output_type, name: str
+) -> dict:
+    """
+    One line of a batch: a chat completion whose structured output is `output_type`, in the
+    shape the OpenAI batch API takes (without its method and url).
+    """
+    schema = output_schema(output_type)
+    return {
+        "custom_id": custom_id,
+        "body": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": input},
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": name,
+                    "schema": schema.json_schema(),
+                    "strict": schema.is_strict_json_schema(),
+                },
+            },
+        },
+    }
+
+
+def _completion_result(body: dict) -> dict:
+    usage = body.get("usage") or {}
+    return {
+        "content": body["choices"][0]["message"]["content"],
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+    }
+
+
+class BatchBackend(ABC):
+    """
+    Runs a list of batch_request() lines as one job. `submit` returns a batch id, `status`
+    its state (done once in FINISHED) and `results` maps each custom_id to {"content",
+    "input_tokens", "output_tokens"}, or {"error"} for a request that failed.
+    """
+
+    @abstractmethod
+    def submit(self, requests: list[dict], description: str = "") -> str: ...
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str: ...
+
+    @abstractmethod
+    def results(self, batch_id: str) -> dict[str, dict]: ...
+
+    def has(self, batch_id: str) -> bool:
+        """Whether a batch submitted earlier (e.g. by an interrupted run) can still be polled."""
+        return True
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """The OpenAI Batch API: requests are uploaded as a JSONL file and run within 24 hours."""
+
+    def __init__(self, client=None, completion_window: str = "24h"):
+        self._client = client
+        self.completion_window = completion_window
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI()
+        return self._client
+
+    def submit(self, requests: list[dict], description: str = "") -> str:
+        lines = [
+            json.dumps({**request, "method": "POST", "url": "/v1/chat/completions"})
+            for request in requests
+        ]
+        upload = self.client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+            metadata={"description": description[:512]},
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> dict[str, dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code") != 200:
+                    error = record.get("error") or response.get("body", {}).get("error")
+                    results[record["custom_id"]] = {"error": str(error)}
+                else:
+                    results[record["custom_id"]] = _completion_result(response["body"])
+        if not results and batch.status != "completed":
+            raise BatchError(f"Batch {batch_id} {batch.status}: {batch.errors}")
+        return results
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Runs a batch right away with interactive calls, `workers` at a time. `complete(body)`
+    returns the completion for one request body (as a dict); the default calls the OpenAI
+    chat completions API. Batches live in memory, so a resumed run submits a checkpointed
+    batch that never finished again.
+    """
+
+    def __init__(self, complete: Callable[[dict], dict] | None = None, workers: int = 4):
+        self.complete = complete or self._complete
+        self.workers = workers
+        self._batches: dict[str, dict[str, dict]] = {}
+
+    def _complete(self, body: dict) -> dict:
+        from openai import OpenAI
+
+        return OpenAI().chat.completions.create(**body).model_dump()
+
+    def _run(self, request: dict) -> dict:
+        try:
+            return _completion_result(self.complete(request["body"]))
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def submit(self, requests: list[dict], description: str = "") -> str:
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            outputs = list(pool.map(self._run, requests))
+        batch_id = f"local-{uuid.uuid4().hex}"
+        self._batches[batch_id] = {
+            request["custom_id"]: output for request, output in zip(requests, outputs)
+        }
+        return batch_id
+
+    def has(self, batch_id: str) -> bool:
+        return batch_id in self._batches
+
+    def status(self, batch_id: str) -> str:
+        return "completed" if batch_id in self._batches else "expired"
+
+    def results(self, batch_id: str) -> dict[str, dict]:
+        if batch_id not in self._batches:
+            raise BatchError(f"Batch {batch_id} is not in this process any more")
+        return self._batches[batch_id]
+
+
+BATCH_BACKENDS = {"openai": OpenAIBatchBackend, "local": LocalBatchBackend}
+
+
+def load_backend(name: str) -> BatchBackend:
+    """A backend by name ("openai", "local") or as "package.module:ClassName"."""
+    if name in BATCH_BACKENDS:
+        return BATCH_BACKENDS[name]()
+    module, sep, attribute = name.partition(":")
+    if not sep:
+        choices = ", ".join(BATCH_BACKENDS)
+        raise ValueError(f"expected one of {choices} or MODULE:CLASS, got {name!r}")
+    return getattr(importlib.import_module(module), attribute)()
+
+
+class BatchFlowGenerator:
+    """
+    Generates flows for a whole spec with batch jobs instead of interactive calls: one batch
+    generates every endpoint's flows, a second scores them, and each of `rounds` further
+    pairs of batches regenerates and rescores the flows below `threshold`, stopping early
+    like self_correct_flows when a round improves their mean score by less than
+    `min_improvement`. Flows that never reach the threshold are dropped.
+
+    Batch ids and raw results are kept in a checkpoint file as soon as they exist, so an
+    interrupted run picks up where it stopped: it polls a batch that was already submitted
+    and does not pay for a finished one again.
+    """
+
+    def __init__(
+        self,
+        agent: FlowGeneratorAgent,
+        backend: BatchBackend,
+        checkpoint: str,
+        scenarios: List[str] = DEFAULT_SCENARIOS,
+        threshold: float = 0.9,
+        rounds: int = 3,
+        min_improvement: float = 0.05,
+        poll_interval: float = 30.0,
+    ):
+        self.agent = agent
+        self.backend = backend
+        self.checkpoint = checkpoint
+        self.router = agent.router
+        self.scenarios = scenarios
+        self.threshold = threshold
+        self.rounds = rounds
+        self.min_improvement = min_improvement
+        self.poll_interval = poll_interval
+        self.usage = {"flow_generator": UsageTracker(), "scorer": UsageTracker()}
+        self.openapi_spec = {}
+        self.state = {}
+
+    def _load(self) -> dict:
+        spec_hash = fingerprint(self.openapi_spec)
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+            if state.get("spec") == spec_hash:
+                print(f"Resuming from {self.checkpoint}...")
+                return state
+            print(f"{self.checkpoint} is for a different spec; starting over.")
+        return {"spec": spec_hash, "batches": {}, "results": {}}
+
+    def _save(self):
+        temporary = f"{self.checkpoint}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.state, f)
+        os.replace(temporary, self.checkpoint)
+
+    def endpoints(self) -> list[tuple[str, str]]:
+        return [
+            (method, path)
+            for path, methods in self.openapi_spec.get("paths", {}).items()
+            for method in methods
+            if method.lower() in HTTP_METHODS
+        ]
+
+    def stage(self, name: str, role: str, requests: list[dict]) -> dict[str, dict]:
+        """Runs one batch (or reuses its checkpointed results) and returns its results."""
+        if not requests:
+            return {}
+        results = self.state["results"].get(name)
+        if results is None:
+            batch_id = self.state["batches"].get(name)
+            if batch_id is not None and not self.backend.has(batch_id):
+                print(f"Batch {batch_id} ({name}) is gone; submitting it again...")
+                batch_id = None
+            if batch_id is None:
+                print(f"Submitting {len(requests)} requests for {name}...")
+                batch_id = self.backend.submit(requests, description=f"api-ninja {name}")
+                self.state["batches"][name] = batch_id
+                self._save()
+            status = self.backend.status(batch_id)
+            while status not in FINISHED:
+                print(f"Batch {batch_id} ({name}) is {status}; checking again shortly...")
+                time.sleep(self.poll_interval)
+                status = self.backend.status(batch_id)
+            if status == "failed":
+                raise BatchError(f"Batch {batch_id} ({name}) failed")
+            results = self.state["results"][name] = self.backend.results(batch_id)
+            self._save()
+        for result in results.values():
+            self.usage[role].requests += 1
+            self.usage[role].input_tokens += result.get("input_tokens", 0)
+            self.usage[role].output_tokens += result.get("output_tokens", 0)
+        return results
+
+    def _parse(self, result: dict | None, output_type, what: str) -> list:
+        if result is None or "error" in result:
+            print(f"Error for {what}: {(result or {}).get('error', 'no result')}")
+            return []
+        try:
+            return output_schema(output_type).validate_json(result["content"])
+        except ValueError as e:
+            print(f"Error for {what}: {e}")
+            return []
+
+    def _score(self, name: str, flows: dict[str, List[FlowModel]]) -> dict[str, dict]:
+        """Scores each endpoint's flows in one batch: {endpoint: {flow id: FlowScoreModel}}."""
+        model = self.router.model("scorer")
+        requests = []
+        for key, endpoint_flows in flows.items():
+            if endpoint_flows:
+                method, path = key.split(" ", 1)
+                operation_spec = slice_operation(self.openapi_spec, method, path)
+                instructions = score_instructions(endpoint_flows, method, path, operation_spec)
+                requests.append(
+                    batch_request(
+                        key, model, instructions, "Score the flows.", List[FlowScoreModel], "scores"
+                    )
+                )
+        results = self.stage(name, "scorer", requests)
+        return {
+            key: {
+                score.id: score
+                for score in self._parse(results.get(key), List[FlowScoreModel], f"scoring {key}")
+            }
+            for key in flows
+        }
+
+    def generate_flows_for_spec(self, openapi_spec: dict, on_collection=None) -> dict:
+        """Same contract as FlowGeneratorAgent.generate_flows_for_spec."""
+        self.openapi_spec = openapi_spec
+        self.state = self._load()
+        endpoints = self.endpoints()
+        print(f"Found {len(endpoints)} operations in the OpenAPI spec.")
+        model = self.router.model("flow_generator")
+        requests = []
+        for method, path in endpoints:
+            scenarios = "\n".join(self.scenarios)
+            instructions = self.agent.prompt(method, path, self.openapi_spec, scenarios)
+            requests.append(
+                batch_request(
+                    f"{method.upper()} {path}",
+                    model,
+                    instructions,
+                    generation_input(method, path),
+                    List[FlowModel],
+                    "flows",
+                )
+            )
+        results = self.stage("generation", "flow_generator", requests)
+        generated = {
+            key: self._parse(results.get(key), List[FlowModel], f"generating {key}")
+            for key in (request["custom_id"] for request in requests)
+        }
+
+        scores = self._score("scoring", generated)
+        best = {}
+        for key, flows in generated.items():
+            best[key] = {}
+            for flow in flows:
+                score = scores[key].get(flow.id) or FlowScoreModel(
+                    id=flow.id, score=0.0, feedback="The reviewer did not score this flow."
+                )
+                best[key][flow.id] = (flow, score)
+
+        pending = {
+            key: [flow_id for flow_id, (_, score) in pairs.items() if score.score < self.threshold]
+            for key, pairs in best.items()
+        }
+        previous = {key: _mean_score(best[key], flow_ids) for key, flow_ids in pending.items()}
+        for round_number in range(1, self.rounds + 1):
+            pending = {key: flow_ids for key, flow_ids in pending.items() if flow_ids}
+            if not pending:
+                break
+            requests = []
+            for key, flow_ids in pending.items():
+                method, path = key.split(" ", 1)
+                operation_spec = slice_operation(self.openapi_spec, method, path)
+                failed = [best[key][flow_id] for flow_id in flow_ids]
+                instructions = regenerate_instructions(
+                    method, path, self.openapi_spec, operation_spec, failed
+                )
+                requests.append(
+                    batch_request(
+                        key,
+                        model,
+                        instructions,
+                        "Regenerate the improved flows.",
+                        List[FlowModel],
+                        "flows",
+                    )
+                )
+            results = self.stage(f"regeneration {round_number}", "flow_generator", requests)
+            improved = {}
+            for key, flow_ids in pending.items():
+                flows = self._parse(results.get(key), List[FlowModel], f"regenerating {key}")
+                improved[key] = [flow for flow in flows if flow.id in flow_ids]
+            new_scores = self._score(f"rescoring {round_number}", improved)
+            for key, flows in improved.items():
+                for flow in flows:
+                    score = new_scores[key].get(flow.id)
+                    if score is not None and score.score > best[key][flow.id][1].score:
+                        best[key][flow.id] = (flow, score)
+                current = _mean_score(best[key], pending[key])
+                still = [i for i in pending[key] if best[key][i][1].score < self.threshold]
+                if not flows or (still and current - previous[key] < self.min_improvement):
+                    print(f"Scores for {key} stopped improving, giving up on {len(still)} flows.")
+                    still = []
+                pending[key] = still
+                previous[key] = current
+
+        collections = {}
+        flow_restructured = {}
+        for method, path in endpoints:
+            key = f"{method.upper()} {path}"
+            kept = [flow for flow, score in best[key].values() if score.score >= self.threshold]
+            name = collection_name(method, path)
+            description = f"Flows for {key}"
+            restructured = flows_config(kept)
+            print(f"Kept {len(kept)} of {len(best[key])} flows for {key}.")
+            if on_collection is not None:
+                on_collection(name, description, restructured)
+            else:
+                collections[name] = {"flows": list(restructured), "description": description}
+                flow_restructured.update(restructured)
+        return {"flows": flow_restructured, "collections": collections}
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import threading
+from urllib.parse import urlsplit
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Headers that identify the client or the request rather than select a representation,
+# so they must not split the cache.
+IGNORED_HEADERS = {
+    "user-agent",
+    "content-length",
+    "content-type",
+    "connection",
+    "x-request-id",
+    "x-correlation-id",
+    "traceparent",
+    "tracestate",
+}
+
+
+def fingerprint(obj) -> str:
+    text = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def resource_root(path: str, template: str | None = None) -> str:
+    """
+    The resource a request path belongs to: its operation template's literal segments before
+    the first parameter ("/v1/users/{id}/tags" -> "/v1/users"), or the whole path when no
+    template matched. `path` is relative to the API base URL, so a base path such as "/api"
+    is never part of it.
+    """
+    segments = []
+    for segment in (template or path).split("?", 1)[0].split("/"):
+        if "{" in segment:
+            break
+        if segment:
+            segments.append(segment)
+    return "/" + "/".join(segments)
+
+
+def _overlaps(root: str, other: str) -> bool:
+    """Whether one root contains the other ("/users" and "/users/me", but not "/orders")."""
+    return (
+        root == other
+        or other.startswith(root.rstrip("/") + "/")
+        or root.startswith(other.rstrip("/") + "/")
+    )
+
+
+class ResponseCache:
+    """
+    Opt-in cache of responses to safe (idempotent) requests, keyed by method, resolved URL,
+    sorted query parameters, the headers that can change the response and the auth schemes
+    that will be added to the request.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, tuple[str, int, object]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(
+        method: str,
+        url: str,
+        params: dict,
+        headers: dict,
+        scope: str = "",
+        credentials: list[str] | None = None,
+    ) -> str:
+        relevant = {
+            name.lower(): value
+            for name, value in (headers or {}).items()
+            if name.lower() not in IGNORED_HEADERS
+        }
+        return fingerprint(
+            [
+                scope,
+                method.upper(),
+                url,
+                sorted((params or {}).items()),
+                sorted(relevant.items()),
+                sorted(credentials or []),
+            ]
+        )
+
+    def get(self, key: str) -> tuple[int, object] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: str, root: str, status: int, body):
+        with self._lock:
+            self._entries[key] = (root, status, body)
+
+    def invalidate(self, root: str):
+        """Drops every cached read under `root`, or of a resource that contains it."""
+        with self._lock:
+            self._entries = {
+                key: entry for key, entry in self._entries.items() if not _overlaps(root, entry[0])
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class VerdictCache:
+    """
+    Memoizes evaluator verdicts for identical (request, response, response check) triples.
+    """
+
+    def __init__(self):
+        self._verdicts: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(result) -> str:
+        return fingerprint(
+            [
+                result.method.upper(),
+                result.path,
+                result.headers,
+                result.payload,
+                result.parameters,
+                result.status,
+                result.body,
+                result.expected_status,
+                result.response_check,
+                result.probe,
+            ]
+        )
+
+    def get(self, key: str):
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return verdict
+
+    def put(self, key: str, verdict):
+        with self._lock:
+            self._verdicts[key] = verdict
+
+
+class PlanCache:
+    """
+    Memoizes plans for identical (flow context, spec shown to the planner, plan mode), for
+    processes that run the same flows again and again, such as `api-ninja serve`.
+    """
+
+    def __init__(self):
+        self._plans: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(context: str, openapi_spec: dict, templates: bool) -> str:
+        return fingerprint([context, openapi_spec, templates])
+
+    def get(self, key: str):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return plan
+
+    def put(self, key: str, plan):
+        with self._lock:
+            self._plans[key] = plan
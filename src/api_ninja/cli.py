@@ -1,11 +1,12 @@
 import json
 import logging
+import os
+import re
 import sys
 import time
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import click
-import requests
 import yaml
 from rich.console import Console
 from rich.panel import Panel
@@ -18,8 +19,11 @@ from rich.progress import (
 )
 from rich.table import Table
 
-from api_ninja.agents.flow_generator import FlowGeneratorAgent
-from api_ninja.core import APINinja
+from api_ninja.flowstore import is_flow_store, load_flows, select_flows
+from api_ninja.history import DEFAULT_HISTORY_PATH
+
+# Same as api_ninja.daemon.DEFAULT_SOCKET_PATH, which is not imported here to keep start-up fast.
+DEFAULT_SOCKET_PATH = os.path.join(".api-ninja", "daemon.sock")
 
 console = Console()
 
@@ -28,24 +32,113 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("openai").setLevel(logging.WARNING)
 
 
-def load_config(path: str) -> dict:
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
+def load_openapi_spec(url: str | None, path: str | None) -> dict:
+    spec = {}
+    if url:
+        import requests
 
+        spec = requests.get(url).json()
+    if path:
+        with open(path, "r") as f:
+            if path.endswith(".json"):
+                spec = json.load(f)
+            else:
+                spec = yaml.safe_load(f)
+    return spec
 
-def collect_flows(cfg: dict) -> dict[str, dict]:
-    defaults = cfg.get("defaults", [])
-    out = {}
-    for coll_name, coll in cfg["collections"].items():
-        for flow_id in coll["flows"]:
-            flow = dict(cfg["flows"][flow_id])
-            flow.update(
-                flow_id=flow_id,
-                collection=coll_name,
-                defaults=defaults,
-            )
-            out[flow_id] = flow
-    return out
+
+def print_summary(total: int, passed: int, total_time: float, extra_rows=(), label="Flows"):
+    console.rule("🔎  Summary", style="cyan")
+    summary = Table(show_edge=False, header_style="bold")
+    summary.add_column("Metric", style="bold")
+    summary.add_column("Value", justify="right")
+    summary.add_row(f"Total {label}", str(total))
+    summary.add_row("Passed", f"[green]{passed}[/green]")
+    summary.add_row("Failed", f"[red]{total - passed}[/red]")
+    summary.add_row("Total Time", f"{total_time:.2f}s")
+    for name, value in extra_rows:
+        summary.add_row(name, value)
+    console.print(summary)
+    console.rule()
+
+
+def _seconds(value: float | None) -> str:
+    if value is None:
+        return "—"
+    minutes, seconds = divmod(int(value), 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m{seconds:02d}s"
+
+
+def render_dashboard(snap):
+    """Rich renderable for `run-all --live`, built from a MetricsCollector snapshot."""
+    from rich.console import Group
+
+    def ms(value):
+        return "—" if value is None else f"{value:,.0f} ms"
+
+    header = Table.grid(padding=(0, 3))
+    header.add_row(
+        f"[bold]{snap.done}/{snap.total}[/bold] flows",
+        f"[red]{snap.failed} failed[/red]",
+        f"elapsed {_seconds(snap.elapsed_s)}",
+        f"ETA {_seconds(snap.eta_s)}",
+        f"{snap.tokens_per_minute:,.0f} tokens/min",
+    )
+    header.add_row(
+        f"LLM p50 {ms(snap.llm_p50_ms)}",
+        f"p95 {ms(snap.llm_p95_ms)}",
+        f"HTTP p50 {ms(snap.http_p50_ms)}",
+        f"p95 {ms(snap.http_p95_ms)}",
+        f"{snap.tokens:,} tokens",
+    )
+
+    in_flight = Table(title="In flight", title_justify="left", expand=True)
+    in_flight.add_column("Flow", style="cyan")
+    in_flight.add_column("Phase")
+    in_flight.add_column("Elapsed", justify="right")
+    for flow_id, phase, elapsed in snap.in_flight:
+        in_flight.add_row(flow_id, phase, _seconds(elapsed))
+
+    statuses = Table(title="Responses by endpoint", title_justify="left", expand=True)
+    statuses.add_column("Endpoint")
+    statuses.add_column("Statuses")
+    for endpoint, counts in sorted(snap.statuses.items()):
+        cells = []
+        for status, count in sorted(counts.items(), key=lambda item: str(item[0])):
+            color = "green" if status and status < 400 else "red"
+            cells.append(f"[{color}]{status}[/{color}]×{count}")
+        statuses.add_row(endpoint, "  ".join(cells))
+
+    return Group(header, in_flight, statuses)
+
+
+def print_flow_panel(flow_id: str, collection: str, status: str, error, retried: bool = False):
+    output = error or "[dim]— Success —[/dim]"
+    icon = "✅" if status == "PASS" else "⏱️" if status == "TIMEOUT" else "❌"
+    title = f"🧪 {flow_id}  {icon}"
+    if retried:
+        title += "  [dim](flaky, retried)[/dim]"
+    panel = Panel(
+        f"\n{output}\n",
+        title=title,
+        subtitle=f"[yellow]{collection}[/yellow]",
+        border_style="green" if status == "PASS" else "red",
+        style="bright_white",
+        expand=False,
+    )
+    console.print(panel)
+    console.print()  # blank line
+    console.print()
+
+
+def write_results(results: list, path: str):
+    from api_ninja.results import write_arrow, write_jsonl
+
+    if path.endswith(".arrow"):
+        write_arrow(results, path)
+    else:
+        with open(path, "w") as f:
+            write_jsonl(results, f)
 
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
@@ -56,7 +149,12 @@ def cli(ctx):
 
 
 @cli.command("run-all")
-@click.option("-c", "--config", default="config.yaml", help="Path to config.yaml")
+@click.option(
+    "-c",
+    "--config",
+    default="config.yaml",
+    help="Path to config.yaml or a .jsonl flow file",
+)
 @click.option("--openapi-spec-url", help="URL to fetch OpenAPI spec from")
 @click.option(
     "--openapi-spec-path",
@@ -67,102 +165,585 @@ def cli(ctx):
     "--base-url",
     help="Base URL for the API (overrides config.yaml)",
 )
+@click.option(
+    "--cache-responses",
+    is_flag=True,
+    help="Reuse responses to identical GET/HEAD/OPTIONS requests",
+)
+@click.option(
+    "--cache-scope",
+    type=click.Choice(["run", "collection"]),
+    default="run",
+    show_default=True,
+    help="Share cached responses across the whole run or only within a collection",
+)
+@click.option(
+    "--cache-verdicts",
+    is_flag=True,
+    help="Reuse evaluator verdicts for identical request, response and check",
+)
+@click.option(
+    "--plan-mode",
+    type=click.Choice(["step", "combined"]),
+    default="step",
+    show_default=True,
+    help="Plan requests one step at a time, or plan them all up front with bindings",
+)
+@click.option(
+    "--pipeline",
+    is_flag=True,
+    help="Generate each step's request while the previous step is being evaluated",
+)
+@click.option(
+    "--candidate-operations",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Show the planner only the K operations that best match each flow, plus their "
+    "dependencies (0: the whole spec)",
+)
+@click.option(
+    "--prompt-format",
+    "prompt_format_specs",
+    multiple=True,
+    metavar="[ROLE=]FORMAT",
+    help="How JSON is written into generator/evaluator prompts: pretty (default) or compact; "
+    "repeatable",
+)
+@click.option(
+    "--auth",
+    "auth_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="YAML credentials per security scheme; requests are authenticated once per run",
+)
+@click.option(
+    "--results-out",
+    type=click.Path(),
+    help="Write per-flow and per-step results to a .jsonl or .arrow file",
+)
+@click.option(
+    "-n",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of flows to run in parallel",
+)
+@click.option(
+    "--history-db",
+    default=DEFAULT_HISTORY_PATH,
+    show_default=True,
+    help="SQLite run history used for ordering, flaky retries and `api-ninja history`",
+)
+@click.option("--no-history", is_flag=True, help="Do not read or record run history")
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    envvar="APININJA_CHANGED_ONLY",
+    help="Only run flows whose inputs changed or that failed last run",
+)
+@click.option(
+    "--phase-timeout",
+    "phase_timeouts",
+    multiple=True,
+    metavar="PHASE=SECONDS",
+    help="Deadline for http, llm, step, flow or run (defaults: http=30 llm=120); repeatable",
+)
+@click.option(
+    "--model",
+    "model_specs",
+    multiple=True,
+    metavar="ROLE=MODEL",
+    help="Model for planner, generator or evaluator (default: LLM_MODEL); repeatable",
+)
+@click.option(
+    "--escalation-model",
+    "escalation_specs",
+    multiple=True,
+    metavar="[ROLE=]MODEL",
+    help="Retry unparseable or inconclusive outputs once on this model; repeatable",
+)
+@click.option("--flow", "flow_ids", multiple=True, help="Only run this flow; repeatable")
+@click.option(
+    "--collection", "collections", multiple=True, help="Only run this collection; repeatable"
+)
+@click.option(
+    "--via-daemon",
+    is_flag=True,
+    help="Run on a warm `api-ninja serve` daemon instead of in this process",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    default=DEFAULT_SOCKET_PATH,
+    show_default=True,
+    help="Unix socket of the daemon used by --via-daemon",
+)
+@click.option(
+    "--live",
+    is_flag=True,
+    help="Show a live dashboard of in-flight flows, latency, tokens/min, statuses and ETA",
+)
+@click.option(
+    "--metrics-port",
+    type=int,
+    help="Serve Prometheus metrics for the run on http://127.0.0.1:PORT/metrics",
+)
 @click.pass_context
-def run_all(ctx, config, openapi_spec_url, openapi_spec_path, base_url):
+def run_all(
+    ctx,
+    config,
+    openapi_spec_url,
+    openapi_spec_path,
+    base_url,
+    cache_responses,
+    cache_scope,
+    cache_verdicts,
+    plan_mode,
+    pipeline,
+    candidate_operations,
+    prompt_format_specs,
+    auth_path,
+    results_out,
+    workers,
+    history_db,
+    no_history,
+    changed_only,
+    live,
+    metrics_port,
+    phase_timeouts,
+    model_specs,
+    escalation_specs,
+    flow_ids,
+    collections,
+    via_daemon,
+    socket_path,
+):
+    if no_history:
+        history_db = None
+    if changed_only and not history_db:
+        raise click.UsageError("--changed-only needs run history; drop --no-history")
     if not openapi_spec_url and not openapi_spec_path:
         raise click.UsageError("Either --openapi-spec-url or --openapi-spec-path must be provided")
     if not base_url:
         raise click.UsageError("Base URL must be provided using --base-url")
-    cfg = load_config(config)
-    spec = {}
-    if openapi_spec_url:
-        spec = requests.get(openapi_spec_url).json()
-    if openapi_spec_path:
-        with open(openapi_spec_path, "r") as f:
-            if openapi_spec_path.endswith(".json"):
-                spec = json.load(f)
-            else:
-                spec = yaml.safe_load(f)
-    ninja = APINinja(openapi_spec=spec, api_base_url=base_url)
-    flows = collect_flows(cfg)
+    if via_daemon:
+        if live or metrics_port or results_out:
+            raise click.UsageError("--live, --metrics-port and --results-out need a local run")
+        if no_history or history_db != DEFAULT_HISTORY_PATH:
+            raise click.UsageError("With --via-daemon, history is configured on `api-ninja serve`")
+        run_via_daemon(
+            socket_path,
+            {
+                "config": os.path.abspath(config),
+                "openapi_spec_path": openapi_spec_path and os.path.abspath(openapi_spec_path),
+                "openapi_spec_url": openapi_spec_url,
+                "base_url": base_url,
+                "flows": flow_ids,
+                "collections": collections,
+                "workers": workers,
+                "changed_only": changed_only,
+                "cache_responses": cache_responses,
+                "cache_scope": cache_scope,
+                "cache_verdicts": cache_verdicts,
+                "plan_mode": plan_mode,
+                "pipeline": pipeline,
+                "candidate_operations": candidate_operations,
+                "auth": auth_path and os.path.abspath(auth_path),
+                "prompt_formats": prompt_format_specs,
+                "phase_timeouts": phase_timeouts,
+                "model_specs": model_specs,
+                "escalation_specs": escalation_specs,
+            },
+        )
+        return
+    from api_ninja.agents.routing import ModelRouter
+    from api_ninja.core import APINinja
+    from api_ninja.timeouts import Timeouts
+
+    try:
+        timeouts = Timeouts.parse(phase_timeouts)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--phase-timeout")
+    try:
+        router = ModelRouter.parse(model_specs, escalation_specs)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--model/--escalation-model")
+    from api_ninja.agents.serialization import parse_prompt_formats
+
+    try:
+        prompt_formats = parse_prompt_formats(prompt_format_specs)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--prompt-format")
+    spec = load_openapi_spec(openapi_spec_url, openapi_spec_path)
+    auth = None
+    if auth_path:
+        from api_ninja.auth import AuthError, AuthManager
+
+        try:
+            auth = AuthManager.load(auth_path, spec, base_url)
+        except AuthError as e:
+            raise click.BadParameter(str(e), param_hint="--auth")
+    metrics = None
+    if live or metrics_port:
+        from api_ninja.metrics import MetricsCollector
+
+        metrics = MetricsCollector()
+    ninja = APINinja(
+        openapi_spec=spec,
+        api_base_url=base_url,
+        cache_responses=cache_responses,
+        cache_scope=cache_scope,
+        cache_verdicts=cache_verdicts,
+        plan_mode=plan_mode,
+        pipeline=pipeline,
+        candidate_operations=candidate_operations,
+        auth=auth,
+        prompt_formats=prompt_formats,
+        metrics=metrics,
+        timeouts=timeouts,
+        router=router,
+    )
+    try:
+        flows = select_flows(load_flows(config), flow_ids, collections)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--flow/--collection")
     ctx.obj = {"ninja": ninja, "flows": flows}
 
+    history = None
+    run_id = None
+    if history_db:
+        from api_ninja.history import RunHistory
+        from api_ninja.impact import changed_flows, record_flow_inputs
+
+        history = RunHistory(history_db)
+        run_id = history.start_run(config=os.path.abspath(config))
+        if changed_only:
+            changed = changed_flows(history, flows, spec)
+            console.print(
+                f"[cyan]--changed-only:[/cyan] running {len(changed)} of {len(flows)} flows"
+            )
+            for flow_id, reason in changed.items():
+                console.print(f"  • {flow_id} [dim]({reason})[/dim]")
+            flows = {flow_id: flows[flow_id] for flow_id in changed}
+        flows = {flow_id: flows[flow_id] for flow_id in history.order(list(flows))}
+
     ninja = ctx.obj["ninja"]
-    flows = list(ctx.obj["flows"].items())
+    flows = list(flows.items())
     total = len(flows)
     passed = 0
+    results = []
 
     console.rule("🧪  Running All Flows", style="magenta")
     console.print()
     start_all = time.time()
 
-    # Single Progress (spinner + bar) — no nested Lives!
-    with Progress(
-        SpinnerColumn(style="progress.spinner", spinner_name="dots"),
-        TextColumn("[bold cyan]{task.description}"),
-        BarColumn(bar_width=None),
-        TextColumn("{task.completed}/{task.total}"),
-        TimeElapsedColumn(),
-        console=console,
-        transient=True,
-    ) as progress:
-        task = progress.add_task("API Ninja", total=total)
-        completed = 0
-        for flow_id, flow in flows:
-            # update spinner description
-            progress.update(task, description=f"{flow_id}", completed=completed, refresh=True)
-
-            # capture stdout from plan_and_run
-            buf = StringIO()
-            old_stdout = sys.stdout
-            sys.stdout = buf
-
-            error_msg = None
-            try:
-                ninja.plan_and_run(flow)
-                success = True
-            except AssertionError as e:
-                error_msg = str(e)
-                success = False
-            finally:
-                sys.stdout = old_stdout
-
-            # render panel
-            output = buf.getvalue().rstrip() or error_msg or "[dim]— Success —[/dim]"
-            title = f"🧪 {flow_id}  {'✅' if success else '❌'}"
-            panel = Panel(
-                f"\n{output}\n",
-                title=title,
-                subtitle=f"[yellow]{flow['collection']}[/yellow]",
-                border_style="green" if success else "red",
-                style="bright_white",
-                expand=False,
-            )
-            console.print(panel)
-            console.print()  # blank line
-            console.print()
+    metrics_server = None
+    if metrics is not None:
+        expected = {}
+        for flow_id, _ in flows:
+            stats = history.flow_stats(flow_id) if history is not None else None
+            expected[flow_id] = stats.median_ms if stats is not None else None
+        metrics.expect(expected, workers=workers)
+        if metrics_port:
+            from api_ninja.metrics import serve_metrics
+
+            metrics_server = serve_metrics(metrics, metrics_port, router=ninja.router)
+            console.print(f"Metrics at http://127.0.0.1:{metrics_port}/metrics")
+
+    task = None
+    if live:
+        from rich.live import Live
+
+        display = Live(
+            get_renderable=lambda: render_dashboard(metrics.snapshot()),
+            console=console,
+            refresh_per_second=2,
+            transient=True,
+        )
+    else:
+        # Single Progress (spinner + bar) — no nested Lives!
+        display = Progress(
+            SpinnerColumn(style="progress.spinner", spinner_name="dots"),
+            TextColumn("[bold cyan]{task.description}"),
+            BarColumn(bar_width=None),
+            TextColumn("{task.completed}/{task.total}"),
+            TimeElapsedColumn(),
+            console=console,
+            transient=True,
+        )
+        task = display.add_task("API Ninja", total=total)
 
-            if success:
-                passed += 1
-            completed += 1
-            progress.advance(task)
+    # The run is finalized in history (and the metrics server stopped) even when a flow
+    # raises or the run is interrupted.
+    try:
+        with display:
+
+            def run_flow(flow):
+                # update spinner description
+                if task is not None:
+                    display.update(task, description=flow["flow_id"], refresh=True)
+                result = ninja.plan_and_run(flow, raise_on_failure=False)
+                retried = False
+                if history is not None:
+                    history.record(run_id, result)
+                    # Known-flaky flows get one more attempt before being reported as failed.
+                    if not result.passed and history.is_flaky(flow["flow_id"]):
+                        result = ninja.plan_and_run(flow, raise_on_failure=False)
+                        history.record(run_id, result, attempt=2)
+                        retried = True
+                    record_flow_inputs(history, flow, result, spec)
+                return result, retried
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(run_flow, flow): (flow_id, flow) for flow_id, flow in flows}
+                for future in as_completed(futures):
+                    flow_id, flow = futures[future]
+                    result, retried = future.result()
+                    results.append(result)
+                    success = result.passed
+
+                    print_flow_panel(
+                        flow_id, flow["collection"], result.status, result.error, retried
+                    )
+
+                    if success:
+                        passed += 1
+                    if task is not None:
+                        display.advance(task)
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if history is not None:
+            history.finish_run(run_id)
+            history.close()
 
     total_time = time.time() - start_all
-    console.rule("🔎  Summary", style="cyan")
-    summary = Table(show_edge=False, header_style="bold")
-    summary.add_column("Metric", style="bold")
-    summary.add_column("Value", justify="right")
-    summary.add_row("Total Flows", str(total))
-    summary.add_row("Passed", f"[green]{passed}[/green]")
-    summary.add_row("Failed", f"[red]{total - passed}[/red]")
-    summary.add_row("Total Time", f"{total_time:.2f}s")
-    console.print(summary)
-    console.rule()
+    extra_rows = []
+    timed_out = [result for result in results if result.status == "TIMEOUT"]
+    if timed_out:
+        phases = sorted({result.timed_out for result in timed_out})
+        extra_rows.append(("Timed Out", f"[yellow]{len(timed_out)}[/yellow] ({', '.join(phases)})"))
+    if ninja.response_cache is not None:
+        cache = ninja.response_cache
+        extra_rows.append(("Response Cache Hits", f"{cache.hits}/{cache.hits + cache.misses}"))
+    if ninja.verdict_cache is not None:
+        cache = ninja.verdict_cache
+        extra_rows.append(("Verdict Cache Hits", f"{cache.hits}/{cache.hits + cache.misses}"))
+    extra_rows.extend(ninja.router.summary_rows())
+    print_summary(total, passed, total_time, extra_rows)
+
+    if results_out:
+        write_results(results, results_out)
+        console.print(f"Results written to {results_out}")
+
+    if passed != total:
+        sys.exit(1)
+
+
+def run_via_daemon(socket_path: str, request: dict):
+    """Sends a run to `api-ninja serve` and renders the results it streams back."""
+    from api_ninja.daemon import request_run
 
+    if not os.path.exists(socket_path):
+        raise click.UsageError(f"No daemon at {socket_path}; start one with `api-ninja serve`")
+    console.rule("🧪  Running All Flows", style="magenta")
+    console.print()
+    total = passed = 0
+    try:
+        for event in request_run(request, socket_path):
+            if event["event"] == "error":
+                raise click.ClickException(f"Daemon: {event['message']}")
+            if event["event"] == "started":
+                total = event["total"]
+                if not event["warm"]:
+                    console.print("[dim]Daemon is loading the spec for these options...[/dim]")
+            elif event["event"] == "flow":
+                print_flow_panel(
+                    event["flow_id"],
+                    event["collection"],
+                    event["status"],
+                    event["error"],
+                    event["retried"],
+                )
+            elif event["event"] == "done":
+                passed = event["passed"]
+                print_summary(total, passed, event["elapsed_s"], event["rows"])
+    except ConnectionError as e:
+        raise click.ClickException(f"Could not reach the daemon at {socket_path}: {e}")
     if passed != total:
         sys.exit(1)
 
 
+def _format_ms(ms: float | None) -> str:
+    return "-" if ms is None else f"{ms / 1000:.2f}s"
+
+
+@cli.command("history")
+@click.option(
+    "--history-db",
+    default=DEFAULT_HISTORY_PATH,
+    show_default=True,
+    type=click.Path(exists=True),
+    help="SQLite run history written by run-all",
+)
+@click.option("--runs", default=20, show_default=True, help="Number of recent runs to show")
+@click.option("--flow", "flow_id", help="Show the duration trend of a single flow")
+def history(history_db, runs, flow_id):
+    """Show flow duration trends and flaky flows from earlier runs."""
+    from api_ninja.history import RunHistory
+
+    store = RunHistory(history_db)
+    if flow_id:
+        table = Table(title=f"🧪 {flow_id}", show_edge=False, header_style="bold")
+        for column in ("Run", "Started", "Status", "Attempt", "Duration", "Tokens"):
+            table.add_column(column, justify="right")
+        for row in store.flow_trend(flow_id, limit=runs):
+            color = "green" if row["status"] == "PASS" else "red"
+            table.add_row(
+                str(row["run_id"]),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(row["started_at"])),
+                f"[{color}]{row['status']}[/{color}]",
+                str(row["attempt"]),
+                _format_ms(row["duration_ms"]),
+                f"{row['tokens']:,}",
+            )
+    else:
+        table = Table(title="🔎  Run History", show_edge=False, header_style="bold")
+        for column in ("Run", "Started", "Flows", "Passed", "Retried", "p50", "p95"):
+            table.add_column(column, justify="right")
+        for row in store.run_trends(limit=runs):
+            table.add_row(
+                str(row["run_id"]),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(row["started_at"])),
+                str(row["flows"]),
+                f"[green]{row['passed']}[/green]",
+                str(row["retried"]),
+                _format_ms(row["p50_ms"]),
+                _format_ms(row["p95_ms"]),
+            )
+    console.print(table)
+    flaky = store.flaky_flows()
+    if flaky and not flow_id:
+        console.print(f"[yellow]Flaky flows:[/yellow] {', '.join(flaky)}")
+    store.close()
+
+
+@cli.command("contract")
+@click.option("--openapi-spec-url", help="URL to fetch OpenAPI spec from")
+@click.option(
+    "--openapi-spec-path",
+    type=click.Path(exists=True),
+    help="Path to local OpenAPI JSON/YAML file",
+)
+@click.option("--base-url", help="Base URL for the API")
+@click.option(
+    "-H",
+    "--header",
+    "headers",
+    multiple=True,
+    help="Extra header sent with every request, e.g. 'x-token: secret' (repeatable)",
+)
+@click.option("--concurrency", default=8, show_default=True, help="Requests in flight at once")
+@click.option("--timeout", default=30.0, show_default=True, help="Per-request timeout in seconds")
+def contract(openapi_spec_url, openapi_spec_path, base_url, headers, concurrency, timeout):
+    """Check every operation responds as declared in the spec, without any LLM calls."""
+    if not openapi_spec_url and not openapi_spec_path:
+        raise click.UsageError("Either --openapi-spec-url or --openapi-spec-path must be provided")
+    if not base_url:
+        raise click.UsageError("Base URL must be provided using --base-url")
+    from api_ninja.contract import ContractRunner
+
+    extra_headers = {}
+    for header in headers:
+        name, sep, value = header.partition(":")
+        if not sep:
+            raise click.UsageError(f"Headers must look like 'name: value', got {header!r}")
+        extra_headers[name.strip()] = value.strip()
+
+    spec = load_openapi_spec(openapi_spec_url, openapi_spec_path)
+    runner = ContractRunner(
+        spec, base_url, headers=extra_headers, concurrency=concurrency, timeout=timeout
+    )
+    console.rule("📜  Contract Check", style="magenta")
+    started = time.time()
+    results = runner.run()
+
+    table = Table(show_edge=False, header_style="bold")
+    table.add_column("", width=2)
+    table.add_column("Operation", style="bold")
+    table.add_column("Status", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Problems")
+    for result in results:
+        table.add_row(
+            "✅" if result.passed else "❌",
+            f"{result.method:<6} {result.path}",
+            str(result.status or "-"),
+            f"{result.elapsed_ms:.0f}ms",
+            "\n".join(result.problems),
+        )
+    console.print(table)
+    passed = sum(1 for result in results if result.passed)
+    print_summary(len(results), passed, time.time() - started, label="Operations")
+    if passed != len(results):
+        sys.exit(1)
+
+
+@cli.command("lint")
+@click.option("--openapi-spec-url", help="URL to fetch OpenAPI spec from")
+@click.option(
+    "--openapi-spec-path",
+    type=click.Path(exists=True),
+    help="Path to local OpenAPI JSON/YAML file",
+)
+def lint(openapi_spec_url, openapi_spec_path):
+    """Compile every schema in the spec and check declared examples against them."""
+    if not openapi_spec_url and not openapi_spec_path:
+        raise click.UsageError("Either --openapi-spec-url or --openapi-spec-path must be provided")
+    from api_ninja.openapi import iter_operations, resolve_ref
+    from api_ninja.validation import ValidatorRegistry
+
+    spec = load_openapi_spec(openapi_spec_url, openapi_spec_path)
+    registry = ValidatorRegistry(spec)
+    problems = []
+    for path, method, operation in iter_operations(spec):
+        name = f"{method.upper()} {path}"
+        bodies = [("request", operation.get("requestBody") or {}, registry.request_validator, ())]
+        for status, response in operation.get("responses", {}).items():
+            if str(status).isdigit():
+                bodies.append((str(status), response, registry.response_validator, (int(status),)))
+        for where, body, get_validator, args in bodies:
+            try:
+                validator = get_validator(path, method, *args)
+                if "$ref" in body:
+                    body = resolve_ref(spec, body["$ref"])
+            except (KeyError, TypeError, re.error) as e:
+                problems.append((name, where, f"cannot compile schema: {e!r}"))
+                continue
+            if validator is None:
+                continue
+            for media in body.get("content", {}).values():
+                examples = [media["example"]] if "example" in media else []
+                examples += [e.get("value") for e in media.get("examples", {}).values()]
+                for example in examples:
+                    errors = []
+                    validator(example, "", errors)
+                    problems.extend((name, where, error) for error in errors)
+
+    if not problems:
+        console.print("[green]✅ All schemas compiled and all examples are valid.[/green]")
+        return
+    table = Table(title="🔎  Lint", show_edge=False, header_style="bold")
+    table.add_column("Operation", style="bold")
+    table.add_column("Body")
+    table.add_column("Problem")
+    for row in problems:
+        table.add_row(*row)
+    console.print(table)
+    sys.exit(1)
+
+
 class LiteralDumper(yaml.SafeDumper):
     def represent_scalar(self, tag, value, style=None):
         if isinstance(value, str) and "\n" in value:
@@ -177,15 +758,76 @@ class LiteralDumper(yaml.SafeDumper):
     "--out",
     type=click.Path(),
     default="default.generated.yaml",
-    help="Output file for test flows",
+    help="Output file for test flows (.yaml, or .jsonl to stream flows as they are generated)",
+)
+@click.option(
+    "--scoring-model",
+    help="Model used to score generated flows (same as --model scorer=MODEL)",
+)
+@click.option(
+    "--model",
+    "model_specs",
+    multiple=True,
+    metavar="ROLE=MODEL",
+    help="Model for flow_generator or scorer (default: LLM_MODEL); repeatable",
+)
+@click.option(
+    "--escalation-model",
+    "escalation_specs",
+    multiple=True,
+    metavar="[ROLE=]MODEL",
+    help="Retry unparseable outputs once on this model; repeatable",
+)
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Submit generation and scoring as offline batch jobs instead of interactive calls",
+)
+@click.option(
+    "--batch-backend",
+    default="openai",
+    show_default=True,
+    help="Batch backend: openai, local, or MODULE:CLASS",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    help="Batch checkpoint file to resume from (default: OUT.batch.json)",
+)
+@click.option(
+    "--poll-interval",
+    type=float,
+    default=30.0,
+    show_default=True,
+    help="Seconds between batch status checks",
 )
 @click.pass_context
-def generate_flows(ctx, url, path, out):
+def generate_flows(
+    ctx,
+    url,
+    path,
+    out,
+    scoring_model,
+    model_specs,
+    escalation_specs,
+    batch,
+    batch_backend,
+    checkpoint,
+    poll_interval,
+):
     """Generate test flows for each endpoint in the OpenAPI spec."""
     if not url and not path:
         raise click.UsageError("Either --url or --path must be provided")
+    from api_ninja.agents.routing import ModelRouter
+
+    try:
+        router = ModelRouter.parse(model_specs, escalation_specs)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--model/--escalation-model")
 
     if url:
+        import requests
+
         print(f"Fetching OpenAPI spec from {url}...")
         response = requests.get(url)
         response.raise_for_status()
@@ -198,22 +840,142 @@ def generate_flows(ctx, url, path, out):
             else:
                 openapi_spec = yaml.safe_load(f)
 
-    agent = FlowGeneratorAgent()
-    flows = agent.generate_flows_for_spec(openapi_spec)
-    print(f"Writing generated flows to {out}...")
-    with open(out, "w") as f:
-        yaml.dump(
-            flows,
-            f,
-            Dumper=LiteralDumper,
-            sort_keys=False,
-            allow_unicode=True,
-            indent=2,
-            width=1000,  # Avoid line-wrapping
+    from api_ninja.agents.flow_generator import FlowGeneratorAgent
+
+    agent = FlowGeneratorAgent(scoring_model=scoring_model, router=router)
+    generator = agent
+    if batch:
+        from api_ninja.batch import BatchFlowGenerator, load_backend
+
+        try:
+            backend = load_backend(batch_backend)
+        except (ValueError, ImportError, AttributeError) as e:
+            raise click.BadParameter(str(e), param_hint="--batch-backend")
+        generator = BatchFlowGenerator(
+            agent,
+            backend,
+            checkpoint or f"{out}.batch.json",
+            poll_interval=poll_interval,
         )
+    if is_flow_store(out):
+        from api_ninja.flowstore import FlowWriter
 
+        print(f"Writing generated flows to {out} as each endpoint finishes...")
+        with FlowWriter(out) as writer:
+            generator.generate_flows_for_spec(openapi_spec, on_collection=writer.write_collection)
+    else:
+        flows = generator.generate_flows_for_spec(openapi_spec)
+        print(f"Writing generated flows to {out}...")
+        with open(out, "w") as f:
+            yaml.dump(
+                flows,
+                f,
+                Dumper=LiteralDumper,
+                sort_keys=False,
+                allow_unicode=True,
+                indent=2,
+                width=1000,  # Avoid line-wrapping
+            )
+
+    if batch:
+        for role, usage in generator.usage.items():
+            print(f"{role} (batch): {usage}")
+    else:
+        for role, value in router.summary_rows():
+            print(f"{role}: {value}")
     print("✅ Done.")
 
 
+@cli.command("convert-flows")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.argument("out", type=click.Path(dir_okay=False))
+def convert_flows(source, out):
+    """Convert a YAML flows config into a streamed .jsonl flow file with an index."""
+    if not is_flow_store(out):
+        raise click.UsageError("OUT must be a .jsonl file")
+    from api_ninja.flowstore import convert_flows
+
+    with open(source, "r") as f:
+        cfg = yaml.safe_load(f)
+    convert_flows(cfg, out)
+    total = sum(len(coll["flows"]) for coll in cfg["collections"].values())
+    console.print(f"Wrote {total} flows to {out} (index: {out}.idx)")
+
+
+@cli.command("serve")
+@click.option(
+    "--socket",
+    "socket_path",
+    default=DEFAULT_SOCKET_PATH,
+    show_default=True,
+    help="Unix socket to listen on",
+)
+@click.option(
+    "--history-db",
+    default=DEFAULT_HISTORY_PATH,
+    show_default=True,
+    help="SQLite run history used for ordering, flaky retries and `api-ninja history`",
+)
+@click.option("--no-history", is_flag=True, help="Do not read or record run history")
+def serve(socket_path, history_db, no_history):
+    """Keep specs, HTTP pools and caches warm for `run-all --via-daemon`."""
+    from api_ninja.daemon import NinjaDaemon, serve_daemon
+
+    daemon = NinjaDaemon(history_db=None if no_history else history_db)
+    try:
+        server = serve_daemon(daemon, socket_path)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    console.print(f"Serving runs on {socket_path}. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+@cli.command("mock")
+@click.option("--openapi-spec-url", help="URL to fetch OpenAPI spec from")
+@click.option(
+    "--openapi-spec-path",
+    type=click.Path(exists=True),
+    help="Path to local OpenAPI JSON/YAML file",
+)
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on")
+@click.option("--port", default=8000, show_default=True, help="Port to listen on")
+@click.option("--latency-ms", default=0.0, show_default=True, help="Delay added to every response")
+@click.option("--jitter-ms", default=0.0, show_default=True, help="Random extra delay, up to this")
+@click.option(
+    "--error-rate",
+    default=0.0,
+    show_default=True,
+    type=click.FloatRange(0, 1),
+    help="Fraction of requests answered with an injected 500",
+)
+@click.option("--seed", type=int, help="Seed for jitter and error injection, for repeatable runs")
+def mock(openapi_spec_url, openapi_spec_path, host, port, latency_ms, jitter_ms, error_rate, seed):
+    """Serve a stateful mock of the API described by the spec, for running suites offline."""
+    if not openapi_spec_url and not openapi_spec_path:
+        raise click.UsageError("Either --openapi-spec-url or --openapi-spec-path must be provided")
+    from api_ninja.mock import MockAPI, serve_mock
+
+    spec = load_openapi_spec(openapi_spec_url, openapi_spec_path)
+    server = serve_mock(
+        MockAPI(spec, latency_ms, jitter_ms, error_rate, seed=seed), host=host, port=port
+    )
+    console.print(
+        f"Mocking {len(spec.get('paths', {}))} paths at http://{host}:{port} "
+        f"(spec at /openapi.json). Press Ctrl+C to stop."
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 if __name__ == "__main__":
     cli()
@@ -1,4 +1,5 @@
 import os
+import re
 
 
 class Colors:
@@ -9,3 +10,10 @@ class Colors:
     CYAN = "\033[96m" if ENABLED else ""
     BOLD = "\033[1m" if ENABLED else ""
     RESET = "\033[0m" if ENABLED else ""
+
+
+_ANSI = re.compile(r"\033\[[0-9;]*m")
+
+
+def strip_ansi(text: str | None) -> str | None:
+    return _ANSI.sub("", text) if text is not None else None
@@ -0,0 +1,309 @@
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api_ninja.openapi import iter_operations, resolve_ref
+from api_ninja.validation import ValidatorRegistry
+
+_PARAM = re.compile(r"\{([^}]+)\}")
+
+_STRING_FORMATS = {
+    "uuid": lambda: str(uuid.uuid4()),
+    "email": lambda: "jane.doe@example.com",
+    "date-time": lambda: "2024-01-01T00:00:00Z",
+    "date": lambda: "2024-01-01",
+    "time": lambda: "12:00:00",
+    "uri": lambda: "https://example.com",
+    "url": lambda: "https://example.com",
+    "hostname": lambda: "example.com",
+    "ipv4": lambda: "192.0.2.1",
+    "ipv6": lambda: "2001:db8::1",
+}
+
+
+class RequestSynthesizer:
+    """
+    Builds valid example values from schemas, preferring the spec's own examples, defaults
+    and enums, without any model calls.
+    """
+
+    def __init__(self, openapi_spec: dict, max_depth: int = 5):
+        self.openapi_spec = openapi_spec
+        self.max_depth = max_depth
+
+    def resolve(self, node: dict) -> dict:
+        while isinstance(node, dict) and "$ref" in node:
+            node = resolve_ref(self.openapi_spec, node["$ref"])
+        return node
+
+    def example(self, schema, depth: int = 0, writing: bool = True):
+        schema = self.resolve(schema or {})
+        for key in ("example", "default", "const"):
+            if key in schema:
+                return schema[key]
+        if isinstance(schema.get("examples"), list) and schema["examples"]:
+            return schema["examples"][0]
+        if schema.get("enum"):
+            return schema["enum"][0]
+
+        if "allOf" in schema:
+            merged = {}
+            for sub in schema["allOf"]:
+                value = self.example(sub, depth, writing)
+                if isinstance(value, dict):
+                    merged.update(value)
+            return merged
+        for keyword in ("oneOf", "anyOf"):
+            if keyword in schema:
+                branches = [self.resolve(sub) for sub in schema[keyword]]
+                branches = [b for b in branches if b.get("type") != "null"] or branches
+                value = self.example(branches[0], depth, writing)
+                discriminator = schema.get("discriminator", {})
+                if isinstance(value, dict) and "propertyName" in discriminator:
+                    ref = schema[keyword][0].get("$ref", "")
+                    mapping = {v: k for k, v in discriminator.get("mapping", {}).items()}
+                    value[discriminator["propertyName"]] = mapping.get(ref, ref.rsplit("/", 1)[-1])
+                return value
+
+        schema_type = schema.get("type")
+        if isinstance(schema_type, list):
+            schema_type = next((t for t in schema_type if t != "null"), None)
+        if schema_type is None:
+            schema_type = "object" if "properties" in schema else "string"
+
+        if schema_type == "object":
+            if depth >= self.max_depth:
+                return {}
+            required = set(schema.get("required", []))
+            value = {}
+            for name, sub in schema.get("properties", {}).items():
+                sub_resolved = self.resolve(sub)
+                if sub_resolved.get("readOnly") and writing and name not in required:
+                    continue
+                if sub_resolved.get("writeOnly") and not writing:
+                    continue
+                value[name] = self.example(sub, depth + 1, writing)
+            return value
+        if schema_type == "array":
+            if depth >= self.max_depth:
+                return []
+            count = max(1, schema.get("minItems", 1))
+            return [self.example(schema.get("items", {}), depth + 1, writing) for _ in range(count)]
+        if schema_type == "integer":
+            return int(self._number(schema, 1))
+        if schema_type == "number":
+            return float(self._number(schema, 1.5))
+        if schema_type == "boolean":
+            return True
+        if schema_type == "null":
+            return None
+
+        text = _STRING_FORMATS.get(schema.get("format"), lambda: "example")()
+        min_length = schema.get("minLength", 0)
+        max_length = schema.get("maxLength")
+        if len(text) < min_length:
+            text = text + "x" * (min_length - len(text))
+        if max_length is not None:
+            text = text[:max_length]
+        return text
+
+    def _number(self, schema: dict, fallback):
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+        exclusive_min = schema.get("exclusiveMinimum")
+        if isinstance(exclusive_min, (int, float)) and not isinstance(exclusive_min, bool):
+            minimum = exclusive_min + 1
+        elif exclusive_min is True and minimum is not None:
+            minimum = minimum + 1
+        value = fallback if minimum is None else max(minimum, fallback)
+        if maximum is not None and value > maximum:
+            value = maximum
+        return value
+
+    def parameter(self, parameter: dict):
+        parameter = self.resolve(parameter)
+        if "example" in parameter:
+            return parameter["example"]
+        if parameter.get("examples"):
+            return next(iter(parameter["examples"].values())).get("value")
+        return self.example(parameter.get("schema", {}))
+
+    def request_body(self, operation: dict):
+        body = self.resolve(operation.get("requestBody") or {})
+        media = body.get("content", {}).get("application/json")
+        if media is None:
+            return None
+        if "example" in media:
+            return media["example"]
+        if media.get("examples"):
+            return next(iter(media["examples"].values())).get("value")
+        return self.example(media.get("schema", {}))
+
+
+@dataclass
+class ContractResult:
+    method: str
+    path: str
+    passed: bool = False
+    status: int | None = None
+    elapsed_ms: float = 0.0
+    problems: list[str] = field(default_factory=list)
+
+
+def _extract_id(body, param: str):
+    if not isinstance(body, dict):
+        return None
+    for key in (param, "id", param.removesuffix("_id") + "Id", param.removesuffix("Id") + "_id"):
+        if key in body and body[key] is not None:
+            return body[key]
+    return next((v for k, v in body.items() if k.lower().endswith("id") and v is not None), None)
+
+
+class ContractRunner:
+    """
+    Calls every operation in the spec with locally synthesized requests and checks the
+    status and body against the spec. Operations with path parameters get their ids from a
+    create (POST on the parent collection) and clean up with the matching DELETE.
+    """
+
+    def __init__(
+        self,
+        openapi_spec: dict,
+        api_base_url: str,
+        headers: dict | None = None,
+        concurrency: int = 8,
+        timeout: float = 30.0,
+    ):
+        self.openapi_spec = openapi_spec
+        self.api_base_url = api_base_url.rstrip("/")
+        self.headers = headers or {}
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.synthesizer = RequestSynthesizer(openapi_spec)
+        self.validators = ValidatorRegistry(openapi_spec)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _operation(self, path: str, method: str) -> dict | None:
+        return self.openapi_spec.get("paths", {}).get(path, {}).get(method)
+
+    def _parameters(self, path: str, method: str) -> list[dict]:
+        path_item = self.openapi_spec["paths"][path]
+        merged = {}
+        for parameter in path_item.get("parameters", []) + path_item[method].get("parameters", []):
+            parameter = self.synthesizer.resolve(parameter)
+            merged[(parameter.get("name"), parameter.get("in"))] = parameter
+        return list(merged.values())
+
+    def _send(self, method: str, path: str, values: dict):
+        operation = self._operation(path, method)
+        query = {}
+        headers = dict(self.headers)
+        resolved = path
+        for parameter in self._parameters(path, method):
+            name, location = parameter.get("name"), parameter.get("in")
+            if location == "path":
+                value = values.get(name)
+                if value is None:
+                    value = self.synthesizer.parameter(parameter)
+                resolved = resolved.replace("{" + name + "}", str(value))
+            elif location == "query" and parameter.get("required"):
+                query[name] = self.synthesizer.parameter(parameter)
+            elif location == "header" and parameter.get("required") and name not in headers:
+                headers[name] = str(self.synthesizer.parameter(parameter))
+        body = self.synthesizer.request_body(operation)
+        url = urljoin(self.api_base_url + "/", resolved.lstrip("/"))
+        started = time.perf_counter()
+        response = self.session.request(
+            method.upper(),
+            url,
+            params=query,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            response_body = response.json()
+        except ValueError:
+            response_body = response.text
+        return response.status_code, response_body, elapsed_ms
+
+    def _setup(self, path: str, values: dict, cleanups: list, problems: list):
+        """Creates the resources a templated path refers to, outermost first."""
+        for match in _PARAM.finditer(path):
+            param = match.group(1)
+            collection = path[: match.start()].rstrip("/")
+            if param in values or self._operation(collection, "post") is None:
+                continue
+            self._setup(collection, values, cleanups, problems)
+            status, body, _ = self._send("post", collection, values)
+            if not 200 <= status < 300:
+                problems.append(f"setup POST {collection} returned {status}")
+                return
+            values[param] = _extract_id(body, param)
+            item = f"{collection}/{{{param}}}"
+            if self._operation(item, "delete") is not None:
+                cleanups.append((item, dict(values)))
+
+    def _expected(self, path: str, method: str) -> list[str]:
+        responses = self._operation(path, method).get("responses", {})
+        codes = [str(code) for code in responses]
+        return [code for code in codes if code[0] == "2" or code == "default"]
+
+    def check(self, path: str, method: str) -> ContractResult:
+        result = ContractResult(method=method.upper(), path=path)
+        values = {}
+        cleanups = []
+        try:
+            self._setup(path, values, cleanups, result.problems)
+            if result.problems:
+                return result
+            status, body, result.elapsed_ms = self._send(method, path, values)
+            result.status = status
+            expected = self._expected(path, method)
+            declared = (
+                str(status) in expected
+                or f"{str(status)[0]}XX" in expected
+                or (not expected and 200 <= status < 300)
+                or ("default" in expected and 200 <= status < 300)
+            )
+            if not declared:
+                wanted = ", ".join(expected) or "2xx"
+                result.problems.append(f"status {status}, expected {wanted}")
+            errors = self.validators.validate_response(path, method, status, body)
+            if errors:
+                result.problems.extend(errors[:5])
+                if len(errors) > 5:
+                    result.problems.append(f"... and {len(errors) - 5} more schema errors")
+            result.passed = not result.problems
+        except Exception as e:
+            # Record the failure on this operation instead of aborting the whole run.
+            result.problems.append(f"{type(e).__name__}: {e}")
+        finally:
+            if method == "delete":
+                cleanups = [(p, v) for p, v in cleanups if p != path]
+            for cleanup_path, cleanup_values in reversed(cleanups):
+                try:
+                    self._send("delete", cleanup_path, cleanup_values)
+                except Exception:
+                    pass
+        return result
+
+    def run(self, on_result=None) -> list[ContractResult]:
+        operations = [(path, method) for path, method, _ in iter_operations(self.openapi_spec)]
+        results = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for result in pool.map(lambda op: self.check(*op), operations):
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+        return results
@@ -1,15 +1,41 @@
+import asyncio
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterable
 from urllib.parse import urljoin
 
 import requests
-from openai import OpenAI
 
+from api_ninja.agents.base import UsageTracker
 from api_ninja.agents.planner import PlannerAgent
 from api_ninja.agents.request_generator import RequestGeneratorAgent
 from api_ninja.agents.result_evaluation import ResultEvaluationAgent
-from api_ninja.color import Colors
+from api_ninja.agents.routing import ModelRouter
+from api_ninja.agents.serialization import PRETTY, PromptFormat, memory_format
+from api_ninja.cache import SAFE_METHODS, PlanCache, ResponseCache, VerdictCache, resource_root
+from api_ninja.color import Colors, strip_ansi
+from api_ninja.events import (
+    FlowEvent,
+    FlowFinished,
+    FlowStarted,
+    PlanReady,
+    RequestGenerated,
+    ResponseReceived,
+    Verdict,
+)
 from api_ninja.memory_store import MemoryStore
+from api_ninja.models import RequestTemplateModel
+from api_ninja.openapi import slice_spec
+from api_ninja.probe import describe, fire, probe_targets, representative, summarize
+from api_ninja.results import FlowResult, StepResult
+from api_ninja.slo import DEFAULT_SAMPLES, budget_for, check, format_report
+from api_ninja.templates import UnresolvedBinding, resolve_request
+from api_ninja.timeouts import Deadlines, FlowTimeout, PhaseTimeout, Timeouts
+from api_ninja.uploads import encode_body, load_fixtures, request_body_content
+from api_ninja.validation import ValidatorRegistry
 
 logging.basicConfig(level=logging.INFO)
 
@@ -48,66 +74,714 @@ def format_plans(plans):
 
 
 class APINinja:
-    def __init__(self, openapi_spec, api_base_url):
+    def __init__(
+        self,
+        openapi_spec,
+        api_base_url,
+        cache_responses: bool = False,
+        cache_scope: str = "run",
+        cache_verdicts: bool = False,
+        plan_mode: str = "step",
+        metrics=None,
+        timeouts: Timeouts | None = None,
+        router: ModelRouter | None = None,
+        candidate_operations: int = 0,
+        cache_plans: bool = False,
+        pipeline: bool = False,
+        auth=None,
+        prompt_formats: dict[str, PromptFormat] | None = None,
+    ):
+        if plan_mode not in ("step", "combined"):
+            raise ValueError(f"plan_mode must be 'step' or 'combined', got {plan_mode!r}")
+        if cache_scope not in ("run", "collection"):
+            raise ValueError(f"cache_scope must be 'run' or 'collection', got {cache_scope!r}")
         self.openapi_spec = openapi_spec
         self.api_base_url = api_base_url.rstrip("/")
-        self.client = OpenAI()
-        self.planner_agent = PlannerAgent()
-        self.request_generator_agent = RequestGeneratorAgent()
-        self.evaluation_agent = ResultEvaluationAgent()
-
-    def request_api(self, request_details: dict) -> dict:
-        url = urljoin(self.api_base_url, request_details["path"].lstrip("/"))
-        func = getattr(requests, request_details["method"].lower())
+        self.response_cache = ResponseCache() if cache_responses else None
+        self.cache_scope = cache_scope
+        self.verdict_cache = VerdictCache() if cache_verdicts else None
+        self.plan_cache = PlanCache() if cache_plans else None
+        # Generate step N+1's request while step N is being evaluated.
+        self.pipeline = pipeline
+        # An AuthManager that authenticates every flow's requests (see plan_and_run).
+        self.auth = auth
+        self.validators = ValidatorRegistry(openapi_spec)
+        self.plan_mode = plan_mode
+        self.metrics = metrics
+        self.timeouts = timeouts or Timeouts()
+        self._run_ends_at = None
+        self._client = None
+        self._session = None
+        self.router = router or ModelRouter()
+        # With candidate_operations > 0, the planner only sees the operations the flow is
+        # likely to need (and their dependencies) instead of the whole spec.
+        self.candidate_operations = candidate_operations
+        self.operation_index = None
+        if candidate_operations > 0:
+            from api_ninja.retrieval import OperationIndex
+
+            self.operation_index = OperationIndex.for_spec(openapi_spec)
+        # How JSON data is written into prompts, per role. Response bodies reach the request
+        # generator through the flow's memory, which stores them in memory_format(its format).
+        self.prompt_formats = dict(prompt_formats or {})
+        self.planner_agent = PlannerAgent(self.router)
+        self.request_generator_agent = RequestGeneratorAgent(self.router)
+        self.evaluation_agent = ResultEvaluationAgent(
+            self.router, self.prompt_formats.get("evaluator", PRETTY)
+        )
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI()
+        return self._client
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled HTTP session shared by every flow, so connections to the API are reused."""
+        if self._session is None:
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def planner_spec(self, flow: dict) -> dict:
+        """The part of the spec the planner is shown for `flow`."""
+        if self.operation_index is None:
+            return self.openapi_spec
+        query = "\n".join(
+            str(flow.get(key) or "") for key in ("description", "notes", "expectations")
+        )
+        operations = []
+        for operation in self.operation_index.candidates(query, self.candidate_operations):
+            method, path = operation.split(" ", 1)
+            operations.append((path, method))
+        return slice_spec(self.openapi_spec, operations)
+
+    def request_api(
+        self,
+        request_details: dict,
+        cache_scope: str = "",
+        index: int = 0,
+        timeout: float | None = None,
+        fixtures: dict | None = None,
+        operation: tuple[str, str] | None = None,
+        use_cache: bool = True,
+    ) -> StepResult:
+        """
+        Sends a generated request. With an AuthManager, `operation` = (spec path, method) gets
+        that operation's credentials added; they are not recorded in the StepResult.
+        """
+        # The trailing slash keeps a base path ("https://host/api") in the joined URL.
+        url = urljoin(self.api_base_url + "/", request_details["path"].lstrip("/"))
+        method = request_details["method"].upper()
         # Prepare data
         headers = request_details.get("headers", {})
         body = request_details.get("payload", {})
         params = request_details.get("parameters", {})
-        resp = func(url, headers=headers, json=body, params=params)
-        response_body = ""
+        result = StepResult(
+            index=index,
+            method=request_details["method"],
+            path=request_details["path"],
+            url=url,
+            headers=headers,
+            payload=body,
+            parameters=params,
+            started_at=time.time(),
+        )
+
+        authenticated = self.auth is not None and operation is not None
+        cache_key = None
+        cached = None
+        if use_cache and self.response_cache is not None and method in SAFE_METHODS:
+            # Credentials are added after the lookup, so the schemes they come from are part of
+            # the key: an unauthenticated request must not reuse an authenticated response.
+            credentials = self.auth.requirement(*operation) if authenticated else []
+            cache_key = ResponseCache.key(
+                method, url, params, headers, cache_scope, credentials=credentials
+            )
+            cached = self.response_cache.get(cache_key)
+
+        started = time.perf_counter()
+        if cached is not None:
+            result.status, result.body = cached
+            result.cached = True
+        else:
+            content_type = request_details.get("content_type", "application/json")
+            kwargs, body_headers = encode_body(content_type, body, fixtures or {})
+            if body_headers:
+                headers = {
+                    name: value for name, value in headers.items() if name.lower() != "content-type"
+                }
+                headers.update(body_headers)
+            cookies = None
+            if authenticated:
+                headers, params, cookies = self.auth.apply(
+                    *operation, headers, params, self.session, timeout
+                )
+            try:
+                resp = self.session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    params=params,
+                    cookies=cookies,
+                    timeout=timeout,
+                    **kwargs,
+                )
+            finally:
+                if hasattr(kwargs.get("data"), "close"):
+                    kwargs["data"].close()
+            result.status = resp.status_code
+            result.body = ""
+            try:
+                result.body = resp.json()
+            except json.JSONDecodeError:
+                if getattr(resp, "text", None) is not None:
+                    result.body = resp.text
+            if self.response_cache is not None:
+                # Reads sent past the cache (latency samples, probes) leave it alone.
+                if cache_key is not None or method not in SAFE_METHODS:
+                    path = request_details["path"]
+                    root = resource_root(path, self.validators.paths.match(path))
+                    if cache_key is not None:
+                        self.response_cache.put(cache_key, root, result.status, result.body)
+                    else:
+                        self.response_cache.invalidate(root)
+        result.http_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    def probe(self, copies: int, deadlines: Deadlines, what: str, **kwargs) -> StepResult:
+        """
+        Sends one request `copies` times at once, bypassing the response cache, and returns a
+        representative StepResult carrying the aggregate of all responses in `probe`.
+        """
+        seconds, limit = deadlines.budget("http", what)
+        started = time.perf_counter()
+        outcomes = fire(
+            lambda copy: self.request_api(timeout=seconds, use_cache=False, **kwargs), copies
+        )
+        result = representative(outcomes)
+        if result is None:
+            if all(isinstance(outcome, requests.Timeout) for outcome in outcomes):
+                raise PhaseTimeout(limit, what, deadlines.limit(limit))
+            raise outcomes[0]
+        result.probe = summarize(outcomes, (time.perf_counter() - started) * 1000)
+        return result
+
+    def check_latency(
+        self,
+        latency,
+        flow_result: FlowResult,
+        calls: list,
+        deadlines: Deadlines,
+        authenticated: bool = False,
+    ) -> list[str]:
+        """
+        Measures the steps `latency` sets a budget for, without any model call: the concrete
+        request of a read is repeated `samples` times, a write is judged on its single run.
+        Stores each report in StepResult.latency and returns a line per exceeded budget.
+        """
+        failures = []
+        for step, call in zip(flow_result.steps, calls):
+            budget = budget_for(latency, call.method, call.path)
+            if budget is None:
+                continue
+            operation = f"{call.method.upper()} {call.path}"
+            samples = [step.http_ms]
+            if step.method.upper() in SAFE_METHODS:
+                request_details = {
+                    "method": step.method,
+                    "path": step.path,
+                    "headers": step.headers,
+                    "payload": step.payload,
+                    "parameters": step.parameters,
+                }
+                samples = []
+                for _ in range(int(budget.get("samples", DEFAULT_SAMPLES))):
+                    sample = self._call(
+                        deadlines,
+                        "http",
+                        f"{step.method.upper()} {step.path}",
+                        self.request_api,
+                        request_details=request_details,
+                        index=step.index,
+                        operation=(call.path, call.method) if authenticated else None,
+                        use_cache=False,
+                    )
+                    if self.metrics is not None:
+                        self.metrics.http_call(operation, sample.status, sample.http_ms)
+                    samples.append(sample.http_ms)
+            step.latency = check(samples, budget)
+            if step.latency["exceeded"]:
+                failures.append(format_report(operation, step.latency))
+        return failures
+
+    def plan(
+        self,
+        flow: dict,
+        context: str,
+        usage: UsageTracker | None = None,
+        timeout: float | None = None,
+    ):
+        openapi_spec = self.planner_spec(flow)
+        templates = self.plan_mode == "combined"
+        if self.plan_cache is None:
+            return self.planner_agent.run(
+                context=context,
+                openapi_spec=openapi_spec,
+                usage=usage,
+                templates=templates,
+                timeout=timeout,
+            )
+        key = PlanCache.key(context, openapi_spec, templates)
+        plan = self.plan_cache.get(key)
+        if plan is None:
+            plan = self.planner_agent.run(
+                context=context,
+                openapi_spec=openapi_spec,
+                usage=usage,
+                templates=templates,
+                timeout=timeout,
+            )
+            self.plan_cache.put(key, plan)
+        return plan
+
+    def evaluate(
+        self,
+        context: str,
+        result: StepResult,
+        usage: UsageTracker | None = None,
+        timeout: float | None = None,
+    ):
+        if self.verdict_cache is None:
+            return self.evaluation_agent.run(
+                context=context, result=result, usage=usage, timeout=timeout
+            )
+        key = VerdictCache.key(result)
+        verdict = self.verdict_cache.get(key)
+        if verdict is None:
+            verdict = self.evaluation_agent.run(
+                context=context, result=result, usage=usage, timeout=timeout
+            )
+            self.verdict_cache.put(key, verdict)
+        return verdict
+
+    def generate_request(
+        self,
+        call,
+        bindings: list,
+        context: str,
+        deadlines: Deadlines,
+        usage: UsageTracker,
+        files: list[dict] | None = None,
+    ) -> tuple[dict, float]:
+        """
+        Returns (request details, generation ms) for a planned call: resolved locally from its
+        request template when it has one, otherwise written by the request generator.
+        `files` is the metadata of the flow's upload fixtures, for upload endpoints.
+        """
+        content_type, _ = request_body_content(self.openapi_spec, call.path, call.method)
+        started = time.perf_counter()
+        request_details = None
+        if isinstance(call, RequestTemplateModel):
+            try:
+                request_details = resolve_request(call, bindings)
+            except UnresolvedBinding as e:
+                step_name = f"{call.method.upper()} {call.path}"
+                logger.info(f"{step_name}: falling back to the request generator ({e})")
+        if request_details is None:
+            request_details = self._call(
+                deadlines,
+                "llm",
+                "request generation",
+                self.request_generator_agent.run,
+                step=call,
+                context=context,
+                openapi_spec=self.openapi_spec,
+                usage=usage,
+                files=files,
+            )
+        request_details["content_type"] = content_type
+        return request_details, (time.perf_counter() - started) * 1000
+
+    def start_run(self):
+        """
+        Resets per-run state (the run deadline, cached responses, which reflect the API's
+        data at the time, and auth tokens) for processes that reuse one APINinja across runs.
+        """
+        self._run_ends_at = None
+        if self.response_cache is not None:
+            self.response_cache.clear()
+        if self.auth is not None:
+            self.auth.reset()
+
+    def _deadlines(self) -> Deadlines:
+        # The run deadline starts with the first flow, shared by every flow after it.
+        if self.timeouts.run and self._run_ends_at is None:
+            self._run_ends_at = time.monotonic() + self.timeouts.run
+        deadlines = Deadlines(self.timeouts, run_ends_at=self._run_ends_at)
+        deadlines.open("flow")
+        return deadlines
+
+    def _call(self, deadlines: Deadlines, phase: str, what: str, fn, **kwargs):
+        """Calls fn(timeout=..., **kwargs) within the budget left for an "http"/"llm" call."""
+        seconds, limit = deadlines.budget(phase, what)
         try:
-            response_body = resp.json()
-        except json.JSONDecodeError:
-            if getattr(resp, "text", None) is not None:
-                response_body = resp.text
-        return {
-            "response_status": resp.status_code,
-            "response_body": response_body,
-            "method": request_details["method"],
-            "path": request_details["path"],
-            "headers": headers,
-            "payload": body,
-            "parameters": params,
-        }
-
-    def plan_and_run(self, flow: dict):
+            return fn(timeout=seconds, **kwargs)
+        except (TimeoutError, requests.Timeout):
+            raise PhaseTimeout(limit, what, deadlines.limit(limit)) from None
+
+    def _phase(self, flow_id: str, phase: str):
+        if self.metrics is not None:
+            self.metrics.phase(flow_id, phase)
+
+    def _llm_call(self, usage: UsageTracker, before: tuple[int, int], ms: float):
+        """Reports the model calls made since `before` = (requests, total_tokens)."""
+        if self.metrics is not None and usage.requests > before[0]:
+            self.metrics.llm_call(ms, usage.total_tokens - before[1])
+
+    def plan_and_run(
+        self,
+        flow: dict,
+        raise_on_failure: bool = True,
+        on_event: Callable[[FlowEvent], None] | None = None,
+        cancel: threading.Event | None = None,
+    ) -> FlowResult:
+        """
+        Plans and executes one flow. Returns its FlowResult; when `raise_on_failure` is set
+        (the default) a failed flow raises AssertionError instead (FlowTimeout if it timed out).
+        `on_event` is called with each FlowEvent as it happens; setting `cancel` stops the flow
+        before its next step with status CANCELLED.
+        """
+        flow_result = FlowResult(
+            flow_id=flow.get("flow_id", ""),
+            collection=flow.get("collection", ""),
+            started_at=time.time(),
+        )
+        flow_id = flow_result.flow_id
+        emit = on_event or (lambda event: None)
+        emit(FlowStarted(flow_id, flow_result.collection))
+        flow_started = time.perf_counter()
+        usage = UsageTracker()
         initial_context = format_context(flow)
-        memory = MemoryStore()
+        # Flows that test authentication itself set `auth: false` and handle credentials.
+        authenticated = self.auth is not None and flow.get("auth", True) is not False
+        if authenticated:
+            initial_context += "\n\n" + self.auth.describe()
+        concurrency = flow.get("concurrency")
+        if concurrency:
+            initial_context += "\n\n" + describe(concurrency)
+        memory = MemoryStore(memory_format(self.prompt_formats.get("generator", PRETTY)).dumps)
         memory.store(initial_context, label="")
-        planned_calls = self.planner_agent.run(memory.get_context(), self.openapi_spec)
+        if self.metrics is not None:
+            self.metrics.flow_started(flow_result.flow_id)
+        deadlines = self._deadlines()
+        try:
+            planned_calls = self._call(
+                deadlines,
+                "llm",
+                "planning",
+                self.plan,
+                flow=flow,
+                context=memory.get_context(),
+                usage=usage,
+            )
+        except PhaseTimeout as e:
+            planned_calls = []
+            flow_result.status = "TIMEOUT"
+            flow_result.timed_out = e.phase
+            flow_result.error = f"\n{Colors.RED}Timed out while planning\n{Colors.RESET} {e}"
+        except Exception as e:
+            # Like a failed step: the flow fails and still finishes (FlowFinished, history).
+            planned_calls = []
+            flow_result.status = "FAIL"
+            flow_result.error = (
+                f"\n{Colors.RED}Planning failed\n{Colors.RESET} {type(e).__name__}: {e}"
+            )
+        except BaseException:
+            if self.metrics is not None:
+                self.metrics.flow_finished(flow_result.flow_id, passed=False)
+            raise
+        flow_result.planning_ms = (time.perf_counter() - flow_started) * 1000
+        self._llm_call(usage, (0, 0), flow_result.planning_ms)
+        flow_result.operations = [f"{call.method.upper()} {call.path}" for call in planned_calls]
+        if planned_calls:
+            emit(PlanReady(flow_id, flow_result.operations, flow_result.planning_ms))
+        cache_scope = flow.get("collection", "") if self.cache_scope == "collection" else ""
+        # Steps whose request is sent several times at once, as {step index: copies}.
+        probes = probe_targets(concurrency, planned_calls)
+        fixtures = load_fixtures(flow.get("files"))
+        # Prompts get the name, size and content type of each file, never its bytes.
+        files = [fixture.metadata() for fixture in fixtures.values()]
+        # Responses so far, for resolving {{$.steps[N].body...}} bindings in request templates.
+        bindings = []
+        # In pipeline mode, the next step's request generation, started before this step's
+        # verdict: (future, its deadlines, its usage). Discarded when the verdict is not PASS.
+        speculative = None
+        speculation_pool = None
+        if self.pipeline and len(planned_calls) > 1:
+            speculation_pool = ThreadPoolExecutor(max_workers=1)
         for i, call in enumerate(planned_calls):
+            if cancel is not None and cancel.is_set():
+                flow_result.status = "CANCELLED"
+                flow_result.error = f"Cancelled before step {i + 1}"
+                break
             step_name = f"{call.method.upper()} {call.path}"
+            result = None
+            progress = f"step {i + 1}/{len(planned_calls)} {step_name}"
+            future = None
+            if speculative is None:
+                step_usage = UsageTracker()
+                step_deadlines = deadlines.fork("step")
+            else:
+                future, step_deadlines, step_usage = speculative
+                speculative = None
+            # The step timer starts here, after the previous step's evaluation, even when this
+            # step's request is already being generated.
+            step_deadlines.open("step")
             try:
-                request_details = self.request_generator_agent.run(
-                    step=call,
-                    context=memory.get_context(),
-                    openapi_spec=self.openapi_spec,
+                self._phase(flow_result.flow_id, f"{progress}: generating")
+                if future is not None:
+                    request_details, generation_ms = future.result()
+                else:
+                    request_details, generation_ms = self.generate_request(
+                        call, bindings, memory.get_context(), step_deadlines, step_usage, files
+                    )
+                self._llm_call(step_usage, (0, 0), generation_ms)
+                from_template = isinstance(call, RequestTemplateModel) and not step_usage.requests
+                emit(
+                    RequestGenerated(
+                        flow_id,
+                        i,
+                        request_details["method"],
+                        request_details["path"],
+                        request_details.get("headers", {}),
+                        request_details.get("payload", {}),
+                        request_details.get("parameters", {}),
+                        from_template,
+                        generation_ms,
+                    )
+                )
+                self._phase(flow_result.flow_id, f"{progress}: HTTP")
+                request_kwargs = {
+                    "request_details": request_details,
+                    "cache_scope": cache_scope,
+                    "index": i,
+                    "fixtures": fixtures,
+                    "operation": (call.path, call.method) if authenticated else None,
+                }
+                what = f"{request_details['method'].upper()} {request_details['path']}"
+                if i in probes:
+                    result = self.probe(probes[i], step_deadlines, what, **request_kwargs)
+                else:
+                    result = self._call(
+                        step_deadlines, "http", what, self.request_api, **request_kwargs
+                    )
+                if self.metrics is not None:
+                    self.metrics.http_call(
+                        step_name, result.status, None if result.cached else result.http_ms
+                    )
+                result.generation_ms = generation_ms
+                result.from_template = from_template
+                result.expected_status = call.expected_status
+                result.response_check = call.response_check
+                result.schema_errors = self.validators.validate_response(
+                    call.path, call.method, result.status, result.body
+                )
+                flow_result.steps.append(result)
+                emit(
+                    ResponseReceived(
+                        flow_id,
+                        i,
+                        result.status,
+                        result.body,
+                        result.http_ms,
+                        result.cached,
+                        result.schema_errors,
+                    )
                 )
-                result = self.request_api(request_details)
-                result["expected_status"] = call.expected_status
-                result["response_check"] = call.response_check
-                check_result = self.evaluation_agent.run(
-                    context=memory.get_context(), result=result
+                # The evaluator sees the context up to this step; later steps also see its body.
+                context = memory.get_context()
+                memory.store(result.body, label=step_name)
+                if result.probe is not None:
+                    memory.store(result.probe, label=f"{step_name} concurrency probe")
+                bindings.append({"status": result.status, "body": result.body})
+                if speculation_pool is not None and i + 1 < len(planned_calls):
+                    next_deadlines = step_deadlines.fork("step")
+                    next_usage = UsageTracker()
+                    speculative = (
+                        speculation_pool.submit(
+                            self.generate_request,
+                            planned_calls[i + 1],
+                            list(bindings),
+                            memory.get_context(),
+                            next_deadlines,
+                            next_usage,
+                            files,
+                        ),
+                        next_deadlines,
+                        next_usage,
+                    )
+                self._phase(flow_result.flow_id, f"{progress}: evaluating")
+                before = (step_usage.requests, step_usage.total_tokens)
+                started = time.perf_counter()
+                check_result = self._call(
+                    step_deadlines,
+                    "llm",
+                    "evaluation",
+                    self.evaluate,
+                    context=context,
+                    result=result,
+                    usage=step_usage,
+                )
+                result.evaluation_ms = (time.perf_counter() - started) * 1000
+                self._llm_call(step_usage, before, result.evaluation_ms)
+                result.verdict = check_result.status
+                result.reason = check_result.reason
+                result.suggestion = check_result.suggestion
+                emit(
+                    Verdict(
+                        flow_id,
+                        i,
+                        result.verdict,
+                        result.reason,
+                        result.suggestion,
+                        result.evaluation_ms,
+                    )
                 )
                 if check_result.status != "PASS":
                     raise AssertionError(
                         f"  {Colors.YELLOW}Reason     :{Colors.RESET} {check_result.reason.strip()}\n\n"
-                        f" {Colors.YELLOW}Suggestion :{Colors.RESET} {check_result.suggestion.strip()}\n\n"
+                        f" {Colors.YELLOW}Suggestion :{Colors.RESET} {(check_result.suggestion or '').strip()}\n\n"
                         f" {Colors.YELLOW}Test Plan  :{Colors.RESET}\n{format_plans(planned_calls)}\n"
                     )
-                memory.store(result["response_body"], label=step_name)
             except Exception as e:
-                raise AssertionError(
-                    f"\n{Colors.RED}Step {i + 1} failed during {step_name}\n"
+                timed_out = isinstance(e, PhaseTimeout)
+                if result is not None and result.verdict is None:
+                    result.verdict = "TIMEOUT" if timed_out else "ERROR"
+                    result.reason = str(e).strip()
+                    emit(Verdict(flow_id, i, result.verdict, result.reason, None, 0.0))
+                flow_result.status = "TIMEOUT" if timed_out else "FAIL"
+                flow_result.timed_out = e.phase if timed_out else None
+                flow_result.failed_step = i
+                flow_result.error = (
+                    f"\n{Colors.RED}Step {i + 1} {'timed out' if timed_out else 'failed'} "
+                    f"during {step_name}\n"
                     f"{Colors.RESET} {str(e).strip()}"
                 )
+                break
+            finally:
+                if result is not None:
+                    result.input_tokens = step_usage.input_tokens
+                    result.output_tokens = step_usage.output_tokens
+                usage.input_tokens += step_usage.input_tokens
+                usage.output_tokens += step_usage.output_tokens
+
+        latency = flow.get("latency")
+        if latency and flow_result.passed and flow_result.steps:
+            self._phase(flow_result.flow_id, "checking latency")
+            try:
+                failures = self.check_latency(
+                    latency, flow_result, planned_calls, deadlines, authenticated
+                )
+            except PhaseTimeout as e:
+                flow_result.status = "TIMEOUT"
+                flow_result.timed_out = e.phase
+                flow_result.error = (
+                    f"\n{Colors.RED}Timed out while checking latency\n{Colors.RESET} {e}"
+                )
+            except Exception as e:
+                # A sample request that fails (connection refused, auth error) fails the flow
+                # like a failed step, and the flow still finishes normally below.
+                flow_result.status = "FAIL"
+                flow_result.error = (
+                    f"\n{Colors.RED}Latency check failed\n{Colors.RESET} {str(e).strip()}"
+                )
+            else:
+                if failures:
+                    flow_result.status = "FAIL"
+                    flow_result.failed_step = next(
+                        step.index
+                        for step in flow_result.steps
+                        if step.latency and step.latency["exceeded"]
+                    )
+                    flow_result.error = (
+                        f"\n{Colors.RED}Latency budget exceeded\n{Colors.RESET} "
+                        + "\n ".join(failures)
+                    )
+        if speculation_pool is not None:
+            # A generation still running for a step that will not run is left to finish alone.
+            speculation_pool.shutdown(wait=False, cancel_futures=True)
+        flow_result.input_tokens = usage.input_tokens
+        flow_result.output_tokens = usage.output_tokens
+        flow_result.duration_ms = (time.perf_counter() - flow_started) * 1000
+        if self.metrics is not None:
+            self.metrics.flow_finished(flow_result.flow_id, flow_result.passed)
+        # The result (and the events, history and exports built from it) carries plain text;
+        # colours are only for the exception a terminal shows.
+        message = flow_result.error
+        flow_result.error = strip_ansi(message)
+        emit(FlowFinished(flow_id, flow_result.status, flow_result.error, flow_result))
+        if raise_on_failure and flow_result.status == "TIMEOUT":
+            raise FlowTimeout(flow_result.timed_out, message)
+        if raise_on_failure and not flow_result.passed:
+            raise AssertionError(message)
+        return flow_result
+
+    async def stream(self, flow: dict) -> AsyncIterator[FlowEvent]:
+        """
+        Runs one flow on a worker thread and yields its events as they happen. Leaving the
+        `async for` early cancels the flow before its next step.
+        """
+        async for event in self.stream_all([flow], concurrency=1):
+            yield event
+
+    async def stream_all(
+        self, flows: Iterable[dict], concurrency: int = 4
+    ) -> AsyncIterator[FlowEvent]:
+        """
+        Runs flows `concurrency` at a time and yields the events of all of them in the order
+        they happen. A flow that raises ends with FlowFinished(status="ERROR").
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancel = threading.Event()
+        flows = list(flows)
+
+        def emit(event):
+            if cancel.is_set():
+                return
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass  # the caller's loop has already closed
+
+        def run(flow):
+            try:
+                self.plan_and_run(flow, raise_on_failure=False, on_event=emit, cancel=cancel)
+            except Exception as e:
+                emit(FlowFinished(flow.get("flow_id", ""), "ERROR", strip_ansi(str(e)), None))
+            finally:
+                emit(None)
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for flow in flows:
+                executor.submit(run, flow)
+            remaining = len(flows)
+            while remaining:
+                event = await queue.get()
+                if event is None:
+                    remaining -= 1
+                else:
+                    yield event
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,287 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator
+
+from api_ninja.cache import fingerprint
+from api_ninja.flowstore import load_flows, select_flows
+from api_ninja.history import DEFAULT_HISTORY_PATH
+
+DEFAULT_SOCKET_PATH = os.path.join(".api-ninja", "daemon.sock")
+
+# Request keys that decide how an APINinja is built; runs that agree on all of them share one.
+NINJA_OPTIONS = (
+    "base_url",
+    "cache_responses",
+    "cache_scope",
+    "cache_verdicts",
+    "plan_mode",
+    "pipeline",
+    "candidate_operations",
+    "auth",
+    "prompt_formats",
+    "phase_timeouts",
+    "model_specs",
+    "escalation_specs",
+)
+
+
+def _signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class NinjaDaemon:
+    """
+    Runs flows on request while keeping everything that survives between runs warm: the
+    imported agent stack, parsed specs and flow configs, and one APINinja per combination
+    of run options with its HTTP pool, operation index and plan and verdict caches.
+    Spec and config files are checked on every request and reloaded when they change, which
+    drops the caches built from them. Runs are served one at a time.
+    """
+
+    def __init__(self, history_db: str | None = DEFAULT_HISTORY_PATH):
+        # Pay for the heavy imports once, at start-up rather than on the first run.
+        import agents  # noqa: F401
+
+        import api_ninja.core  # noqa: F401
+
+        self.history_db = history_db
+        self.started_at = time.time()
+        self.runs = 0
+        self._specs: dict[str, tuple] = {}
+        self._flows: dict[str, tuple] = {}
+        self._ninjas: dict[str, tuple] = {}
+        self._run_lock = threading.Lock()
+
+    def _spec(self, request: dict) -> tuple[dict, str]:
+        """Returns (spec, its fingerprint), reparsing a spec file only when it changed."""
+        path = request.get("openapi_spec_path")
+        if not path:
+            import requests
+
+            spec = requests.get(request["openapi_spec_url"]).json()
+            return spec, fingerprint(spec)
+        signature = _signature(path)
+        cached = self._specs.get(path)
+        if cached is None or cached[0] != signature:
+            with open(path) as f:
+                if path.endswith(".json"):
+                    spec = json.load(f)
+                else:
+                    import yaml
+
+                    spec = yaml.safe_load(f)
+            cached = self._specs[path] = (signature, spec, fingerprint(spec))
+        return cached[1], cached[2]
+
+    def _config(self, path: str):
+        signature = _signature(path)
+        cached = self._flows.get(path)
+        if cached is None or cached[0] != signature:
+            if cached is not None and hasattr(cached[1], "close"):
+                cached[1].close()
+            cached = self._flows[path] = (signature, load_flows(path))
+        return cached[1]
+
+    def _ninja(self, request: dict, spec: dict, spec_hash: str):
+        """Returns (APINinja, warm) for the request's options, rebuilt when the spec changed."""
+        from api_ninja.agents.routing import ModelRouter
+        from api_ninja.agents.serialization import parse_prompt_formats
+        from api_ninja.auth import AuthManager
+        from api_ninja.core import APINinja
+        from api_ninja.timeouts import Timeouts
+
+        options = {name: request.get(name) for name in NINJA_OPTIONS}
+        if options["auth"]:
+            # Edited credentials mean a new AuthManager, and with it fresh tokens.
+            options["auth_signature"] = _signature(options["auth"])
+        key = fingerprint(options)
+        cached = self._ninjas.get(key)
+        if cached is not None and cached[0] == spec_hash:
+            return cached[1], True
+        auth = None
+        if options["auth"]:
+            auth = AuthManager.load(options["auth"], spec, request["base_url"])
+        ninja = APINinja(
+            openapi_spec=spec,
+            api_base_url=request["base_url"],
+            cache_responses=request.get("cache_responses", False),
+            cache_scope=request.get("cache_scope", "run"),
+            cache_verdicts=request.get("cache_verdicts", False),
+            plan_mode=request.get("plan_mode", "step"),
+            pipeline=request.get("pipeline", False),
+            candidate_operations=request.get("candidate_operations", 0),
+            auth=auth,
+            prompt_formats=parse_prompt_formats(request.get("prompt_formats", ())),
+            timeouts=Timeouts.parse(request.get("phase_timeouts", ())),
+            router=ModelRouter.parse(
+                request.get("model_specs", ()), request.get("escalation_specs", ())
+            ),
+            cache_plans=True,
+        )
+        self._ninjas[key] = (spec_hash, ninja)
+        return ninja, False
+
+    def run(self, request: dict, send: Callable[[dict], None]):
+        """
+        Runs the requested flows, sending a "started" event, one "flow" event per finished
+        flow and a closing "done" event. `send` raising (the client went away) cancels the
+        flows that have not started yet.
+        """
+        with self._run_lock:
+            started = time.time()
+            spec, spec_hash = self._spec(request)
+            ninja, warm = self._ninja(request, spec, spec_hash)
+            config = request["config"]
+            flows = select_flows(
+                self._config(config), request.get("flows", ()), request.get("collections", ())
+            )
+            ninja.start_run()
+            self.runs += 1
+
+            history = None
+            run_id = None
+            if self.history_db:
+                from api_ninja.history import RunHistory
+                from api_ninja.impact import changed_flows, record_flow_inputs
+
+                history = RunHistory(self.history_db)
+                run_id = history.start_run(config=config)
+                if request.get("changed_only"):
+                    changed = changed_flows(history, flows, spec)
+                    flows = {flow_id: flows[flow_id] for flow_id in changed}
+                flows = {flow_id: flows[flow_id] for flow_id in history.order(list(flows))}
+
+            plan_cache = (ninja.plan_cache.hits, ninja.plan_cache.misses)
+            verdict_cache = None
+            if ninja.verdict_cache is not None:
+                verdict_cache = (ninja.verdict_cache.hits, ninja.verdict_cache.misses)
+            cancel = threading.Event()
+
+            def run_flow(flow):
+                result = ninja.plan_and_run(flow, raise_on_failure=False, cancel=cancel)
+                retried = False
+                if history is not None:
+                    history.record(run_id, result)
+                    # Known-flaky flows get one more attempt before being reported as failed.
+                    if not result.passed and history.is_flaky(flow["flow_id"]):
+                        result = ninja.plan_and_run(flow, raise_on_failure=False, cancel=cancel)
+                        history.record(run_id, result, attempt=2)
+                        retried = True
+                    record_flow_inputs(history, flow, result, spec)
+                return result, retried
+
+            passed = 0
+            try:
+                send({"event": "started", "total": len(flows), "warm": warm})
+                with ThreadPoolExecutor(max_workers=request.get("workers", 1)) as pool:
+                    futures = [pool.submit(run_flow, flow) for flow in flows.values()]
+                    try:
+                        for future in as_completed(futures):
+                            result, retried = future.result()
+                            passed += result.passed
+                            send(
+                                {
+                                    "event": "flow",
+                                    "flow_id": result.flow_id,
+                                    "collection": result.collection,
+                                    "status": result.status,
+                                    "error": result.error,
+                                    "timed_out": result.timed_out,
+                                    "duration_ms": result.duration_ms,
+                                    "retried": retried,
+                                }
+                            )
+                    except BaseException:
+                        cancel.set()
+                        for future in futures:
+                            future.cancel()
+                        raise
+                hits = ninja.plan_cache.hits - plan_cache[0]
+                misses = ninja.plan_cache.misses - plan_cache[1]
+                rows = [("Plan Cache Hits", f"{hits}/{hits + misses}")]
+                if verdict_cache is not None:
+                    hits = ninja.verdict_cache.hits - verdict_cache[0]
+                    misses = ninja.verdict_cache.misses - verdict_cache[1]
+                    rows.append(("Verdict Cache Hits", f"{hits}/{hits + misses}"))
+                send(
+                    {
+                        "event": "done",
+                        "total": len(flows),
+                        "passed": passed,
+                        "elapsed_s": time.time() - started,
+                        "rows": rows,
+                    }
+                )
+            finally:
+                if history is not None:
+                    history.finish_run(run_id)
+                    history.close()
+
+
+def serve_daemon(daemon: NinjaDaemon, socket_path: str = DEFAULT_SOCKET_PATH):
+    """
+    Builds a Unix socket server for `daemon`. Each connection sends one JSON request line and
+    receives JSON event lines until "done" (or "error").
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def send(event: dict):
+                self.wfile.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+            try:
+                request = json.loads(self.rfile.readline())
+                if request.get("command") == "status":
+                    send(
+                        {
+                            "event": "status",
+                            "pid": os.getpid(),
+                            "uptime_s": time.time() - daemon.started_at,
+                            "runs": daemon.runs,
+                        }
+                    )
+                    return
+                daemon.run(request, send)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            except Exception as e:
+                try:
+                    send({"event": "error", "message": f"{type(e).__name__}: {e}"})
+                except OSError:
+                    pass
+
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    if os.path.exists(socket_path):
+        # A socket left behind by a daemon that is no longer running.
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    os.chmod(socket_path, 0o600)
+    return server
+
+
+def request_run(request: dict, socket_path: str = DEFAULT_SOCKET_PATH) -> Iterator[dict]:
+    """Sends one request to a running daemon and yields the events it streams back."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as stream:
+            for line in stream:
+                yield json.loads(line)
+    finally:
+        client.close()
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+
+from api_ninja.results import FlowResult
+
+
+@dataclass(slots=True)
+class FlowEvent:
+    """Base class of the events APINinja.stream() yields; all text is free of color codes."""
+
+    flow_id: str
+
+
+@dataclass(slots=True)
+class FlowStarted(FlowEvent):
+    collection: str
+
+
+@dataclass(slots=True)
+class PlanReady(FlowEvent):
+    operations: list[str]
+    planning_ms: float
+
+
+@dataclass(slots=True)
+class RequestGenerated(FlowEvent):
+    index: int
+    method: str
+    path: str
+    headers: dict
+    payload: object
+    parameters: dict
+    from_template: bool
+    generation_ms: float
+
+
+@dataclass(slots=True)
+class ResponseReceived(FlowEvent):
+    index: int
+    status: int | None
+    body: object
+    http_ms: float
+    cached: bool
+    schema_errors: list[str] | None
+
+
+@dataclass(slots=True)
+class Verdict(FlowEvent):
+    index: int
+    verdict: str
+    reason: str | None
+    suggestion: str | None
+    evaluation_ms: float
+
+
+@dataclass(slots=True)
+class FlowFinished(FlowEvent):
+    # PASS, FAIL, TIMEOUT, CANCELLED, or ERROR when the flow raised before it could finish
+    status: str
+    error: str | None
+    result: FlowResult | None
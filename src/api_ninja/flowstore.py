@@ -0,0 +1,250 @@
+import json
+import mmap
+import os
+from collections.abc import Mapping
+
+from api_ninja.cache import fingerprint
+from api_ninja.impact import FLOW_INPUT_KEYS, definition_fingerprint
+
+# Keys of a flow record that come from its collection rather than the flow itself.
+COLLECTION_KEYS = ("flow_id", "collection", "collection_description")
+
+
+def index_path(path: str) -> str:
+    return str(path) + ".idx"
+
+
+def index_header() -> str:
+    """The first line of an index: the flow keys its definition fingerprints cover."""
+    return json.dumps({"definition_keys": list(FLOW_INPUT_KEYS)}) + "\n"
+
+
+def is_flow_store(path) -> bool:
+    return str(path).endswith(".jsonl")
+
+
+class FlowStore(Mapping):
+    """
+    Read-only view of a JSON Lines flow file: one flow per line, plus an optional
+    {"defaults": [...]} line. A sidecar index (<file>.idx) maps each flow_id to the byte
+    range of its line and the fingerprint of its definition, so listing flows and checking
+    which ones changed read only the index, and a flow is parsed from the memory-mapped file
+    the first time it is looked up. A missing or stale index, or one whose fingerprints cover
+    other keys than FLOW_INPUT_KEYS, is rebuilt with one pass over the file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._entries: dict[str, tuple[int, int, str, str]] = {}
+        self._defaults = None
+        self._mmap = None
+        self._file = None
+        if not self._load_index():
+            self._rebuild_index()
+
+    def _load_index(self) -> bool:
+        try:
+            data_stat = os.stat(self.path)
+            index_stat = os.stat(index_path(self.path))
+        except FileNotFoundError:
+            return False
+        if data_stat.st_mtime_ns > index_stat.st_mtime_ns:
+            return False
+        end = 0
+        with open(index_path(self.path), "r") as f:
+            # Indexes without this header (or with fingerprints of other definition keys) come
+            # from an older version, and their fingerprints would never match the current ones.
+            if f.readline() != index_header():
+                return False
+            for line in f:
+                flow_id, offset, length, collection, definition = json.loads(line)
+                if flow_id is None:
+                    self._defaults = (offset, length)
+                else:
+                    self._entries[flow_id] = (offset, length, collection, definition)
+                end = max(end, offset + length)
+        if end != data_stat.st_size:
+            self._entries.clear()
+            self._defaults = None
+            return False
+        return True
+
+    def _rebuild_index(self):
+        entries = []
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if "flow_id" in record:
+                        entry = [
+                            record["flow_id"],
+                            offset,
+                            len(line),
+                            record.get("collection"),
+                            definition_fingerprint(record),
+                        ]
+                    else:
+                        entry = [None, offset, len(line), None, None]
+                    entries.append(entry)
+                offset += len(line)
+        with open(index_path(self.path), "w") as f:
+            f.write(index_header())
+            for flow_id, offset, length, collection, definition in entries:
+                f.write(json.dumps([flow_id, offset, length, collection, definition]) + "\n")
+                if flow_id is None:
+                    self._defaults = (offset, length)
+                else:
+                    self._entries[flow_id] = (offset, length, collection, definition)
+
+    def _read(self, offset: int, length: int) -> dict:
+        if self._mmap is None:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return json.loads(self._mmap[offset : offset + length])
+
+    @property
+    def defaults(self) -> list:
+        if self._defaults is None:
+            return []
+        return self._read(*self._defaults).get("defaults", [])
+
+    def collection(self, flow_id: str) -> str:
+        return self._entries[flow_id][2]
+
+    def fingerprints(self, flow_ids: list[str]) -> dict[str, str]:
+        """impact.flow_fingerprint of each flow, from the index and the shared defaults."""
+        defaults = self.defaults
+        return {flow_id: fingerprint([self._entries[flow_id][3], defaults]) for flow_id in flow_ids}
+
+    def __getitem__(self, flow_id: str) -> dict:
+        offset, length, _, _ = self._entries[flow_id]
+        flow = self._read(offset, length)
+        flow["defaults"] = self.defaults
+        return flow
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, flow_id) -> bool:
+        return flow_id in self._entries
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+            self._file = None
+
+
+class FlowWriter:
+    """
+    Appends flows to a JSON Lines flow file and its index as they are produced, so a long
+    generation run keeps everything finished so far and never holds the whole suite in memory.
+    """
+
+    def __init__(self, path, defaults: list | None = None, append: bool = False):
+        self.path = str(path)
+        mode = "ab" if append else "wb"
+        self._data = open(self.path, mode)
+        self._index = open(index_path(self.path), "a" if append else "w")
+        if self._index.tell() == 0:
+            self._index.write(index_header())
+        self._offset = self._data.tell()
+        if defaults:
+            self._write(None, None, {"defaults": defaults})
+
+    def _write(self, flow_id, collection, record: dict):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        definition = definition_fingerprint(record) if flow_id is not None else None
+        self._data.write(line)
+        entry = [flow_id, self._offset, len(line), collection, definition]
+        self._index.write(json.dumps(entry) + "\n")
+        self._offset += len(line)
+
+    def write_collection(self, name: str, description: str, flows: dict[str, dict]):
+        for flow_id, flow in flows.items():
+            record = {"flow_id": flow_id, "collection": name, "collection_description": description}
+            record.update((k, v) for k, v in flow.items() if k not in COLLECTION_KEYS)
+            self._write(flow_id, name, record)
+        # The data is flushed before the index so the index never points past the data.
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def collect_flows(cfg: dict) -> dict[str, dict]:
+    defaults = cfg.get("defaults", [])
+    out = {}
+    for coll_name, coll in cfg["collections"].items():
+        for flow_id in coll["flows"]:
+            flow = dict(cfg["flows"][flow_id])
+            flow.update(
+                flow_id=flow_id,
+                collection=coll_name,
+                collection_description=coll.get("description", ""),
+                defaults=defaults,
+            )
+            if "latency" in coll:
+                # A collection's latency budget applies to flows that do not set their own.
+                flow.setdefault("latency", coll["latency"])
+            out[flow_id] = flow
+    return out
+
+
+def load_flows(path) -> Mapping[str, dict]:
+    """
+    Returns {flow_id: flow} for a YAML config or a lazily read JSON Lines flow file.
+    """
+    if is_flow_store(path):
+        return FlowStore(path)
+    import yaml
+
+    with open(path, "r") as f:
+        return collect_flows(yaml.safe_load(f))
+
+
+def select_flows(flows: Mapping[str, dict], flow_ids=(), collections=()) -> Mapping[str, dict]:
+    """
+    The named flows plus every flow of the named collections, or all flows when neither is
+    given. Raises ValueError for names that are not in the config.
+    """
+    if not flow_ids and not collections:
+        return flows
+    if isinstance(flows, FlowStore):
+        collection_of = flows.collection
+    else:
+        collection_of = lambda flow_id: flows[flow_id]["collection"]  # noqa: E731
+    flow_collections = {flow_id: collection_of(flow_id) for flow_id in flows}
+    unknown = [flow_id for flow_id in flow_ids if flow_id not in flows]
+    unknown += [name for name in collections if name not in flow_collections.values()]
+    if unknown:
+        raise ValueError(f"Not in the config: {', '.join(unknown)}")
+    return {
+        flow_id: flows[flow_id]
+        for flow_id, collection in flow_collections.items()
+        if flow_id in flow_ids or collection in collections
+    }
+
+
+def convert_flows(cfg: dict, out: str):
+    """Writes a YAML-style {"flows", "collections", "defaults"} config as a flow file."""
+    with FlowWriter(out, defaults=cfg.get("defaults")) as writer:
+        for coll_name, coll in cfg["collections"].items():
+            flows = {flow_id: dict(cfg["flows"][flow_id]) for flow_id in coll["flows"]}
+            if "latency" in coll:
+                for flow in flows.values():
+                    flow.setdefault("latency", coll["latency"])
+            writer.write_collection(coll_name, coll.get("description", ""), flows)
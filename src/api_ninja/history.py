@@ -0,0 +1,278 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from api_ninja.results import FlowResult
+from api_ninja.stats import percentile
+
+DEFAULT_HISTORY_PATH = os.path.join(".api-ninja", "history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS flow_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    flow_id TEXT NOT NULL,
+    collection TEXT,
+    status TEXT NOT NULL,
+    attempt INTEGER NOT NULL DEFAULT 1,
+    started_at REAL,
+    duration_ms REAL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    failed_step INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS flow_runs_by_flow ON flow_runs(flow_id, id);
+CREATE TABLE IF NOT EXISTS step_runs (
+    flow_run_id INTEGER NOT NULL REFERENCES flow_runs(id),
+    idx INTEGER NOT NULL,
+    method TEXT,
+    path TEXT,
+    status INTEGER,
+    verdict TEXT,
+    generation_ms REAL,
+    http_ms REAL,
+    evaluation_ms REAL,
+    input_tokens INTEGER,
+    output_tokens INTEGER
+);
+CREATE TABLE IF NOT EXISTS flow_inputs (
+    flow_id TEXT PRIMARY KEY,
+    definition TEXT NOT NULL,
+    operations TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class FlowStats:
+    runs: int
+    failures: int
+    last_status: str
+    median_ms: float | None
+    flaky: bool
+
+
+class RunHistory:
+    """
+    Local SQLite record of every flow run, used to order flows, spot flaky flows and show
+    duration trends. Safe to share between threads and between pytest-xdist workers.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, window: int = 10):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.window = window
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def start_run(self, key: str | None = None, config: str = "") -> int:
+        """Starts a run, or joins the existing run with the same key (e.g. the xdist run id)."""
+        with self._lock, self._conn:
+            if key is not None:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO runs (key, started_at, config) VALUES (?, ?, ?)",
+                    (key, time.time(), config),
+                )
+                row = self._conn.execute("SELECT id FROM runs WHERE key = ?", (key,)).fetchone()
+                return row[0]
+            cursor = self._conn.execute(
+                "INSERT INTO runs (started_at, config) VALUES (?, ?)", (time.time(), config)
+            )
+            return cursor.lastrowid
+
+    def finish_run(self, run_id: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), run_id)
+            )
+
+    def record(self, run_id: int, result: FlowResult, attempt: int = 1):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO flow_runs (
+                    run_id, flow_id, collection, status, attempt, started_at, duration_ms,
+                    input_tokens, output_tokens, failed_step, error
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run_id,
+                    result.flow_id,
+                    result.collection,
+                    result.status,
+                    attempt,
+                    result.started_at,
+                    result.duration_ms,
+                    result.input_tokens,
+                    result.output_tokens,
+                    result.failed_step,
+                    result.error,
+                ),
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO step_runs (
+                    flow_run_id, idx, method, path, status, verdict, generation_ms, http_ms,
+                    evaluation_ms, input_tokens, output_tokens
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        cursor.lastrowid,
+                        step.index,
+                        step.method,
+                        step.path,
+                        step.status,
+                        step.verdict,
+                        step.generation_ms,
+                        step.http_ms,
+                        step.evaluation_ms,
+                        step.input_tokens,
+                        step.output_tokens,
+                    )
+                    for step in result.steps
+                ],
+            )
+
+    def save_inputs(self, flow_id: str, definition: str, operations: dict[str, str], status: str):
+        """Remembers what a flow's last run depended on, for --changed-only."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO flow_inputs (flow_id, definition, operations, status, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (flow_id, definition, json.dumps(operations), status, time.time()),
+            )
+
+    def load_inputs(self, flow_ids: list[str]) -> dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT flow_id, definition, operations, status FROM flow_inputs"
+            ).fetchall()
+        wanted = set(flow_ids)
+        return {
+            flow_id: {
+                "definition": definition,
+                "operations": json.loads(operations),
+                "status": status,
+            }
+            for flow_id, definition, operations, status in rows
+            if flow_id in wanted
+        }
+
+    def flow_stats(self, flow_id: str) -> FlowStats | None:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT status, attempt, duration_ms FROM flow_runs
+                WHERE flow_id = ? ORDER BY id DESC LIMIT ?
+                """,
+                (flow_id, self.window),
+            ).fetchall()
+        if not rows:
+            return None
+        statuses = [status for status, _, _ in rows]
+        flips = sum(1 for a, b in zip(statuses, statuses[1:]) if (a == "PASS") != (b == "PASS"))
+        passed_on_retry = any(status == "PASS" and attempt > 1 for status, attempt, _ in rows)
+        return FlowStats(
+            runs=len(rows),
+            failures=sum(1 for status in statuses if status != "PASS"),
+            last_status=statuses[0],
+            median_ms=percentile([ms for _, _, ms in rows if ms is not None], 50),
+            flaky=passed_on_retry or flips >= 2,
+        )
+
+    def is_flaky(self, flow_id: str) -> bool:
+        stats = self.flow_stats(flow_id)
+        return stats is not None and stats.flaky
+
+    def order(self, flow_ids: list[str]) -> list[str]:
+        """
+        Flows that failed last time first, so regressions surface early, then the rest
+        longest-first so parallel workers finish together. Flows with no history count as
+        long, since they are most likely to need the most planning.
+        """
+
+        def sort_key(flow_id):
+            stats = self.flow_stats(flow_id)
+            if stats is None:
+                return (1, -float("inf"))
+            failed = stats.last_status != "PASS"
+            return (0 if failed else 1, -(stats.median_ms or 0))
+
+        return sorted(flow_ids, key=sort_key)
+
+    def run_trends(self, limit: int = 20) -> list[dict]:
+        with self._lock:
+            runs = self._conn.execute(
+                "SELECT id, started_at FROM runs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            trends = []
+            for run_id, started_at in reversed(runs):
+                rows = self._conn.execute(
+                    """
+                    SELECT flow_id, status, duration_ms FROM flow_runs
+                    WHERE run_id = ? ORDER BY id
+                    """,
+                    (run_id,),
+                ).fetchall()
+                if not rows:
+                    continue
+                final = {flow_id: (status, ms) for flow_id, status, ms in rows}
+                durations = [ms for _, ms in final.values() if ms is not None]
+                trends.append(
+                    {
+                        "run_id": run_id,
+                        "started_at": started_at,
+                        "flows": len(final),
+                        "passed": sum(1 for status, _ in final.values() if status == "PASS"),
+                        "retried": len(rows) - len(final),
+                        "p50_ms": percentile(durations, 50),
+                        "p95_ms": percentile(durations, 95),
+                    }
+                )
+        return trends
+
+    def flow_trend(self, flow_id: str, limit: int = 20) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT run_id, started_at, status, attempt, duration_ms, input_tokens, output_tokens
+                FROM flow_runs WHERE flow_id = ? ORDER BY id DESC LIMIT ?
+                """,
+                (flow_id, limit),
+            ).fetchall()
+        keys = ("run_id", "started_at", "status", "attempt", "duration_ms")
+        return [
+            {**dict(zip(keys, row[:5])), "tokens": (row[5] or 0) + (row[6] or 0)}
+            for row in reversed(rows)
+        ]
+
+    def flaky_flows(self) -> list[str]:
+        with self._lock:
+            flow_ids = [
+                row[0] for row in self._conn.execute("SELECT DISTINCT flow_id FROM flow_runs")
+            ]
+        return sorted(flow_id for flow_id in flow_ids if self.is_flaky(flow_id))
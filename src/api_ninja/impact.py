@@ -0,0 +1,93 @@
+from collections.abc import Mapping
+
+from api_ninja.cache import fingerprint
+from api_ninja.openapi import slice_operation
+
+# The parts of a flow definition that change what the planner and evaluator are asked to do,
+# or how its requests are sent and judged, besides the defaults it shares with every other
+# flow of its file. `latency` includes a collection's budget, which collect_flows copies in.
+FLOW_INPUT_KEYS = (
+    "description",
+    "expectations",
+    "notes",
+    "collection_description",
+    "latency",
+    "concurrency",
+    "files",
+    "auth",
+)
+
+
+def definition_fingerprint(flow: dict) -> str:
+    """A hash of the flow's own inputs; flow files keep it in their index."""
+    return fingerprint({key: flow.get(key) for key in FLOW_INPUT_KEYS})
+
+
+def flow_fingerprint(flow: dict, definition: str | None = None) -> str:
+    return fingerprint([definition or definition_fingerprint(flow), flow.get("defaults") or []])
+
+
+def flow_fingerprints(flows: Mapping[str, dict], flow_ids: list[str]) -> dict[str, str]:
+    """
+    flow_fingerprint for each of `flow_ids`. A FlowStore answers from its index, without
+    reading the flows themselves.
+    """
+    if hasattr(flows, "fingerprints"):
+        return flows.fingerprints(flow_ids)
+    return {flow_id: flow_fingerprint(flows[flow_id]) for flow_id in flow_ids}
+
+
+def operation_fingerprints(openapi_spec: dict, operations: list[str]) -> dict[str, str]:
+    """
+    Maps each "METHOD /path" to a hash of its slice of the spec (the operation and every
+    component it references), so unrelated spec edits do not count as a change.
+    """
+    fingerprints = {}
+    for operation in operations:
+        method, _, path = operation.partition(" ")
+        sliced = slice_operation(openapi_spec, method, path)
+        fingerprints[operation] = fingerprint(sliced) if sliced["paths"] else ""
+    return fingerprints
+
+
+def changed_flows(
+    history, flows: Mapping[str, dict], openapi_spec: dict, flow_ids: list[str] | None = None
+) -> dict[str, str]:
+    """
+    Returns {flow_id: reason} for the flows (of `flow_ids`, default all) that have to run:
+    new flows, flows whose definition or touched operations changed since their last run,
+    and flows that did not pass last time.
+    """
+    flow_ids = list(flows) if flow_ids is None else list(flow_ids)
+    recorded = history.load_inputs(flow_ids)
+    passed = [flow_id for flow_id in flow_ids if recorded.get(flow_id, {}).get("status") == "PASS"]
+    definitions = flow_fingerprints(flows, passed)
+    current_operations = {}
+    changed = {}
+    for flow_id in flow_ids:
+        inputs = recorded.get(flow_id)
+        if inputs is None:
+            changed[flow_id] = "no previous run"
+            continue
+        if inputs["status"] != "PASS":
+            changed[flow_id] = f"last run {inputs['status']}"
+            continue
+        if inputs["definition"] != definitions[flow_id]:
+            changed[flow_id] = "flow definition changed"
+            continue
+        for operation, previous in inputs["operations"].items():
+            if operation not in current_operations:
+                current_operations.update(operation_fingerprints(openapi_spec, [operation]))
+            if current_operations[operation] != previous:
+                changed[flow_id] = f"{operation} changed"
+                break
+    return changed
+
+
+def record_flow_inputs(history, flow: dict, result, openapi_spec: dict):
+    history.save_inputs(
+        flow["flow_id"],
+        flow_fingerprint(flow),
+        operation_fingerprints(openapi_spec, result.operations),
+        result.status,
+    )
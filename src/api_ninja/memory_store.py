@@ -2,12 +2,14 @@ import json
 
 
 class MemoryStore:
-    def __init__(self):
+    def __init__(self, dumps=None):
+        # How dicts and lists are written into the context, e.g. PromptFormat.dumps.
+        self.dumps = dumps or (lambda obj: json.dumps(obj, indent=2))
         self.context_str = ""
 
     def store(self, obj, label: str = None):
         if isinstance(obj, (dict, list)):
-            text = json.dumps(obj, indent=2)
+            text = self.dumps(obj)
         else:
             text = str(obj)
 
@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api_ninja.stats import percentile
+
+
+@dataclass
+class Snapshot:
+    total: int
+    done: int
+    failed: int
+    elapsed_s: float
+    eta_s: float | None
+    tokens: int
+    tokens_per_minute: float
+    llm_p50_ms: float | None
+    llm_p95_ms: float | None
+    http_p50_ms: float | None
+    http_p95_ms: float | None
+    # (flow_id, phase, elapsed seconds), longest-running first
+    in_flight: list[tuple[str, str, float]] = field(default_factory=list)
+    # {"METHOD /path": {status: count}}
+    statuses: dict[str, dict[int, int]] = field(default_factory=dict)
+
+
+class MetricsCollector:
+    """
+    Thread-safe live counters for a run: in-flight flows and their phase, rolling LLM and
+    HTTP latency, token throughput and response statuses per endpoint. Fed by APINinja and
+    read by the live dashboard and the /metrics endpoint.
+    """
+
+    def __init__(self, window: int = 200, rate_window_s: float = 60.0):
+        self._lock = threading.Lock()
+        self._llm_ms = deque(maxlen=window)
+        self._http_ms = deque(maxlen=window)
+        self._token_events = deque()
+        self._rate_window_s = rate_window_s
+        self._in_flight: dict[str, tuple[str, float]] = {}
+        self._statuses: dict[str, Counter] = {}
+        self._expected_ms: dict[str, float | None] = {}
+        self._durations_ms: list[float] = []
+        # Latest outcome per flow, so a retried flow is counted once.
+        self._outcomes: dict[str, bool] = {}
+        self.workers = 1
+        self.started = time.time()
+        self.total = 0
+        self.tokens = 0
+
+    def expect(self, expected_ms: dict[str, float | None], workers: int = 1):
+        """Registers the flows of the run with their historical durations, for the ETA."""
+        with self._lock:
+            self._expected_ms = dict(expected_ms)
+            self.total = len(expected_ms)
+            self.workers = max(1, workers)
+
+    def flow_started(self, flow_id: str):
+        with self._lock:
+            self._in_flight[flow_id] = ("planning", time.time())
+
+    def phase(self, flow_id: str, phase: str):
+        with self._lock:
+            if flow_id in self._in_flight:
+                self._in_flight[flow_id] = (phase, self._in_flight[flow_id][1])
+
+    def flow_finished(self, flow_id: str, passed: bool):
+        with self._lock:
+            _, started = self._in_flight.pop(flow_id, ("", time.time()))
+            self._durations_ms.append((time.time() - started) * 1000)
+            self._expected_ms.pop(flow_id, None)
+            self._outcomes[flow_id] = passed
+
+    def llm_call(self, ms: float, tokens: int = 0):
+        now = time.time()
+        with self._lock:
+            self._llm_ms.append(ms)
+            self.tokens += tokens
+            self._token_events.append((now, tokens))
+
+    def http_call(self, endpoint: str, status: int | None, ms: float | None = None):
+        with self._lock:
+            if ms is not None:
+                self._http_ms.append(ms)
+            self._statuses.setdefault(endpoint, Counter())[status] += 1
+
+    def _eta_s(self, now: float) -> float | None:
+        if not self._expected_ms and not self._in_flight:
+            return 0.0 if self.total else None
+        fallback = percentile(self._durations_ms, 50)
+        remaining = 0.0
+        for flow_id, expected in self._expected_ms.items():
+            expected = expected if expected is not None else fallback
+            if expected is None:
+                return None
+            if flow_id in self._in_flight:
+                elapsed_ms = (now - self._in_flight[flow_id][1]) * 1000
+                expected = max(expected - elapsed_ms, 0.0)
+            remaining += expected
+        return remaining / 1000 / self.workers
+
+    def snapshot(self) -> Snapshot:
+        now = time.time()
+        with self._lock:
+            while self._token_events and now - self._token_events[0][0] > self._rate_window_s:
+                self._token_events.popleft()
+            window = min(self._rate_window_s, max(now - self.started, 1.0))
+            recent = sum(tokens for _, tokens in self._token_events)
+            llm = list(self._llm_ms)
+            http = list(self._http_ms)
+            in_flight = sorted(
+                (
+                    (flow_id, phase, now - started)
+                    for flow_id, (phase, started) in self._in_flight.items()
+                ),
+                key=lambda entry: -entry[2],
+            )
+            return Snapshot(
+                total=self.total,
+                done=len(self._outcomes),
+                failed=sum(1 for passed in self._outcomes.values() if not passed),
+                elapsed_s=now - self.started,
+                eta_s=self._eta_s(now),
+                tokens=self.tokens,
+                tokens_per_minute=recent * 60 / window,
+                llm_p50_ms=percentile(llm, 50),
+                llm_p95_ms=percentile(llm, 95),
+                http_p50_ms=percentile(http, 50),
+                http_p95_ms=percentile(http, 95),
+                in_flight=in_flight,
+                statuses={endpoint: dict(counts) for endpoint, counts in self._statuses.items()},
+            )
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(collector: MetricsCollector, router=None) -> str:
+    """
+    Formats a snapshot in the Prometheus text exposition format, with per-role model call,
+    parse-failure and escalation counts when a ModelRouter is given.
+    """
+    snap = collector.snapshot()
+    lines = [
+        "# TYPE apininja_flows_total gauge",
+        f"apininja_flows_total {snap.total}",
+        "# TYPE apininja_flows_finished_total counter",
+        f'apininja_flows_finished_total{{status="pass"}} {snap.done - snap.failed}',
+        f'apininja_flows_finished_total{{status="fail"}} {snap.failed}',
+        "# TYPE apininja_flows_in_flight gauge",
+        f"apininja_flows_in_flight {len(snap.in_flight)}",
+        "# TYPE apininja_flow_elapsed_seconds gauge",
+    ]
+    for flow_id, phase, elapsed in snap.in_flight:
+        lines.append(
+            f'apininja_flow_elapsed_seconds{{flow_id="{_label(flow_id)}",phase="{_label(phase)}"}}'
+            f" {elapsed:.3f}"
+        )
+    for name, p50, p95 in (
+        ("llm", snap.llm_p50_ms, snap.llm_p95_ms),
+        ("http", snap.http_p50_ms, snap.http_p95_ms),
+    ):
+        lines.append(f"# TYPE apininja_{name}_latency_ms summary")
+        for quantile, value in (("0.5", p50), ("0.95", p95)):
+            if value is not None:
+                lines.append(f'apininja_{name}_latency_ms{{quantile="{quantile}"}} {value:.3f}')
+    lines += [
+        "# TYPE apininja_tokens_total counter",
+        f"apininja_tokens_total {snap.tokens}",
+        "# TYPE apininja_tokens_per_minute gauge",
+        f"apininja_tokens_per_minute {snap.tokens_per_minute:.1f}",
+        "# TYPE apininja_http_responses_total counter",
+    ]
+    for endpoint, counts in sorted(snap.statuses.items()):
+        for status, count in sorted(counts.items(), key=lambda item: str(item[0])):
+            lines.append(
+                f'apininja_http_responses_total{{endpoint="{_label(endpoint)}",'
+                f'status="{status}"}} {count}'
+            )
+    if snap.eta_s is not None:
+        lines += ["# TYPE apininja_eta_seconds gauge", f"apininja_eta_seconds {snap.eta_s:.1f}"]
+    if router is not None:
+        for metric, attribute in (
+            ("model_calls_total", "calls"),
+            ("model_parse_failures_total", "parse_failures"),
+            ("model_escalations_total", "escalations"),
+        ):
+            lines.append(f"# TYPE apininja_{metric} counter")
+            for role, stats in router.stats.items():
+                lines.append(f'apininja_{metric}{{role="{role}"}} {getattr(stats, attribute)}')
+    return "\n".join(lines) + "\n"
+
+
+def serve_metrics(collector: MetricsCollector, port: int, host: str = "127.0.0.1", router=None):
+    """Serves GET /metrics from a daemon thread; returns the server (call .shutdown())."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus(collector, router).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,252 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from api_ninja.contract import RequestSynthesizer
+from api_ninja.openapi import PathMatcher
+from api_ninja.validation import ValidatorRegistry
+
+
+def _schema_name(schema: dict | None) -> tuple[str | None, bool]:
+    """Returns (component name, is_array) for a $ref schema or an array of $refs."""
+    if not schema:
+        return None, False
+    if schema.get("type") == "array":
+        return _schema_name(schema.get("items"))[0], True
+    ref = schema.get("$ref", "")
+    return (ref.rsplit("/", 1)[-1] or None), False
+
+
+def _merge(target: dict, update: dict) -> dict:
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+def _matches(value, wanted: str) -> bool:
+    """Whether any field nested in `value` contains `wanted` (case-insensitive)."""
+    if isinstance(value, dict):
+        return any(_matches(v, wanted) for v in value.values())
+    if isinstance(value, list):
+        return any(_matches(v, wanted) for v in value)
+    return value is not None and wanted.lower() in str(value).lower()
+
+
+class MockAPI:
+    """
+    Answers requests for every operation in a spec from an in-memory store of resources,
+    keyed by the response schema they are returned as (e.g. "User") and their id:
+    - POST creates (from the request body, filling the rest from schema examples),
+    - GET on an item path reads it, GET on a collection lists (filtered by query values),
+    - PUT/PATCH merge the body into the stored resource, DELETE removes it,
+    - other operations under an item that return it (POST /users/{id}/activate) update it.
+    Resources created under an item (POST /users/{id}/tags) belong to it: nested paths only
+    list and find the ones created under the same parent ids. Unknown ids give 404, DELETE on
+    a collection 405 and request bodies that break the schema 422. Optional latency
+    and error injection make it usable as a deterministic benchmark target.
+    """
+
+    def __init__(
+        self,
+        openapi_spec: dict,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.openapi_spec = openapi_spec
+        self.paths = PathMatcher(openapi_spec)
+        self.validators = ValidatorRegistry(openapi_spec)
+        self.synthesizer = RequestSynthesizer(openapi_spec)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._store: dict[str, dict[str, dict]] = {}
+        self._last_ids: dict[str, int] = {}
+        # (name, id) -> values of the parent path parameters a resource was created under.
+        self._parents: dict[tuple[str, str], tuple[str, ...]] = {}
+
+    def _success(self, operation: dict) -> int:
+        codes = [int(code) for code in map(str, operation.get("responses", {})) if code.isdigit()]
+        return min((code for code in codes if 200 <= code < 300), default=200)
+
+    def _id_field(self, resource: dict) -> str | None:
+        if "id" in resource:
+            return "id"
+        return next((key for key in resource if key.lower().endswith("id")), None)
+
+    def _property_schema(self, schema: dict, field: str) -> dict:
+        schema = self.synthesizer.resolve(schema)
+        if field in schema.get("properties", {}):
+            return self.synthesizer.resolve(schema["properties"][field])
+        for sub in schema.get("allOf", []):
+            found = self._property_schema(sub, field)
+            if found:
+                return found
+        return {}
+
+    def _new_id(self, name: str, schema: dict):
+        """A fresh id of the type the schema declares: 1, 2, 3... per resource, else a uuid."""
+        id_type = schema.get("type")
+        if isinstance(id_type, list):
+            id_type = next((t for t in id_type if t != "null"), None)
+        if id_type in ("integer", "number"):
+            self._last_ids[name] = self._last_ids.get(name, 0) + 1
+            return self._last_ids[name]
+        return str(uuid.uuid4())
+
+    def _returns(self, template: str, method: str) -> str | None:
+        operation = self.openapi_spec["paths"].get(template, {}).get(method)
+        if operation is None:
+            return None
+        return _schema_name(
+            self.validators.response_schema(template, method, self._success(operation))
+        )[0]
+
+    def _item_name(self, template: str) -> str | None:
+        """The resource an item path holds: what GET on it returns, else what its collection does."""
+        collection = template.rstrip("/").rsplit("/", 1)[0]
+        return (
+            self._returns(template, "get")
+            or self._returns(collection, "post")
+            or self._returns(collection, "get")
+        )
+
+    def _parent_name(self, segments: list[str]) -> str | None:
+        last = max(i for i, segment in enumerate(segments) if segment.startswith("{"))
+        return self._item_name("/".join(segments[: last + 1]))
+
+    def _under(self, name: str, key: str, parents: tuple[str, ...]) -> bool:
+        return not parents or self._parents.get((name, key), ()) == parents
+
+    def _create(self, name: str, schema: dict, data, parents: tuple[str, ...] = ()) -> dict:
+        resource = self.synthesizer.example(schema, writing=False)
+        if not isinstance(resource, dict):
+            return data
+        if isinstance(data, dict):
+            _merge(resource, data)
+        id_field = self._id_field(resource)
+        if id_field is not None:
+            resource[id_field] = self._new_id(name, self._property_schema(schema, id_field))
+            self._store.setdefault(name, {})[str(resource[id_field])] = resource
+            self._parents[(name, str(resource[id_field]))] = parents
+        return resource
+
+    def handle(self, method: str, target: str, body=None) -> tuple[int, object]:
+        """Returns (status, JSON body or None) for one request."""
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 500, {"detail": "Injected error"}
+
+        url = urlsplit(target)
+        resolved = self.paths.resolve(url.path)
+        if resolved is None:
+            return 404, {"detail": "Not Found"}
+        template, params = resolved
+        method = method.lower()
+        operation = self.openapi_spec["paths"][template].get(method)
+        if operation is None:
+            return 405, {"detail": "Method Not Allowed"}
+
+        if self.validators.request_schema(template, method) is not None:
+            errors = self.validators.validate_request(template, method, body)
+            if errors:
+                return 422, {"detail": errors}
+
+        segments = template.rstrip("/").split("/")
+        on_item = segments[-1].startswith("{")
+        if method == "delete" and not on_item:
+            return 405, {"detail": "Method Not Allowed"}
+        status = self._success(operation)
+        schema = self.validators.response_schema(template, method, status)
+        name, is_array = _schema_name(schema)
+        if method == "delete":
+            # DELETE usually declares no body; the resource is the one the item path holds.
+            name = self._item_name(template) or name
+        values = tuple(str(value) for value in params.values())
+        if on_item:
+            item_id, parents = values[-1], values[:-1]
+        elif values and not is_array and (method != "post" or name == self._parent_name(segments)):
+            # An operation on the parent item that returns it, e.g. POST /users/{id}/activate.
+            item_id, parents = values[-1], values[:-1]
+        else:
+            item_id, parents = None, values
+
+        with self._lock:
+            if name is None:
+                if not schema:
+                    # No schema at all means no body; an empty one ({}) means "any JSON".
+                    return status, None if schema is None else {}
+                return status, self.synthesizer.example(schema, writing=False)
+            resources = self._store.setdefault(name, {})
+            if method == "post" and item_id is None:
+                if is_array:
+                    items = body if isinstance(body, list) else [body]
+                    return status, [
+                        self._create(name, schema["items"], item, parents) for item in items
+                    ]
+                return status, self._create(name, schema, body, parents)
+            if is_array:
+                query = dict(parse_qsl(url.query))
+                return status, [
+                    resource
+                    for key, resource in resources.items()
+                    if self._under(name, key, parents)
+                    and all(_matches(resource, value) for value in query.values())
+                ]
+            resource = resources.get(item_id) if item_id is not None else None
+            if resource is None or not self._under(name, item_id, parents):
+                return 404, {"detail": f"{name} not found"}
+            if method == "delete":
+                del resources[item_id]
+                self._parents.pop((name, item_id), None)
+                return status, None if status == 204 else resource
+            if isinstance(body, dict):
+                _merge(resource, body)
+            return status, resource
+
+
+def serve_mock(mock: MockAPI, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """Builds the HTTP server for `mock`; it also serves the spec at /openapi.json."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, status: int, body):
+            data = b"" if body is None else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            if body is not None:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if self.path == "/openapi.json" and self.command == "GET":
+                self._respond(200, mock.openapi_spec)
+                return
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                self._respond(400, {"detail": "Request body is not valid JSON"})
+                return
+            self._respond(*mock.handle(self.command, self.path, body))
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
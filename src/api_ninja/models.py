@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -12,6 +12,14 @@ class ApiCallModel(BaseModel):
     response_check: str
 
 
+class RequestModel(BaseModel):
+    method: str
+    path: str = Field(..., description="Path with every placeholder replaced by a real value")
+    payload: Optional[Any] = Field(None, description="JSON request body, or null")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Query parameters")
+    headers: Dict[str, str] = Field(default_factory=dict)
+
+
 class GoalModel(BaseModel):
     goal: str
     steps: List[ApiCallModel]
@@ -28,3 +36,23 @@ class FlowModel(BaseModel):
     description: str
     expectations: str
     notes: str
+
+
+class FlowScoreModel(BaseModel):
+    id: str
+    score: float = Field(..., description="0.0 (unusable) to 1.0 (accurate and executable)")
+    feedback: str = Field(..., description="What to change to make the flow score higher")
+
+
+class RequestTemplateModel(ApiCallModel):
+    resolved_path: str = Field(
+        ..., description="Concrete path; values from earlier steps as {{$.steps[N].body.field}}"
+    )
+    payload_json: str = Field(..., description="JSON request body with bindings, or {}")
+    parameters_json: str = Field(..., description="JSON object of query parameters, or {}")
+    headers_json: str = Field(..., description="JSON object of request headers, or {}")
+
+
+class TemplatePlanModel(BaseModel):
+    goal: str
+    steps: List[RequestTemplateModel]
@@ -0,0 +1,177 @@
+import copy
+import re
+from typing import Iterator
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+
+
+def iter_operations(openapi_spec: dict) -> Iterator[tuple[str, str, dict]]:
+    """
+    Yields (path, method, operation) for every supported operation in the spec.
+    """
+    for path, methods in openapi_spec.get("paths", {}).items():
+        for method, operation in methods.items():
+            if method.lower() in HTTP_METHODS:
+                yield path, method.lower(), operation
+
+
+def _has_int_statuses(operation: dict) -> bool:
+    responses = operation.get("responses")
+    return isinstance(responses, dict) and not all(isinstance(key, str) for key in responses)
+
+
+def normalize_responses(openapi_spec: dict) -> dict:
+    """
+    Returns the spec with every operation's response status keys as strings. YAML reads an
+    unquoted `200:` as an int, while OpenAPI (and every lookup here) uses "200". A spec that
+    needs changes is deep-copied first; the caller's spec is never modified.
+    """
+    if not any(_has_int_statuses(operation) for _, _, operation in iter_operations(openapi_spec)):
+        return openapi_spec
+    openapi_spec = copy.deepcopy(openapi_spec)
+    for _, _, operation in iter_operations(openapi_spec):
+        if _has_int_statuses(operation):
+            responses = operation["responses"]
+            operation["responses"] = {str(key): value for key, value in responses.items()}
+    return openapi_spec
+
+
+def resolve_ref(openapi_spec: dict, ref: str):
+    """
+    Resolves a local JSON pointer such as "#/components/schemas/User".
+    """
+    node = openapi_spec
+    for part in ref.lstrip("#").strip("/").split("/"):
+        node = node[part.replace("~1", "/").replace("~0", "~")]
+    return node
+
+
+def _iter_refs(node) -> Iterator[str]:
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/"):
+            yield ref
+        for value in node.values():
+            yield from _iter_refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _iter_refs(value)
+
+
+def slice_spec(openapi_spec: dict, operations: list[tuple[str, str]]) -> dict:
+    """
+    Returns a copy of the spec that only contains the given (path, method) operations and
+    the components they reference, directly or transitively.
+    """
+    sliced = {
+        key: openapi_spec[key]
+        for key in ("openapi", "info", "servers", "security")
+        if key in openapi_spec
+    }
+    paths = {}
+    for path, method in operations:
+        path_item = openapi_spec.get("paths", {}).get(path, {})
+        operation = path_item.get(method.lower())
+        if operation is None:
+            continue
+        target = paths.setdefault(path, {})
+        if "parameters" in path_item:
+            target["parameters"] = path_item["parameters"]
+        target[method.lower()] = operation
+    sliced["paths"] = paths
+
+    components = {}
+    pending = list(_iter_refs(paths))
+    seen = set()
+    while pending:
+        ref = pending.pop()
+        if ref in seen or not ref.startswith("#/components/"):
+            continue
+        seen.add(ref)
+        try:
+            target = resolve_ref(openapi_spec, ref)
+        except (KeyError, TypeError):
+            continue
+        _, _, section, name = ref.split("/", 3)
+        components.setdefault(section, {})[name] = target
+        pending.extend(_iter_refs(target))
+
+    schemes = openapi_spec.get("components", {}).get("securitySchemes", {})
+    requirements = list(openapi_spec.get("security", []))
+    for path_item in paths.values():
+        for method in HTTP_METHODS:
+            requirements.extend(path_item.get(method, {}).get("security", []))
+    for requirement in requirements:
+        for name in requirement:
+            if name in schemes:
+                components.setdefault("securitySchemes", {})[name] = schemes[name]
+
+    if components:
+        sliced["components"] = components
+    return sliced
+
+
+def slice_operation(openapi_spec: dict, method: str, path: str) -> dict:
+    return slice_spec(openapi_spec, [(path, method)])
+
+
+def operation_catalogue(openapi_spec: dict) -> str:
+    """
+    One line per operation ("POST /users - Create User"), for prompts that need to know
+    which endpoints exist without paying for the full spec.
+    """
+    lines = []
+    for path, method, operation in iter_operations(openapi_spec):
+        summary = operation.get("summary") or operation.get("operationId") or ""
+        lines.append(f"{method.upper()} {path}" + (f" - {summary}" if summary else ""))
+    return "\n".join(lines)
+
+
+class PathMatcher:
+    """
+    Maps concrete request paths ("/users/42") back to spec templates ("/users/{user_id}").
+    Literal paths win over templated ones, and templates with fewer parameters win over
+    templates with more.
+    """
+
+    def __init__(self, openapi_spec: dict):
+        self._literal = set()
+        self._templates = []
+        for template in openapi_spec.get("paths", {}):
+            if "{" not in template:
+                self._literal.add(template)
+                continue
+            parts = re.split(r"\{([^}]+)\}", template)
+            pattern = "".join(
+                re.escape(part) if i % 2 == 0 else f"(?P<{_group(part)}>[^/]+)"
+                for i, part in enumerate(parts)
+            )
+            names = parts[1::2]
+            self._templates.append((len(names), template, re.compile(pattern), names))
+        self._templates.sort(key=lambda entry: entry[0])
+
+    def _candidates(self, path: str) -> list[str]:
+        path = path.split("?", 1)[0] or "/"
+        alternate = path[:-1] if path.endswith("/") and len(path) > 1 else path + "/"
+        return [path, alternate]
+
+    def match(self, path: str) -> str | None:
+        return (self.resolve(path) or (None, None))[0]
+
+    def resolve(self, path: str) -> tuple[str, dict] | None:
+        """Returns (template, {param: value}) for a concrete path, or None."""
+        candidates = self._candidates(path)
+        for candidate in candidates:
+            if candidate in self._literal:
+                return candidate, {}
+        for candidate in candidates:
+            for _, template, regex, names in self._templates:
+                found = regex.fullmatch(candidate)
+                if found:
+                    values = found.groups()
+                    return template, dict(zip(names, values))
+        return None
+
+
+def _group(name: str) -> str:
+    return "p_" + re.sub(r"\W", "_", name)
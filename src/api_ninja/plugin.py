@@ -1,14 +1,13 @@
+import json
 import logging
 import os
 import pathlib
 import sys
 
 import pytest
-import requests
-import yaml
 
 from api_ninja.color import Colors
-from api_ninja.core import APINinja
+from api_ninja.timeouts import FlowTimeout, Timeouts
 
 NOISY_LOGGERS = [
     "httpx",
@@ -19,6 +18,11 @@ NOISY_LOGGERS = [
 ]
 
 
+def _env_flag(name: str) -> bool:
+    """Reads a boolean environment variable the way click's envvar does for run-all flags."""
+    return os.getenv(name, "").strip().lower() in ("1", "true", "t", "yes", "y", "on")
+
+
 def _silence_noisy_loggers():
     for logger_name in NOISY_LOGGERS:
         logger = logging.getLogger(logger_name)
@@ -38,12 +42,6 @@ def _setup_apininja_logger():
         logger.addHandler(handler)
 
 
-@pytest.hookimpl(tryfirst=True)
-def pytest_configure(config):
-    _silence_noisy_loggers()
-    _setup_apininja_logger()
-
-
 def pytest_addoption(parser):
     parser.addoption(
         "--config",
@@ -67,6 +65,148 @@ def pytest_addoption(parser):
         action="store",
         help="Base URL for the API (overrides config.yaml)",
     )
+    parser.addoption(
+        "--cache-responses",
+        action="store_true",
+        help="Reuse responses to identical GET/HEAD/OPTIONS requests",
+    )
+    parser.addoption(
+        "--cache-scope",
+        action="store",
+        choices=("run", "collection"),
+        default="run",
+        help="Share cached responses across the whole run (per worker) or within a collection",
+    )
+    parser.addoption(
+        "--cache-verdicts",
+        action="store_true",
+        help="Reuse evaluator verdicts for identical request, response and check",
+    )
+    parser.addoption(
+        "--plan-mode",
+        action="store",
+        choices=("step", "combined"),
+        default="step",
+        help="Plan requests one step at a time, or plan them all up front with bindings",
+    )
+    parser.addoption(
+        "--pipeline",
+        action="store_true",
+        help="Generate each step's request while the previous step is being evaluated",
+    )
+    parser.addoption(
+        "--candidate-operations",
+        action="store",
+        type=int,
+        default=0,
+        help="Show the planner only the K operations that best match each flow, plus their "
+        "dependencies (0: the whole spec)",
+    )
+    parser.addoption(
+        "--prompt-format",
+        action="append",
+        default=[],
+        dest="prompt_formats",
+        metavar="[ROLE=]FORMAT",
+        help="How JSON is written into generator/evaluator prompts: pretty (default) or "
+        "compact; repeatable",
+    )
+    parser.addoption(
+        "--auth",
+        action="store",
+        help="YAML credentials per security scheme; requests are authenticated once per worker",
+    )
+    parser.addoption(
+        "--phase-timeout",
+        action="append",
+        default=[],
+        metavar="PHASE=SECONDS",
+        help="Deadline for http, llm, step, flow or run (defaults: http=30 llm=120); repeatable",
+    )
+    parser.addoption(
+        "--model",
+        action="append",
+        default=[],
+        dest="model_specs",
+        metavar="ROLE=MODEL",
+        help="Model for planner, generator or evaluator (default: LLM_MODEL); repeatable",
+    )
+    parser.addoption(
+        "--escalation-model",
+        action="append",
+        default=[],
+        dest="escalation_specs",
+        metavar="[ROLE=]MODEL",
+        help="Retry unparseable or inconclusive outputs once on this model; repeatable",
+    )
+    parser.addoption(
+        "--history-db",
+        action="store",
+        default=os.path.join(".api-ninja", "history.db"),
+        help="SQLite run history used for ordering flows and retrying flaky ones",
+    )
+    parser.addoption(
+        "--no-history",
+        action="store_true",
+        help="Do not read or record run history",
+    )
+    parser.addoption(
+        "--changed-only",
+        action="store_true",
+        default=_env_flag("APININJA_CHANGED_ONLY"),
+        help="Only run flows whose inputs changed or that failed last run",
+    )
+
+
+_history_key = pytest.StashKey[tuple]()
+_router_key = pytest.StashKey[object]()
+_flows_key = pytest.StashKey[object]()
+
+
+def pytest_collection_modifyitems(session, config, items):
+    # Recently failed flows first, then longest-first so xdist workers finish together.
+    if _history_key not in config.stash:
+        return
+    history, _ = config.stash[_history_key]
+    flows = {item.name: item for item in items if isinstance(item, APINinjaItem)}
+    if not flows:
+        return
+    others = [item for item in items if not isinstance(item, APINinjaItem)]
+    if config.getoption("changed_only"):
+        from api_ninja.impact import changed_flows
+
+        item = next(iter(flows.values()))
+        # Ask the loaded flows (a FlowStore answers from its index) rather than item.flow,
+        # which would read every flow of a lazily loaded file.
+        changed = changed_flows(history, item.flows, item.ninja.openapi_spec, list(flows))
+        deselected = [item for name, item in flows.items() if name not in changed]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        flows = {name: item for name, item in flows.items() if name in changed}
+    items[:] = others + [flows[name] for name in history.order(list(flows))]
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if _router_key not in config.stash:
+        return
+    rows = config.stash[_router_key].summary_rows()
+    if rows:
+        terminalreporter.section("APINinja models")
+        for role, value in rows:
+            terminalreporter.write_line(f"{role}: {value}")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if _flows_key in session.config.stash:
+        from api_ninja.flowstore import FlowStore
+
+        flows = session.config.stash[_flows_key]
+        if isinstance(flows, FlowStore):
+            flows.close()
+    if _history_key in session.config.stash:
+        history, run_id = session.config.stash[_history_key]
+        history.finish_run(run_id)
+        history.close()
 
 
 def pytest_collect_file(parent, path):
@@ -74,7 +214,7 @@ def pytest_collect_file(parent, path):
     candidate = os.path.abspath(str(path))
     target = os.path.abspath(config_file)
     # path.ext is the extension, including the leading dot
-    if candidate == target and path.ext in (".yaml", ".yml"):
+    if candidate == target and path.ext in (".yaml", ".yml", ".jsonl"):
         path = pathlib.Path(str(path))
         return APINinjaFile.from_parent(
             parent,
@@ -83,10 +223,26 @@ def pytest_collect_file(parent, path):
 
 
 class APINinjaFile(pytest.File):
-    """Treat the config YAML as a virtual pytest File."""
+    """Treat the config YAML (or .jsonl flow file) as a virtual pytest File."""
 
     def collect(self):
-        cfg = yaml.safe_load(self.path.open("r"))
+        # This plugin is loaded by every pytest run in an environment where the package is
+        # installed, so all of the heavy lifting is deferred until a flows file is collected.
+        import requests
+        import yaml
+
+        from api_ninja.agents.routing import ModelRouter
+        from api_ninja.agents.serialization import parse_prompt_formats
+        from api_ninja.core import APINinja
+        from api_ninja.flowstore import load_flows
+        from api_ninja.history import RunHistory
+
+        _silence_noisy_loggers()
+        _setup_apininja_logger()
+
+        # .jsonl flow files are read lazily: only the flows that actually run are parsed.
+        flows = load_flows(self.path)
+        self.config.stash[_flows_key] = flows
         openapi_spec_url = self.config.getoption("openapi_spec_url", default=None)
         openapi_spec_path = self.config.getoption("openapi_spec_path", default=None)
         base_url = self.config.getoption("base_url", default=None)
@@ -98,41 +254,93 @@ class APINinjaFile(pytest.File):
         elif openapi_spec_path:
             with open(openapi_spec_path, "r") as f:
                 spec = (
-                    yaml.safe_load(f) if openapi_spec_path.suffix in (".yaml", ".yml") else f.read()
+                    yaml.safe_load(f)
+                    if openapi_spec_path.suffix in (".yaml", ".yml")
+                    else json.load(f)
                 )
 
-        ninja = APINinja(openapi_spec=spec, api_base_url=base_url)
-        defaults = cfg.get("defaults", [])
-        for coll_name, coll in cfg["collections"].items():
-            for flow_id in coll["flows"]:
-                flow = dict(cfg["flows"][flow_id])
-                flow.update(
-                    flow_id=flow_id,
-                    collection=coll_name,
-                    collection_description=coll.get("description", ""),
-                    defaults=defaults,
-                )
-                yield APINinjaItem.from_parent(
-                    self,
-                    name=flow_id,
-                    flow=flow,
-                    ninja=ninja,
-                )
+        auth = None
+        if self.config.getoption("auth"):
+            from api_ninja.auth import AuthManager
+
+            auth = AuthManager.load(self.config.getoption("auth"), spec, base_url)
+
+        ninja = APINinja(
+            openapi_spec=spec,
+            api_base_url=base_url,
+            cache_responses=self.config.getoption("cache_responses"),
+            cache_scope=self.config.getoption("cache_scope"),
+            cache_verdicts=self.config.getoption("cache_verdicts"),
+            plan_mode=self.config.getoption("plan_mode"),
+            pipeline=self.config.getoption("pipeline"),
+            candidate_operations=self.config.getoption("candidate_operations"),
+            auth=auth,
+            prompt_formats=parse_prompt_formats(self.config.getoption("prompt_formats")),
+            timeouts=Timeouts.parse(self.config.getoption("phase_timeout")),
+            router=ModelRouter.parse(
+                self.config.getoption("model_specs"), self.config.getoption("escalation_specs")
+            ),
+        )
+        self.config.stash[_router_key] = ninja.router
+        history = None
+        run_id = None
+        if not self.config.getoption("no_history"):
+            history = RunHistory(self.config.getoption("history_db"))
+            # xdist workers share one run id, so their flows are recorded as one run.
+            run_id = history.start_run(
+                key=os.environ.get("PYTEST_XDIST_TESTRUNUID"), config=str(self.path)
+            )
+            self.config.stash[_history_key] = (history, run_id)
+        for flow_id in flows:
+            yield APINinjaItem.from_parent(
+                self,
+                name=flow_id,
+                flows=flows,
+                ninja=ninja,
+                history=history,
+                run_id=run_id,
+            )
 
 
 class APINinjaItem(pytest.Item):
     """Runs one APINinja flow as a pytest test."""
 
-    def __init__(self, name, parent, *, flow, ninja):
+    def __init__(self, name, parent, *, flows, ninja, history=None, run_id=None):
         super().__init__(name, parent)
-        self.flow = flow
+        self.flows = flows
+        self._flow = None
         self.ninja = ninja
+        self.history = history
+        self.run_id = run_id
+
+    @property
+    def flow(self) -> dict:
+        if self._flow is None:
+            self._flow = self.flows[self.name]
+        return self._flow
 
     def runtest(self):
-        # Raises AssertionError on failure
-        self.ninja.plan_and_run(self.flow)
+        result = self.ninja.plan_and_run(self.flow, raise_on_failure=False)
+        if self.history is not None:
+            from api_ninja.impact import record_flow_inputs
+
+            self.history.record(self.run_id, result)
+            # Known-flaky flows get one more attempt before being reported as failed.
+            if not result.passed and self.history.is_flaky(self.name):
+                result = self.ninja.plan_and_run(self.flow, raise_on_failure=False)
+                self.history.record(self.run_id, result, attempt=2)
+            record_flow_inputs(self.history, self.flow, result, self.ninja.openapi_spec)
+        if result.status == "TIMEOUT":
+            raise FlowTimeout(result.timed_out, result.error)
+        if not result.passed:
+            raise AssertionError(result.error)
 
     def repr_failure(self, excinfo):
+        if excinfo.errisinstance(FlowTimeout):
+            return (
+                f"{Colors.YELLOW}\nFlow {self.name!r} timed out ({excinfo.value.phase})\n"
+                f"  {excinfo.value}\n{Colors.RESET}"
+            )
         if excinfo.errisinstance(AssertionError):
             return f"{Colors.RED}\nFlow {self.name!r} failed\n" f"  {excinfo.value}\n{Colors.RESET}"
         return super().repr_failure(excinfo)
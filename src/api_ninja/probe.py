@@ -0,0 +1,114 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from api_ninja.cache import SAFE_METHODS, fingerprint
+from api_ninja.results import StepResult
+from api_ninja.stats import percentile
+
+# Distinct response bodies kept in a probe summary; the rest are only counted.
+MAX_BODIES = 3
+# Most simultaneous copies of one request; matches the HTTP session's connection pool size.
+MAX_COPIES = 64
+
+
+def probe_targets(concurrency, calls) -> dict[int, int]:
+    """
+    Maps step index to how many simultaneous copies of its request to send. A flow's
+    `concurrency` is either N, for its last state-changing step (the last step if all are
+    reads), or a mapping such as {"POST /users": N} for specific operations. Copies are
+    capped at MAX_COPIES.
+    """
+    if not concurrency:
+        return {}
+    operations = [f"{call.method.upper()} {call.path}" for call in calls]
+    if isinstance(concurrency, dict):
+        wanted = {}
+        for operation, copies in concurrency.items():
+            method, _, path = operation.strip().partition(" ")
+            wanted[f"{method.upper()} {path.strip()}"] = min(int(copies), MAX_COPIES)
+        return {i: wanted[op] for i, op in enumerate(operations) if wanted.get(op, 0) > 1}
+    if int(concurrency) < 2 or not calls:
+        return {}
+    writes = [i for i, call in enumerate(calls) if call.method.upper() not in SAFE_METHODS]
+    return {(writes or [len(calls) - 1])[-1]: min(int(concurrency), MAX_COPIES)}
+
+
+def describe(concurrency) -> str:
+    """The note that tells the agents which request is sent concurrently."""
+    if isinstance(concurrency, dict):
+        target = ", ".join(f"{operation} x{copies}" for operation, copies in concurrency.items())
+    else:
+        target = f"the last state-changing request x{concurrency}"
+    return (
+        "Concurrency probe:\n"
+        f"Requests sent several times at once: {target}. Plan each of them once, as a "
+        "single step; that step's expectations describe the combined outcome (e.g. exactly "
+        "one creation succeeds and the rest are rejected)."
+    )
+
+
+def fire(send: Callable[[int], StepResult], copies: int) -> list[StepResult | Exception]:
+    """
+    Calls send(copy) from `copies` threads that are released together, so the requests
+    reach the API as close to simultaneously as the client allows. Returns each result, or
+    the exception its request raised, in copy order. `copies` is clamped to 1..MAX_COPIES.
+    """
+    copies = max(1, min(copies, MAX_COPIES))
+    barrier = threading.Barrier(copies)
+
+    def task(copy: int):
+        barrier.wait()
+        try:
+            return send(copy)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=copies) as pool:
+        return list(pool.map(task, range(copies)))
+
+
+def summarize(outcomes: list[StepResult | Exception], wall_ms: float) -> dict:
+    """Aggregates a probe's responses: status counts, errors, latency spread, distinct bodies."""
+    responses = [outcome for outcome in outcomes if isinstance(outcome, StepResult)]
+    errors = Counter(
+        f"{type(outcome).__name__}: {outcome}"
+        for outcome in outcomes
+        if not isinstance(outcome, StepResult)
+    )
+    latencies = [response.http_ms for response in responses]
+    bodies = {}
+    for response in responses:
+        key = fingerprint([response.status, response.body])
+        if key in bodies:
+            bodies[key]["count"] += 1
+        elif len(bodies) < MAX_BODIES:
+            bodies[key] = {"status": response.status, "body": response.body, "count": 1}
+    latency = {}
+    if latencies:
+        latency = {
+            "min": min(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+        }
+        latency["spread"] = latency["max"] - latency["min"]
+    statuses = Counter(response.status for response in responses)
+    return {
+        "requests": len(outcomes),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": dict(errors),
+        "latency_ms": {name: round(value, 1) for name, value in latency.items()},
+        "wall_ms": round(wall_ms, 1),
+        "bodies": list(bodies.values()),
+    }
+
+
+def representative(outcomes: list[StepResult | Exception]) -> StepResult | None:
+    """The response later steps build on: the first successful one, else the first at all."""
+    responses = [outcome for outcome in outcomes if isinstance(outcome, StepResult)]
+    for response in responses:
+        if response.status is not None and 200 <= response.status < 300:
+            return response
+    return responses[0] if responses else None
@@ -0,0 +1,123 @@
+import json
+from dataclasses import dataclass, field
+from typing import IO, Iterable
+
+
+@dataclass(slots=True)
+class StepResult:
+    """
+    One executed step of a flow. The response body is kept by reference, never copied.
+    """
+
+    index: int
+    method: str
+    path: str
+    url: str
+    headers: dict
+    payload: object
+    parameters: dict
+    status: int | None = None
+    body: object = None
+    expected_status: int | None = None
+    response_check: str = ""
+    cached: bool = False
+    from_template: bool = False
+    schema_errors: list[str] | None = None
+    # Aggregate of a concurrency probe (see api_ninja.probe.summarize); status and body are
+    # then those of one representative response.
+    probe: dict | None = None
+    # Latency budget check (see api_ninja.slo.check), for steps the flow set a budget for.
+    latency: dict | None = None
+    started_at: float = 0.0
+    generation_ms: float = 0.0
+    http_ms: float = 0.0
+    evaluation_ms: float = 0.0
+    verdict: str | None = None
+    reason: str | None = None
+    suggestion: str | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def passed(self) -> bool:
+        return self.verdict == "PASS"
+
+    def to_dict(self, include_body: bool = True) -> dict:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        if not include_body:
+            del data["body"]
+        return data
+
+
+@dataclass(slots=True)
+class FlowResult:
+    flow_id: str
+    collection: str
+    status: str = "PASS"
+    started_at: float = 0.0
+    duration_ms: float = 0.0
+    planning_ms: float = 0.0
+    operations: list[str] = field(default_factory=list)
+    steps: list[StepResult] = field(default_factory=list)
+    failed_step: int | None = None
+    error: str | None = None
+    # Which limit ("http", "llm", "step", "flow" or "run") a TIMEOUT flow ran into.
+    timed_out: str | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "PASS"
+
+    def to_dict(self, include_body: bool = True) -> dict:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["steps"] = [step.to_dict(include_body) for step in self.steps]
+        return data
+
+
+def write_jsonl(results: Iterable[FlowResult], fp: IO[str], include_body: bool = True):
+    """Writes one JSON object per flow, steps nested, to an open text file."""
+    for result in results:
+        fp.write(json.dumps(result.to_dict(include_body), default=str))
+        fp.write("\n")
+
+
+# Step fields whose shape varies from step to step; Arrow columns need one type, so these are
+# stored as JSON strings.
+JSON_COLUMNS = ("headers", "payload", "parameters", "body", "probe", "latency")
+
+
+def to_arrow(results: Iterable[FlowResult]):
+    """
+    Returns a pyarrow Table with one row per step (flow columns repeated), which is the
+    shape trend queries want. Free-form values (payloads, headers, parameters, bodies and
+    the probe and latency reports) are stored as JSON strings.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Arrow export requires pyarrow: pip install pyarrow") from e
+
+    rows = []
+    for result in results:
+        flow = result.to_dict(include_body=False)
+        del flow["steps"]
+        flow_columns = {f"flow_{name}": value for name, value in flow.items()}
+        for step in result.steps:
+            row = step.to_dict(include_body=False)
+            for name in JSON_COLUMNS:
+                value = getattr(step, name)
+                row[name] = None if value is None else json.dumps(value, default=str)
+            rows.append({**flow_columns, **row})
+        if not result.steps:
+            rows.append(flow_columns)
+    return pa.Table.from_pylist(rows)
+
+
+def write_arrow(results: Iterable[FlowResult], path: str):
+    table = to_arrow(results)
+    import pyarrow as pa
+
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
@@ -0,0 +1,236 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from api_ninja.cache import fingerprint
+from api_ninja.openapi import HTTP_METHODS, PathMatcher, iter_operations, resolve_ref
+
+DEFAULT_INDEX_DIR = ".api-ninja"
+INDEX_VERSION = 1
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+_PARAM = re.compile(r"\{([^}]+)\}")
+# "POST /users/{user_id}/tags" or a bare "/users" in a flow description.
+_MENTION = re.compile(r"\b(?:(" + "|".join(HTTP_METHODS) + r")\s+)?(/[\w\-./{}]*)", re.IGNORECASE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, splitting camelCase and snake_case, with plurals folded."""
+    tokens = []
+    for word in _WORD.findall(text or ""):
+        word = word.lower()
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _field_names(openapi_spec: dict, schema, depth: int = 0, seen=None) -> list[str]:
+    """Property names in a schema, following $refs a few levels deep."""
+    seen = set() if seen is None else seen
+    if not isinstance(schema, dict) or depth > 3:
+        return []
+    if "$ref" in schema:
+        if schema["$ref"] in seen:
+            return []
+        seen.add(schema["$ref"])
+        try:
+            schema = resolve_ref(openapi_spec, schema["$ref"])
+        except (KeyError, TypeError):
+            return []
+    names = []
+    for name, sub in (schema.get("properties") or {}).items():
+        names.append(name)
+        names.extend(_field_names(openapi_spec, sub, depth + 1, seen))
+    for key in ("items", "additionalProperties"):
+        names.extend(_field_names(openapi_spec, schema.get(key), depth + 1, seen))
+    for key in ("allOf", "anyOf", "oneOf"):
+        for sub in schema.get(key) or []:
+            names.extend(_field_names(openapi_spec, sub, depth + 1, seen))
+    return names
+
+
+def operation_text(openapi_spec: dict, path: str, method: str, operation: dict) -> str:
+    """The searchable text of one operation: id, path, summary, tags, parameter and field names."""
+    parts = [method, path, operation.get("operationId", ""), operation.get("summary", "")]
+    parts.append(operation.get("description", ""))
+    parts.extend(operation.get("tags", []))
+    path_item = openapi_spec["paths"][path]
+    for parameter in path_item.get("parameters", []) + operation.get("parameters", []):
+        if "$ref" in parameter:
+            parameter = resolve_ref(openapi_spec, parameter["$ref"])
+        parts.append(parameter.get("name", ""))
+    body = operation.get("requestBody") or {}
+    if "$ref" in body:
+        body = resolve_ref(openapi_spec, body["$ref"])
+    schemas = [media.get("schema") for media in body.get("content", {}).values()]
+    for status, response in operation.get("responses", {}).items():
+        if str(status).startswith("2"):
+            if "$ref" in response:
+                response = resolve_ref(openapi_spec, response["$ref"])
+            schemas.extend(media.get("schema") for media in response.get("content", {}).values())
+    fields = []
+    for schema in schemas:
+        fields.extend(_field_names(openapi_spec, schema))
+    # Each field once, so operations with big bodies do not outrank the rest on field names.
+    parts.extend(dict.fromkeys(fields))
+    return " ".join(part for part in parts if part)
+
+
+def operation_dependencies(openapi_spec: dict) -> dict[str, list[str]]:
+    """
+    Maps each "METHOD /path" to the operations that produce the ids its path parameters
+    consume: the POST on the enclosing collection ("POST /users" for "/users/{user_id}/tags"),
+    or else the POST on any collection whose items are addressed by the same parameter.
+    """
+    paths = openapi_spec.get("paths", {})
+    producers = {}
+    for path in paths:
+        for match in _PARAM.finditer(path):
+            collection = path[: match.start()].rstrip("/")
+            if "post" in paths.get(collection, {}):
+                producers.setdefault(match.group(1), f"POST {collection}")
+
+    dependencies = {}
+    for path, method, _ in iter_operations(openapi_spec):
+        found = []
+        for match in _PARAM.finditer(path):
+            collection = path[: match.start()].rstrip("/")
+            if "post" in paths.get(collection, {}):
+                producer = f"POST {collection}"
+            else:
+                producer = producers.get(match.group(1))
+            if producer and producer not in found:
+                found.append(producer)
+        dependencies[f"{method.upper()} {path}"] = found
+    return dependencies
+
+
+class OperationIndex:
+    """
+    BM25 index over a spec's operations, used to give the planner only the endpoints a flow
+    is likely to need. Operations named in the flow text ("DELETE /users/{user_id}") are
+    always included, and so are the operations that produce their path parameters.
+    """
+
+    def __init__(
+        self,
+        spec_hash: str,
+        operations: list[str],
+        terms: list[dict[str, int]],
+        dependencies: dict[str, list[str]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.spec_hash = spec_hash
+        self.operations = operations
+        self.terms = terms
+        self.dependencies = dependencies
+        self.k1 = k1
+        self.b = b
+        self.lengths = [sum(counts.values()) for counts in terms]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        frequencies = Counter(term for counts in terms for term in counts)
+        total = len(terms)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in frequencies.items()
+        }
+        self._paths = None
+
+    @classmethod
+    def build(cls, openapi_spec: dict) -> "OperationIndex":
+        operations, terms = [], []
+        for path, method, operation in iter_operations(openapi_spec):
+            operations.append(f"{method.upper()} {path}")
+            text = operation_text(openapi_spec, path, method, operation)
+            terms.append(dict(Counter(tokenize(text))))
+        dependencies = operation_dependencies(openapi_spec)
+        return cls(fingerprint(openapi_spec), operations, terms, dependencies)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "spec_hash": self.spec_hash,
+            "operations": self.operations,
+            "terms": self.terms,
+            "dependencies": self.dependencies,
+        }
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "OperationIndex | None":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["spec_hash"], data["operations"], data["terms"], data["dependencies"])
+
+    @classmethod
+    def for_spec(cls, openapi_spec: dict, index_dir: str = DEFAULT_INDEX_DIR) -> "OperationIndex":
+        """Loads the index persisted for this exact spec, or builds and persists it."""
+        spec_hash = fingerprint(openapi_spec)
+        path = os.path.join(index_dir, f"operations-{spec_hash[:16]}.json")
+        index = cls.load(path)
+        if index is None or index.spec_hash != spec_hash:
+            index = cls.build(openapi_spec)
+            try:
+                index.save(path)
+            except OSError:
+                pass
+        return index
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        """The `k` best-scoring operations for `query`, best first."""
+        tokens = tokenize(query)
+        scores = []
+        for operation, counts, length in zip(self.operations, self.terms, self.lengths):
+            score = 0.0
+            for token in tokens:
+                tf = counts.get(token)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * length / self.avg_length)
+                    score += self.idf[token] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((operation, score))
+        scores.sort(key=lambda item: -item[1])
+        return scores[:k]
+
+    def mentioned(self, text: str) -> list[str]:
+        """Operations the text names explicitly, by "METHOD /path" or by path alone."""
+        if self._paths is None:
+            paths = {operation.split(" ", 1)[1]: {} for operation in self.operations}
+            self._paths = PathMatcher({"paths": paths})
+        found = []
+        for method, path in _MENTION.findall(text or ""):
+            template = self._paths.match(path.rstrip("."))
+            if template is None:
+                continue
+            on_path = [op for op in self.operations if op.split(" ", 1)[1] == template]
+            named = [op for op in on_path if op.split(" ", 1)[0] == method.upper()]
+            # A method the path does not have ("PATCH" for a PUT) still points at the path.
+            found.extend(named or on_path)
+        return found
+
+    def candidates(self, query: str, k: int) -> list[str]:
+        """Mentioned operations, then the top-`k` matches, then everything they depend on."""
+        selected = list(dict.fromkeys(self.mentioned(query)))
+        for operation, _ in self.search(query, k):
+            if operation not in selected:
+                selected.append(operation)
+        for operation in list(selected):
+            pending = list(self.dependencies.get(operation, []))
+            while pending:
+                dependency = pending.pop()
+                if dependency not in selected:
+                    selected.append(dependency)
+                    pending.extend(self.dependencies.get(dependency, []))
+        return selected
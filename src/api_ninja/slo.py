@@ -0,0 +1,52 @@
+import re
+
+from api_ninja.stats import percentile
+
+DEFAULT_SAMPLES = 20
+_BUDGET_KEY = re.compile(r"p(\d+(?:\.\d+)?)_ms|max_ms")
+
+
+def budget_for(latency, method: str, path: str) -> dict | None:
+    """
+    The latency budget for one operation. A flow's (or collection's) `latency` is either a
+    budget such as {"p95_ms": 200, "samples": 20} for every step, or a mapping from
+    "METHOD /path" to such a budget.
+    """
+    if not latency:
+        return None
+    if any(_BUDGET_KEY.fullmatch(key) for key in latency):
+        return latency
+    for operation, budget in latency.items():
+        want_method, _, want_path = operation.strip().partition(" ")
+        if want_method.upper() == method.upper() and want_path.strip() == path:
+            return budget
+    return None
+
+
+def check(samples_ms: list[float], budget: dict) -> dict:
+    """
+    Compares measured latencies with a budget. Returns the measured percentiles for every
+    limit the budget sets and the limits that were exceeded, e.g.
+    {"samples": 20, "p95_ms": 231.0, "budget": {"p95_ms": 200}, "exceeded": ["p95_ms"]}.
+    """
+    report = {"samples": len(samples_ms), "budget": {}, "exceeded": []}
+    for key, limit in budget.items():
+        match = _BUDGET_KEY.fullmatch(key)
+        if match is None:
+            continue
+        if key == "max_ms":
+            measured = max(samples_ms) if samples_ms else None
+        else:
+            measured = percentile(samples_ms, float(match.group(1)))
+        report[key] = round(measured, 1) if measured is not None else None
+        report["budget"][key] = limit
+        if measured is not None and measured > float(limit):
+            report["exceeded"].append(key)
+    return report
+
+
+def format_report(operation: str, report: dict) -> str:
+    limits = ", ".join(
+        f"{key} {report[key]:g} > {report['budget'][key]:g}" for key in report["exceeded"]
+    )
+    return f"{operation} exceeded its latency budget over {report['samples']} samples: {limits}"
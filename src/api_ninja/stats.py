@@ -0,0 +1,13 @@
+import math
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float | None:
+    """
+    Nearest-rank percentile (pct in 0-100) of `values`, or None when there are none.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
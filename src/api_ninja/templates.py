@@ -0,0 +1,75 @@
+import json
+import re
+
+from api_ninja.models import RequestTemplateModel
+
+BINDING = re.compile(r"\{\{\s*(\$[^}]*?)\s*\}\}")
+_TOKEN = re.compile(r"\.([A-Za-z_][\w-]*)|\[(-?\d+)\]|\['([^']*)'\]|\[\"([^\"]*)\"\]")
+_UNRESOLVED_PATH = re.compile(r"\{[^}]*\}")
+
+
+class UnresolvedBinding(Exception):
+    pass
+
+
+def lookup(expression: str, steps: list[dict]):
+    """
+    Evaluates the JSONPath subset the planner uses, e.g. "$.steps[0].body.id" or
+    "$.steps[-1].body['items'][0].name", against earlier step results.
+    """
+    if not expression.startswith("$"):
+        raise UnresolvedBinding(f"{expression!r} is not a JSONPath expression")
+    node = {"steps": steps}
+    position = 1
+    while position < len(expression):
+        token = _TOKEN.match(expression, position)
+        if token is None:
+            raise UnresolvedBinding(f"Cannot parse {expression!r} at position {position}")
+        name, index, quoted, double_quoted = token.groups()
+        key = name or quoted or double_quoted
+        try:
+            node = node[int(index)] if index is not None else node[key]
+        except (KeyError, IndexError, TypeError):
+            raise UnresolvedBinding(f"{expression} does not exist in earlier responses")
+        position = token.end()
+    return node
+
+
+def resolve(value, steps: list[dict]):
+    if isinstance(value, str):
+        whole = BINDING.fullmatch(value.strip())
+        if whole:
+            # Keep the bound value's type when the binding is the whole string.
+            return lookup(whole.group(1), steps)
+        return BINDING.sub(lambda m: str(lookup(m.group(1), steps)), value)
+    if isinstance(value, dict):
+        return {resolve(k, steps): resolve(v, steps) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, steps) for item in value]
+    return value
+
+
+def _load(text: str, field: str):
+    if not text or not text.strip():
+        return {}
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise UnresolvedBinding(f"{field} is not valid JSON: {e}")
+
+
+def resolve_request(template: RequestTemplateModel, steps: list[dict]) -> dict:
+    """
+    Turns a planner request template into the request details `APINinja.request_api`
+    expects, without a model call. Raises UnresolvedBinding when it cannot.
+    """
+    path = resolve(template.resolved_path or template.path, steps)
+    if not isinstance(path, str) or _UNRESOLVED_PATH.search(path):
+        raise UnresolvedBinding(f"Path {path!r} still has unresolved placeholders")
+    return {
+        "method": template.method,
+        "path": path,
+        "payload": resolve(_load(template.payload_json, "payload_json"), steps),
+        "parameters": resolve(_load(template.parameters_json, "parameters_json"), steps),
+        "headers": resolve(_load(template.headers_json, "headers_json"), steps),
+    }
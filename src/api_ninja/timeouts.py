@@ -0,0 +1,116 @@
+import time
+from dataclasses import dataclass, fields
+
+# Scopes that bound a whole unit of work; the rest bound a single call.
+SCOPES = ("step", "flow", "run")
+
+
+@dataclass
+class Timeouts:
+    """
+    Deadlines in seconds, None for no limit. `http` and `llm` bound each call; `step`,
+    `flow` and `run` bound everything inside them, and each call gets whatever is left of
+    the tightest enclosing deadline.
+    """
+
+    http: float | None = 30.0
+    llm: float | None = 120.0
+    step: float | None = None
+    flow: float | None = None
+    run: float | None = None
+
+    @classmethod
+    def parse(cls, specs) -> "Timeouts":
+        """Builds Timeouts from "phase=seconds" strings; "none" or 0 lifts a limit."""
+        timeouts = cls()
+        names = {f.name for f in fields(cls)}
+        for spec in specs:
+            phase, sep, value = spec.partition("=")
+            phase = phase.strip().lower()
+            if not sep or phase not in names:
+                expected = ", ".join(sorted(names))
+                raise ValueError(f"expected one of {expected}=SECONDS, got {spec!r}")
+            value = value.strip().lower()
+            seconds = None
+            if value not in ("", "none"):
+                try:
+                    seconds = float(value)
+                    # `not >= 0` also rejects nan.
+                    if not seconds >= 0:
+                        raise ValueError
+                except ValueError:
+                    raise ValueError(
+                        f"{phase} timeout must be seconds >= 0, got {value!r}"
+                    ) from None
+            setattr(timeouts, phase, seconds or None)
+        return timeouts
+
+
+class PhaseTimeout(Exception):
+    """A call or scope ran past its deadline; `phase` names the limit that was hit."""
+
+    def __init__(self, phase: str, what: str, seconds: float | None):
+        self.phase = phase
+        self.what = what
+        self.seconds = seconds
+        limit = f" ({seconds:g}s)" if seconds is not None else ""
+        super().__init__(f"{what} exceeded the {phase} timeout{limit}")
+
+
+class FlowTimeout(Exception):
+    """Raised for a flow that ended in TIMEOUT, so it is not reported as a failed check."""
+
+    def __init__(self, phase: str, message: str):
+        self.phase = phase
+        super().__init__(message)
+
+
+class Deadlines:
+    """Tracks the step, flow and run deadlines that are currently open."""
+
+    def __init__(self, timeouts: Timeouts, run_ends_at: float | None = None):
+        self.timeouts = timeouts
+        self._ends: dict[str, float] = {}
+        if run_ends_at is not None:
+            self._ends["run"] = run_ends_at
+
+    def open(self, scope: str):
+        seconds = getattr(self.timeouts, scope)
+        if seconds:
+            self._ends[scope] = time.monotonic() + seconds
+
+    def close(self, scope: str):
+        self._ends.pop(scope, None)
+
+    def fork(self, scope: str) -> "Deadlines":
+        """
+        A copy without `scope`, for the next `scope`: work may start on it early, bounded only
+        by the enclosing deadlines, and is bounded by `scope` too once the copy opens it.
+        """
+        forked = Deadlines(self.timeouts)
+        forked._ends = dict(self._ends)
+        forked.close(scope)
+        return forked
+
+    def budget(self, phase: str, what: str) -> tuple[float | None, str]:
+        """
+        Returns (seconds, phase) for a call of kind `phase` ("http" or "llm"): its own limit,
+        or the remainder of a tighter enclosing deadline, named by the phase returned.
+        Raises PhaseTimeout when an enclosing deadline has already passed.
+        """
+        seconds = getattr(self.timeouts, phase) or None
+        now = time.monotonic()
+        for scope in SCOPES:
+            # Read once: a scope may be opened from another thread while this call runs.
+            end = self._ends.get(scope)
+            if end is not None:
+                left = end - now
+                if left <= 0:
+                    raise PhaseTimeout(scope, what, getattr(self.timeouts, scope))
+                if seconds is None or left < seconds:
+                    seconds, phase = left, scope
+        return seconds, phase
+
+    def limit(self, phase: str) -> float | None:
+        """The configured limit for `phase`, for error messages."""
+        return getattr(self.timeouts, phase, None)
@@ -0,0 +1,227 @@
+import json
+import mimetypes
+import os
+import uuid
+from dataclasses import dataclass
+
+JSON = "application/json"
+MULTIPART = "multipart/form-data"
+FORM = "application/x-www-form-urlencoded"
+BINARY = "application/octet-stream"
+
+# Request body media types in order of preference when an operation accepts several.
+PREFERRED_CONTENT_TYPES = (JSON, MULTIPART, FORM, BINARY)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def request_body_content(openapi_spec: dict, path: str, method: str) -> tuple[str, dict | None]:
+    """
+    Returns (media type, schema) of an operation's request body: JSON when it is accepted,
+    then multipart, form-encoded and binary, then whatever the spec lists first.
+    Operations without a request body are treated as JSON.
+    """
+    operation = openapi_spec.get("paths", {}).get(path, {}).get(method.lower()) or {}
+    body = operation.get("requestBody") or {}
+    if "$ref" in body:
+        from api_ninja.openapi import resolve_ref
+
+        body = resolve_ref(openapi_spec, body["$ref"])
+    content = body.get("content") or {}
+    for media_type in PREFERRED_CONTENT_TYPES:
+        if media_type in content:
+            return media_type, content[media_type].get("schema")
+    for media_type, media in content.items():
+        if media_type.endswith("+json"):
+            return JSON, media.get("schema")
+        return media_type, media.get("schema")
+    return JSON, None
+
+
+def is_json(content_type: str) -> bool:
+    return content_type == JSON or content_type.endswith("+json")
+
+
+def file_ref(value) -> str | None:
+    """The fixture name in a {"$file": name} payload value, or None."""
+    if isinstance(value, dict) and len(value) == 1 and isinstance(value.get("$file"), str):
+        return value["$file"]
+    return None
+
+
+class GeneratedFile:
+    """A read-only file of `size` deterministic bytes that is never held in memory."""
+
+    _BLOCK = bytes(range(256)) * (CHUNK_SIZE // 256)
+
+    def __init__(self, size: int):
+        self.size = size
+        self._position = 0
+
+    def __len__(self) -> int:
+        return self.size - self._position
+
+    def read(self, size: int = -1) -> bytes:
+        left = self.size - self._position
+        if size is None or size < 0 or size > left:
+            size = left
+        size = min(size, CHUNK_SIZE)
+        start = self._position % 256
+        self._position += size
+        return (self._BLOCK[start:] + self._BLOCK[:start])[:size]
+
+    def __iter__(self):
+        while chunk := self.read(CHUNK_SIZE):
+            yield chunk
+
+    def close(self):
+        self._position = self.size
+
+
+@dataclass(slots=True)
+class Fixture:
+    """
+    A file a flow can upload: read from `path` in chunks, or generated on the fly with `size`
+    bytes. Prompts only ever see its metadata.
+    """
+
+    name: str
+    content_type: str
+    size: int
+    path: str | None = None
+
+    def open(self):
+        return open(self.path, "rb") if self.path else GeneratedFile(self.size)
+
+    def metadata(self) -> dict:
+        return {"name": self.name, "size": self.size, "content_type": self.content_type}
+
+
+# Offered to the request generator when an upload endpoint is called by a flow without files.
+DEFAULT_FIXTURE = Fixture("sample.bin", BINARY, 1024)
+
+
+def load_fixtures(files: dict | None) -> dict[str, Fixture]:
+    """
+    Builds fixtures from a flow's `files:` mapping. A value is either a path, or a mapping
+    with `path` and/or `size` (bytes to generate) and an optional `content_type`.
+    """
+    fixtures = {}
+    for name, value in (files or {}).items():
+        if isinstance(value, str):
+            value = {"path": value}
+        path = value.get("path")
+        guessed = mimetypes.guess_type(path or name)[0]
+        size = os.path.getsize(path) if path else int(value.get("size", DEFAULT_FIXTURE.size))
+        content_type = value.get("content_type") or guessed or BINARY
+        fixtures[name] = Fixture(name, content_type, size, path)
+    return fixtures
+
+
+def _fixture(value, fixtures: dict[str, Fixture]) -> Fixture:
+    name = file_ref(value) or value
+    fixture = fixtures.get(name) if isinstance(name, str) else None
+    if fixture is None and name == DEFAULT_FIXTURE.name:
+        fixture = DEFAULT_FIXTURE
+    if fixture is None:
+        available = ", ".join(fixtures) or DEFAULT_FIXTURE.name
+        raise ValueError(f"Unknown file {name!r}; available files: {available}")
+    return fixture
+
+
+def _form_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class MultipartStream:
+    """
+    A multipart/form-data body that is produced while it is sent: form fields are encoded up
+    front, files are read in CHUNK_SIZE pieces as the connection asks for them. Its length
+    is known in advance, so it is sent with a Content-Length rather than chunked.
+    """
+
+    def __init__(self, fields: dict, fixtures: dict[str, Fixture]):
+        self.boundary = uuid.uuid4().hex
+        self._parts: list = []
+        for name, value in (fields or {}).items():
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                if file_ref(item) is not None:
+                    fixture = _fixture(item, fixtures)
+                    header = (
+                        f'Content-Disposition: form-data; name="{name}"; '
+                        f'filename="{fixture.name}"\r\nContent-Type: {fixture.content_type}'
+                    )
+                    self._parts.append(self._head(header))
+                    self._parts.append(fixture)
+                else:
+                    header = f'Content-Disposition: form-data; name="{name}"'
+                    self._parts.append(self._head(header) + _form_value(item).encode("utf-8"))
+                self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode("ascii"))
+        self._length = sum(
+            part.size if isinstance(part, Fixture) else len(part) for part in self._parts
+        )
+        self._sent = 0
+        self._open = None
+
+    def _head(self, header: str) -> bytes:
+        return f"--{self.boundary}\r\n{header}\r\n\r\n".encode("utf-8")
+
+    @property
+    def content_type(self) -> str:
+        return f"{MULTIPART}; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length - self._sent
+
+    def read(self, size: int = -1) -> bytes:
+        while self._parts:
+            part = self._parts[0]
+            if isinstance(part, Fixture):
+                if self._open is None:
+                    self._open = part.open()
+                chunk = self._open.read(CHUNK_SIZE if size is None or size < 0 else size)
+                if chunk:
+                    self._sent += len(chunk)
+                    return chunk
+                self._open.close()
+                self._open = None
+                self._parts.pop(0)
+            else:
+                self._parts.pop(0)
+                self._sent += len(part)
+                return part
+        return b""
+
+    def __iter__(self):
+        while chunk := self.read(CHUNK_SIZE):
+            yield chunk
+
+    def close(self):
+        if self._open is not None:
+            self._open.close()
+            self._open = None
+        self._parts.clear()
+
+
+def encode_body(content_type: str, payload, fixtures: dict[str, Fixture]) -> tuple[dict, dict]:
+    """
+    Returns (keyword arguments for requests, headers to set) that send `payload` as
+    `content_type`. In multipart and binary bodies, {"$file": name} stands for a fixture.
+    """
+    if is_json(content_type):
+        return {"json": payload}, {}
+    if content_type == FORM:
+        fields = {name: _form_value(value) for name, value in (payload or {}).items()}
+        return {"data": fields}, {"Content-Type": FORM}
+    if content_type == MULTIPART:
+        stream = MultipartStream(payload if isinstance(payload, dict) else {}, fixtures)
+        return {"data": stream}, {"Content-Type": stream.content_type}
+    # Any other media type is a raw body: the file the payload names, or the text it holds.
+    named = file_ref(payload) or payload
+    if isinstance(payload, str) and named not in fixtures and named != DEFAULT_FIXTURE.name:
+        return {"data": payload.encode("utf-8")}, {"Content-Type": content_type}
+    return {"data": _fixture(payload, fixtures).open()}, {"Content-Type": content_type}
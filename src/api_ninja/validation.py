@@ -0,0 +1,429 @@
+import re
+import threading
+from typing import Callable
+
+from api_ninja.openapi import PathMatcher, iter_operations, normalize_responses, resolve_ref
+
+# A compiled validator appends human-readable errors for `value` (located at `at`, a JSON
+# pointer) to `errors`.
+Validator = Callable[[object, str, list], None]
+
+_TYPE_CHECKS = {
+    "null": lambda v: v is None,
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+}
+
+
+def _accept(value, at, errors):
+    pass
+
+
+def _short(value) -> str:
+    text = repr(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+
+class SchemaCompiler:
+    """
+    Compiles OpenAPI 3.0/3.1 schemas into nested closures once, so validating a body is a
+    plain function call with no $ref resolution or keyword dispatch left to do.
+    """
+
+    def __init__(self, openapi_spec: dict):
+        self.openapi_spec = openapi_spec
+        self._refs: dict[str, Validator] = {}
+
+    def compile(self, schema) -> Validator:
+        if schema is True or schema is None or schema == {}:
+            return _accept
+        if schema is False:
+            return lambda value, at, errors: errors.append(f"{at or '/'}: no value is allowed")
+
+        checks = []
+        if "$ref" in schema:
+            checks.append(self._compile_ref(schema["$ref"]))
+        nullable = schema.get("nullable") is True
+
+        if "type" in schema:
+            checks.append(self._compile_type(schema["type"], nullable))
+        if "enum" in schema:
+            checks.append(self._compile_enum(schema["enum"], nullable))
+        if "const" in schema:
+            const = schema["const"]
+
+            def check_const(value, at, errors):
+                if value != const:
+                    errors.append(f"{at or '/'}: expected {_short(const)}, got {_short(value)}")
+
+            checks.append(check_const)
+
+        checks.extend(self._compile_object(schema))
+        checks.extend(self._compile_array(schema))
+        checks.extend(self._compile_string(schema))
+        checks.extend(self._compile_number(schema))
+        checks.extend(self._compile_combinators(schema))
+
+        if not checks:
+            return _accept
+        if nullable:
+            inner = checks
+
+            def check_nullable(value, at, errors):
+                if value is None:
+                    return
+                for check in inner:
+                    check(value, at, errors)
+
+            return check_nullable
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value, at, errors):
+            for check in checks:
+                check(value, at, errors)
+
+        return check_all
+
+    def _compile_ref(self, ref: str) -> Validator:
+        if ref not in self._refs:
+            # Placeholder first, so recursive schemas terminate.
+            self._refs[ref] = _accept
+            self._refs[ref] = self.compile(resolve_ref(self.openapi_spec, ref))
+        refs = self._refs
+
+        def check_ref(value, at, errors):
+            refs[ref](value, at, errors)
+
+        return check_ref
+
+    def _compile_type(self, types, nullable: bool) -> Validator:
+        types = [types] if isinstance(types, str) else list(types)
+        if nullable and "null" not in types:
+            types.append("null")
+        type_checks = [_TYPE_CHECKS[t] for t in types if t in _TYPE_CHECKS]
+        expected = " or ".join(types)
+
+        def check_type(value, at, errors):
+            for type_check in type_checks:
+                if type_check(value):
+                    return
+            errors.append(f"{at or '/'}: expected {expected}, got {type(value).__name__}")
+
+        return check_type
+
+    def _compile_enum(self, enum: list, nullable: bool) -> Validator:
+        allowed = list(enum) + ([None] if nullable else [])
+
+        def check_enum(value, at, errors):
+            if value not in allowed:
+                errors.append(f"{at or '/'}: {_short(value)} is not one of {_short(enum)}")
+
+        return check_enum
+
+    def _compile_object(self, schema: dict) -> list[Validator]:
+        checks = []
+        properties = {name: self.compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = list(schema.get("required", []))
+        additional = schema.get("additionalProperties", True)
+        additional_check = None if additional is True else self.compile(additional)
+        min_props = schema.get("minProperties")
+        max_props = schema.get("maxProperties")
+
+        if properties or required or additional_check is not None:
+
+            def check_properties(value, at, errors):
+                if not isinstance(value, dict):
+                    return
+                for name in required:
+                    if name not in value:
+                        errors.append(f"{at or '/'}: missing required property {name!r}")
+                for name, item in value.items():
+                    check = properties.get(name, additional_check)
+                    if check is not None:
+                        check(item, f"{at}/{name}", errors)
+
+            checks.append(check_properties)
+
+        if min_props is not None or max_props is not None:
+
+            def check_size(value, at, errors):
+                if not isinstance(value, dict):
+                    return
+                if min_props is not None and len(value) < min_props:
+                    errors.append(f"{at or '/'}: fewer than {min_props} properties")
+                if max_props is not None and len(value) > max_props:
+                    errors.append(f"{at or '/'}: more than {max_props} properties")
+
+            checks.append(check_size)
+        return checks
+
+    def _compile_array(self, schema: dict) -> list[Validator]:
+        checks = []
+        items = schema.get("items")
+        if isinstance(items, dict):
+            item_check = self.compile(items)
+
+            def check_items(value, at, errors):
+                if not isinstance(value, list):
+                    return
+                for i, item in enumerate(value):
+                    item_check(item, f"{at}/{i}", errors)
+
+            checks.append(check_items)
+
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+        unique = schema.get("uniqueItems", False)
+        if min_items is not None or max_items is not None or unique:
+
+            def check_bounds(value, at, errors):
+                if not isinstance(value, list):
+                    return
+                if min_items is not None and len(value) < min_items:
+                    errors.append(f"{at or '/'}: fewer than {min_items} items")
+                if max_items is not None and len(value) > max_items:
+                    errors.append(f"{at or '/'}: more than {max_items} items")
+                if unique and len({repr(item) for item in value}) != len(value):
+                    errors.append(f"{at or '/'}: items are not unique")
+
+            checks.append(check_bounds)
+        return checks
+
+    def _compile_string(self, schema: dict) -> list[Validator]:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+        if min_length is None and max_length is None and pattern is None:
+            return []
+
+        def check_string(value, at, errors):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{at or '/'}: shorter than {min_length} characters")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{at or '/'}: longer than {max_length} characters")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{at or '/'}: does not match {pattern.pattern!r}")
+
+        return [check_string]
+
+    def _compile_number(self, schema: dict) -> list[Validator]:
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+        exclusive_min = schema.get("exclusiveMinimum")
+        exclusive_max = schema.get("exclusiveMaximum")
+        # OpenAPI 3.0 uses booleans that modify minimum/maximum, 3.1 uses numbers.
+        if exclusive_min is True:
+            exclusive_min, minimum = minimum, None
+        elif exclusive_min is False:
+            exclusive_min = None
+        if exclusive_max is True:
+            exclusive_max, maximum = maximum, None
+        elif exclusive_max is False:
+            exclusive_max = None
+        multiple_of = schema.get("multipleOf")
+        bounds = (minimum, maximum, exclusive_min, exclusive_max, multiple_of)
+        if all(bound is None for bound in bounds):
+            return []
+
+        def check_number(value, at, errors):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{at or '/'}: {value} is less than {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{at or '/'}: {value} is greater than {maximum}")
+            if exclusive_min is not None and value <= exclusive_min:
+                errors.append(f"{at or '/'}: {value} is not greater than {exclusive_min}")
+            if exclusive_max is not None and value >= exclusive_max:
+                errors.append(f"{at or '/'}: {value} is not less than {exclusive_max}")
+            if multiple_of and (value / multiple_of) % 1:
+                errors.append(f"{at or '/'}: {value} is not a multiple of {multiple_of}")
+
+        return [check_number]
+
+    def _compile_combinators(self, schema: dict) -> list[Validator]:
+        checks = []
+        for sub in schema.get("allOf", []):
+            checks.append(self.compile(sub))
+
+        discriminator = schema.get("discriminator")
+        for keyword in ("oneOf", "anyOf"):
+            if keyword not in schema:
+                continue
+            if discriminator and "propertyName" in discriminator:
+                checks.append(self._compile_discriminator(schema[keyword], discriminator))
+                continue
+            branches = [self.compile(sub) for sub in schema[keyword]]
+            exactly_one = keyword == "oneOf"
+
+            def check_branches(value, at, errors, branches=branches, exactly_one=exactly_one):
+                matches = 0
+                first_errors = None
+                for branch in branches:
+                    branch_errors = []
+                    branch(value, at, branch_errors)
+                    if not branch_errors:
+                        matches += 1
+                        if not exactly_one:
+                            return
+                    elif first_errors is None:
+                        first_errors = branch_errors
+                if matches == 1 or (matches and not exactly_one):
+                    return
+                if matches > 1:
+                    errors.append(f"{at or '/'}: matches {matches} oneOf schemas, expected 1")
+                else:
+                    errors.append(f"{at or '/'}: matches none of the allowed schemas")
+                    errors.extend(first_errors or [])
+
+            checks.append(check_branches)
+
+        if "not" in schema:
+            negated = self.compile(schema["not"])
+
+            def check_not(value, at, errors):
+                branch_errors = []
+                negated(value, at, branch_errors)
+                if not branch_errors:
+                    errors.append(f"{at or '/'}: must not match the 'not' schema")
+
+            checks.append(check_not)
+        return checks
+
+    def _compile_discriminator(self, branches: list, discriminator: dict) -> Validator:
+        prop = discriminator["propertyName"]
+        mapping = {}
+        for value, ref in discriminator.get("mapping", {}).items():
+            if not ref.startswith("#"):
+                ref = f"#/components/schemas/{ref}"
+            mapping[value] = self._compile_ref(ref)
+        # Without an explicit mapping the discriminator value is the schema name.
+        for branch in branches:
+            ref = branch.get("$ref", "")
+            name = ref.rsplit("/", 1)[-1]
+            if ref and name not in mapping:
+                mapping[name] = self._compile_ref(ref)
+
+        def check_discriminator(value, at, errors):
+            if not isinstance(value, dict):
+                errors.append(f"{at or '/'}: expected object, got {type(value).__name__}")
+                return
+            if prop not in value:
+                errors.append(f"{at or '/'}: missing discriminator property {prop!r}")
+                return
+            branch = mapping.get(value[prop])
+            if branch is None:
+                errors.append(f"{at or '/'}: unknown {prop} {_short(value[prop])}")
+                return
+            branch(value, at, errors)
+
+        return check_discriminator
+
+
+def _json_schema(content: dict) -> dict | None:
+    for media_type in ("application/json", *content):
+        if media_type == "application/json" or media_type.endswith("+json"):
+            schema = content.get(media_type, {}).get("schema")
+            if schema is not None:
+                return schema
+    return None
+
+
+class ValidatorRegistry:
+    """
+    Compiles one validator per (path, method, status) on first use and keeps it for the run.
+    `path` may be a spec template ("/users/{user_id}") or a concrete path ("/users/42").
+    """
+
+    def __init__(self, openapi_spec: dict):
+        self.openapi_spec = normalize_responses(openapi_spec)
+        self.compiler = SchemaCompiler(self.openapi_spec)
+        self.paths = PathMatcher(self.openapi_spec)
+        self._validators: dict[tuple, Validator | None] = {}
+        self._lock = threading.Lock()
+
+    def _operation(self, path: str, method: str) -> tuple[str, dict] | None:
+        template = self.paths.match(path)
+        if template is None:
+            return None
+        operation = self.openapi_spec["paths"][template].get(method.lower())
+        return (template, operation) if operation is not None else None
+
+    def response_schema(self, path: str, method: str, status: int) -> dict | None:
+        found = self._operation(path, method)
+        if found is None:
+            return None
+        responses = found[1].get("responses", {})
+        for key in (str(status), f"{str(status)[0]}XX", f"{str(status)[0]}xx", "default"):
+            if key in responses:
+                response = responses[key]
+                if "$ref" in response:
+                    response = resolve_ref(self.openapi_spec, response["$ref"])
+                return _json_schema(response.get("content", {}))
+        return None
+
+    def request_schema(self, path: str, method: str) -> dict | None:
+        found = self._operation(path, method)
+        if found is None:
+            return None
+        body = found[1].get("requestBody")
+        if not body:
+            return None
+        if "$ref" in body:
+            body = resolve_ref(self.openapi_spec, body["$ref"])
+        return _json_schema(body.get("content", {}))
+
+    def _get(self, key: tuple, schema_getter) -> Validator | None:
+        if key in self._validators:
+            return self._validators[key]
+        with self._lock:
+            if key not in self._validators:
+                schema = schema_getter()
+                self._validators[key] = None if schema is None else self.compiler.compile(schema)
+            return self._validators[key]
+
+    def response_validator(self, path: str, method: str, status: int) -> Validator | None:
+        template = self.paths.match(path) or path
+        return self._get(
+            (template, method.lower(), status),
+            lambda: self.response_schema(template, method, status),
+        )
+
+    def request_validator(self, path: str, method: str) -> Validator | None:
+        template = self.paths.match(path) or path
+        return self._get(
+            (template, method.lower(), "request"), lambda: self.request_schema(template, method)
+        )
+
+    def validate_response(self, path: str, method: str, status: int, body) -> list[str] | None:
+        """Returns the schema errors in `body`, or None when the spec declares no JSON schema."""
+        validator = self.response_validator(path, method, status)
+        if validator is None:
+            return None
+        errors = []
+        validator(body, "", errors)
+        return errors
+
+    def validate_request(self, path: str, method: str, body) -> list[str] | None:
+        validator = self.request_validator(path, method)
+        if validator is None:
+            return None
+        errors = []
+        validator(body, "", errors)
+        return errors
+
+    def compile_all(self):
+        """Compiles every request and response validator up front, e.g. for `api-ninja lint`."""
+        for path, method, operation in iter_operations(self.openapi_spec):
+            self.request_validator(path, method)
+            for status in operation.get("responses", {}):
+                if str(status).isdigit():
+                    self.response_validator(path, method, int(status))
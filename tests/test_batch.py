@@ -0,0 +1,187 @@
+import json
+
+import pytest
+
+from api_ninja.agents.flow_generator import FlowGeneratorAgent
+from api_ninja.batch import BatchBackend, BatchFlowGenerator, LocalBatchBackend
+
+SPEC = {
+    "openapi": "3.0.0",
+    "paths": {
+        "/users": {"post": {"responses": {"201": {"description": "Created"}}}},
+        "/users/{id}": {"get": {"responses": {"200": {"description": "OK"}}}},
+    },
+}
+
+
+def section(text: str, start: str, end: str):
+    return json.loads(text.split(start, 1)[1].split(end, 1)[0])
+
+
+class FakeModel:
+    """
+    Answers batch request bodies like the chat completions API. Each endpoint gets a "happy"
+    flow that scores 0.95 and a "weak" one scored by `weak_scores`, one entry per version;
+    regenerating a flow bumps its version (the description).
+    """
+
+    def __init__(self, weak_scores=(0.3, 0.95)):
+        self.weak_scores = weak_scores
+
+    def flows(self, system: str, user: str) -> list[dict]:
+        if user.startswith("Generate"):
+            path = user.rsplit(" ", 1)[-1]
+            slug = path.strip("/").replace("/", "_").replace("{", "").replace("}", "")
+            return [{"id": f"{slug}_{kind}", "description": "0"} for kind in ("happy", "weak")]
+        rejected = section(system, "## Rejected flows:", "## Your task:")
+        return [
+            {"id": flow["id"], "description": str(int(flow["description"]) + 1)}
+            for flow in rejected
+        ]
+
+    def score(self, flow: dict) -> float:
+        if flow["id"].endswith("happy"):
+            return 0.95
+        version = int(flow["description"])
+        return self.weak_scores[min(version, len(self.weak_scores) - 1)]
+
+    def __call__(self, body: dict) -> dict:
+        system, user = (message["content"] for message in body["messages"])
+        if body["response_format"]["json_schema"]["name"] == "flows":
+            output = [
+                {"expectations": "201", "notes": "", **flow} for flow in self.flows(system, user)
+            ]
+        else:
+            flows = section(system, "## Flows:", "Score each flow")
+            output = [
+                {"id": flow["id"], "score": self.score(flow), "feedback": "Be specific."}
+                for flow in flows
+            ]
+        content = json.dumps({"response": output})
+        usage = {"prompt_tokens": 10, "completion_tokens": 5}
+        return {"choices": [{"message": {"content": content}}], "usage": usage}
+
+
+class RecordingBackend(LocalBatchBackend):
+    """A LocalBatchBackend that records which stages were submitted."""
+
+    def __init__(self, complete, stop_at: str | None = None):
+        super().__init__(complete, workers=1)
+        self.stop_at = stop_at
+        self.submitted = []
+
+    def submit(self, requests, description=""):
+        stage = description.removeprefix("api-ninja ")
+        if stage == self.stop_at:
+            raise KeyboardInterrupt
+        self.submitted.append(stage)
+        return super().submit(requests, description)
+
+
+def generate(backend, checkpoint, **kwargs):
+    generator = BatchFlowGenerator(
+        FlowGeneratorAgent(), backend, str(checkpoint), poll_interval=0, **kwargs
+    )
+    return generator, generator.generate_flows_for_spec(SPEC)
+
+
+def test_weak_flows_are_regenerated_and_rescored(tmp_path):
+    backend = RecordingBackend(FakeModel(weak_scores=(0.3, 0.95)))
+    generator, output = generate(backend, tmp_path / "ck.json")
+
+    assert backend.submitted == ["generation", "scoring", "regeneration 1", "rescoring 1"]
+    assert set(output["collections"]) == {"post_users", "get_users_id"}
+    assert output["flows"]["users_happy"]["description"] == "0"
+    assert output["flows"]["users_weak"]["description"] == "1"
+    assert output["flows"]["users_id_weak"]["description"] == "1"
+    # 2 endpoints x (generation + scoring) + 2 x (regeneration + rescoring).
+    assert generator.usage["flow_generator"].requests == 4
+    assert generator.usage["scorer"].input_tokens == 40
+
+
+def test_flows_that_stop_improving_are_dropped(tmp_path):
+    backend = RecordingBackend(FakeModel(weak_scores=(0.3, 0.31)))
+    _, output = generate(backend, tmp_path / "ck.json", rounds=3)
+
+    assert backend.submitted == ["generation", "scoring", "regeneration 1", "rescoring 1"]
+    assert set(output["flows"]) == {"users_happy", "users_id_happy"}
+
+
+def test_rounds_continue_while_scores_improve(tmp_path):
+    backend = RecordingBackend(FakeModel(weak_scores=(0.3, 0.6, 0.95)))
+    _, output = generate(backend, tmp_path / "ck.json", rounds=3)
+
+    assert backend.submitted[-2:] == ["regeneration 2", "rescoring 2"]
+    assert output["flows"]["users_weak"]["description"] == "2"
+
+
+def test_checkpoint_resumes_without_resubmitting_finished_batches(tmp_path):
+    checkpoint = tmp_path / "ck.json"
+    model = FakeModel()
+    interrupted = RecordingBackend(model, stop_at="regeneration 1")
+    with pytest.raises(KeyboardInterrupt):
+        generate(interrupted, checkpoint)
+    assert interrupted.submitted == ["generation", "scoring"]
+    assert set(json.loads(checkpoint.read_text())["results"]) == {"generation", "scoring"}
+
+    resumed = RecordingBackend(model)
+    _, output = generate(resumed, checkpoint)
+    assert resumed.submitted == ["regeneration 1", "rescoring 1"]
+    _, fresh = generate(RecordingBackend(model), tmp_path / "fresh.json")
+    assert output == fresh
+
+
+class SlowBackend(RecordingBackend):
+    """Is interrupted while polling its first batch, which then stays in progress once."""
+
+    def __init__(self, complete):
+        super().__init__(complete)
+        self.polls = 0
+
+    def status(self, batch_id):
+        self.polls += 1
+        if self.polls == 1:
+            raise KeyboardInterrupt
+        return "in_progress" if self.polls == 2 else super().status(batch_id)
+
+
+def test_submitted_batch_is_polled_after_a_restart(tmp_path):
+    checkpoint = tmp_path / "ck.json"
+    backend = SlowBackend(FakeModel())
+    with pytest.raises(KeyboardInterrupt):
+        generate(backend, checkpoint)
+    state = json.loads(checkpoint.read_text())
+    assert list(state["batches"]) == ["generation"] and state["results"] == {}
+
+    _, output = generate(backend, checkpoint)
+    assert backend.submitted == ["generation", "scoring", "regeneration 1", "rescoring 1"]
+    assert len(output["flows"]) == 4
+
+
+def test_local_batch_from_an_earlier_process_is_submitted_again(tmp_path):
+    checkpoint = tmp_path / "ck.json"
+    with pytest.raises(KeyboardInterrupt):
+        generate(SlowBackend(FakeModel()), checkpoint)
+
+    # A new process: the interrupted generation batch only lived in the old one.
+    restarted = RecordingBackend(FakeModel())
+    _, output = generate(restarted, checkpoint)
+    assert restarted.submitted == ["generation", "scoring", "regeneration 1", "rescoring 1"]
+    assert len(output["flows"]) == 4
+
+
+def test_backends_must_implement_the_batch_methods():
+    class Incomplete(BatchBackend):
+        def submit(self, requests, description=""):
+            return "batch"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_checkpoint_for_another_spec_is_ignored(tmp_path):
+    checkpoint = tmp_path / "ck.json"
+    checkpoint.write_text(json.dumps({"spec": "other", "batches": {}, "results": {"x": {}}}))
+    backend = RecordingBackend(FakeModel())
+    generate(backend, checkpoint)
+    assert backend.submitted[0] == "generation"
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from api_ninja.cache import ResponseCache, resource_root
+from api_ninja.core import APINinja
+
+SPEC = {
+    "paths": {
+        "/v1/users": {"get": {}, "post": {}},
+        "/v1/users/me": {"get": {}},
+        "/v1/users/{id}": {"get": {}, "patch": {}},
+        "/v1/orders": {"get": {}},
+    }
+}
+
+
+@pytest.mark.parametrize(
+    "path, template, root",
+    [
+        ("/v1/users/42/tags", "/v1/users/{id}/tags", "/v1/users"),
+        ("/v1/users", "/v1/users", "/v1/users"),
+        ("/v1/users/me", "/v1/users/me", "/v1/users/me"),
+        ("/health?full=1", None, "/health"),
+        ("/{tenant}/users", "/{tenant}/users", "/"),
+    ],
+)
+def test_resource_root(path, template, root):
+    assert resource_root(path, template) == root
+
+
+def test_invalidate_drops_reads_of_the_same_resource_only():
+    cache = ResponseCache()
+    for root in ("/v1/users", "/v1/users/me", "/v1/orders"):
+        cache.put(root, root, 200, {})
+    cache.invalidate("/v1/users")
+    assert cache.get("/v1/users") is None
+    assert cache.get("/v1/users/me") is None
+    assert cache.get("/v1/orders") == (200, {})
+
+
+class Session:
+    """Answers every request with a fresh body and counts the requests."""
+
+    def __init__(self):
+        self.sent = []
+
+    def request(self, method, url, **kwargs):
+        self.sent.append((method, url))
+        return SimpleNamespace(status_code=200, json=lambda: {"n": len(self.sent)})
+
+
+@pytest.fixture
+def ninja():
+    ninja = APINinja(SPEC, "https://host/api", cache_responses=True)
+    ninja._session = Session()
+    return ninja
+
+
+def get(ninja, path, **kwargs):
+    return ninja.request_api({"method": "GET", "path": path}, **kwargs)
+
+
+def test_writes_under_a_base_path_keep_other_resources_cached(ninja):
+    get(ninja, "/v1/users/7")
+    get(ninja, "/v1/orders")
+    ninja.request_api({"method": "PATCH", "path": "/v1/users/7", "payload": {}})
+    assert not get(ninja, "/v1/users/7").cached
+    assert get(ninja, "/v1/orders").cached
+    assert ninja._session.sent[0] == ("GET", "https://host/api/v1/users/7")
+
+
+def test_reads_past_the_cache_do_not_invalidate_it(ninja):
+    get(ninja, "/v1/users")
+    get(ninja, "/v1/users", use_cache=False)
+    assert get(ninja, "/v1/users").cached
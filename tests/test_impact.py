@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from api_ninja.flowstore import FlowStore, collect_flows, convert_flows, index_path
+from api_ninja.history import RunHistory
+from api_ninja.impact import changed_flows, record_flow_inputs
+from api_ninja.results import FlowResult
+
+SPEC = {"paths": {"/users": {"get": {"responses": {"200": {"description": "OK"}}}}}}
+
+
+def config(**collection) -> dict:
+    return {
+        "flows": {
+            "list_users": {"description": "List users", "expectations": "200"},
+            "list_users_twice": {"description": "List users twice", "expectations": "200"},
+        },
+        "collections": {"users": {"flows": ["list_users", "list_users_twice"], **collection}},
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    yield history
+    history.close()
+
+
+def record_passes(history, flows):
+    for flow in flows.values():
+        result = FlowResult(flow["flow_id"], flow["collection"], operations=["GET /users"])
+        record_flow_inputs(history, flow, result, SPEC)
+
+
+def test_unchanged_flows_that_passed_are_skipped(history):
+    flows = collect_flows(config())
+    record_passes(history, flows)
+    assert changed_flows(history, flows, SPEC) == {}
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"latency": {"p95_ms": 200}},
+        {"concurrency": 5},
+        {"files": {"avatar": "avatar.png"}},
+        {"auth": False},
+    ],
+)
+def test_changing_only_a_run_setting_reruns_the_flow(history, change):
+    cfg = config()
+    record_passes(history, collect_flows(cfg))
+    cfg["flows"]["list_users"].update(change)
+    assert changed_flows(history, collect_flows(cfg), SPEC) == {
+        "list_users": "flow definition changed"
+    }
+
+
+def test_changing_the_collection_latency_reruns_its_flows(history):
+    record_passes(history, collect_flows(config(latency={"p95_ms": 200})))
+    flows = collect_flows(config(latency={"p95_ms": 100}))
+    assert set(changed_flows(history, flows, SPEC)) == {"list_users", "list_users_twice"}
+
+
+def test_flow_store_index_fingerprints_cover_latency(history, tmp_path):
+    path = str(tmp_path / "flows.jsonl")
+    convert_flows(config(latency={"p95_ms": 200}), path)
+    flows = FlowStore(path)
+    record_passes(history, {flow_id: flows[flow_id] for flow_id in flows})
+    assert changed_flows(history, flows, SPEC) == {}
+    flows.close()
+
+    convert_flows(config(latency={"p95_ms": 100}), path)
+    flows = FlowStore(path)
+    assert set(changed_flows(history, flows, SPEC)) == {"list_users", "list_users_twice"}
+    flows.close()
+
+
+def test_index_without_the_current_header_is_rebuilt(history, tmp_path):
+    path = str(tmp_path / "flows.jsonl")
+    convert_flows(config(), path)
+    with open(index_path(path)) as f:
+        entries = f.readlines()[1:]
+    # An index from before the header, whose fingerprints cover fewer keys.
+    with open(index_path(path), "w") as f:
+        f.writelines(json.dumps(json.loads(line)[:4] + ["stale"]) + "\n" for line in entries)
+
+    flows = FlowStore(path)
+    record_passes(history, {flow_id: flows[flow_id] for flow_id in flows})
+    assert changed_flows(history, flows, SPEC) == {}
+    flows.close()
@@ -0,0 +1,105 @@
+from api_ninja.mock import MockAPI
+
+
+def ref(name: str) -> dict:
+    return {"$ref": f"#/components/schemas/{name}"}
+
+
+def returns(schema: dict | None, status: str = "200") -> dict:
+    response = {"description": "OK"}
+    if schema is not None:
+        response["content"] = {"application/json": {"schema": schema}}
+    return {"responses": {status: response}}
+
+
+def body(name: str) -> dict:
+    return {"requestBody": {"content": {"application/json": {"schema": ref(name)}}}}
+
+
+SPEC = {
+    "openapi": "3.0.0",
+    "paths": {
+        "/users": {"post": {**body("User"), **returns(ref("User"), "201")}},
+        "/users/{userId}": {"get": returns(ref("User"))},
+        "/users/{userId}/activate": {"post": returns(ref("User"))},
+        "/users/{userId}/tags": {
+            "post": {**body("Tag"), **returns(ref("Tag"), "201")},
+            "get": returns({"type": "array", "items": ref("Tag")}),
+            "delete": returns(None, "204"),
+        },
+        "/users/{userId}/tags/{tagId}": {
+            "get": returns(ref("Tag")),
+            "delete": returns(None, "204"),
+        },
+        "/users/{userId}/notes/{noteId}": {"delete": returns(None, "204")},
+        "/users/{userId}/notes": {"post": {**body("Note"), **returns(ref("Note"), "201")}},
+    },
+    "components": {
+        "schemas": {
+            "User": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "name": {"type": "string"}},
+            },
+            "Tag": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "label": {"type": "string"}},
+            },
+            "Note": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "text": {"type": "string"}},
+            },
+        }
+    },
+}
+
+
+def users(mock: MockAPI, count: int) -> list[int]:
+    return [mock.handle("POST", "/users", {"name": f"u{i}"})[1]["id"] for i in range(count)]
+
+
+def test_nested_resources_belong_to_their_parent():
+    mock = MockAPI(SPEC)
+    alice, bob = users(mock, 2)
+    status, tag = mock.handle("POST", f"/users/{alice}/tags", {"label": "admin"})
+    assert status == 201 and tag["label"] == "admin"
+
+    assert mock.handle("GET", f"/users/{alice}/tags/{tag['id']}") == (200, tag)
+    assert mock.handle("GET", f"/users/{alice}/tags")[1] == [tag]
+    assert mock.handle("GET", f"/users/{bob}/tags")[1] == []
+    assert mock.handle("GET", f"/users/{bob}/tags/{tag['id']}")[0] == 404
+
+
+def test_nested_delete_removes_the_nested_resource_only():
+    mock = MockAPI(SPEC)
+    (alice,) = users(mock, 1)
+    tag = mock.handle("POST", f"/users/{alice}/tags", {"label": "admin"})[1]
+    # The tag and its user share the id 1; DELETE must not reach for the user.
+    assert tag["id"] == alice
+
+    assert mock.handle("DELETE", f"/users/{alice}/tags/{tag['id']}") == (204, None)
+    assert mock.handle("GET", f"/users/{alice}/tags/{tag['id']}")[0] == 404
+    assert mock.handle("GET", f"/users/{alice}")[0] == 200
+
+
+def test_delete_without_a_get_finds_the_resource_from_its_collection():
+    mock = MockAPI(SPEC)
+    (alice,) = users(mock, 1)
+    note = mock.handle("POST", f"/users/{alice}/notes", {"text": "hi"})[1]
+    assert mock.handle("DELETE", f"/users/{alice}/notes/{note['id']}") == (204, None)
+    assert mock.handle("DELETE", f"/users/{alice}/notes/{note['id']}")[0] == 404
+    assert mock.handle("GET", f"/users/{alice}")[0] == 200
+
+
+def test_operation_returning_the_parent_updates_it():
+    mock = MockAPI(SPEC)
+    (alice,) = users(mock, 1)
+    status, user = mock.handle("POST", f"/users/{alice}/activate", {"name": "active"})
+    assert status == 200 and user == {"id": alice, "name": "active"}
+
+
+def test_delete_on_a_collection_is_not_allowed():
+    mock = MockAPI(SPEC)
+    (alice,) = users(mock, 1)
+    mock.handle("POST", f"/users/{alice}/tags", {"label": "admin"})
+    assert mock.handle("DELETE", f"/users/{alice}/tags")[0] == 405
+    assert len(mock.handle("GET", f"/users/{alice}/tags")[1]) == 1
@@ -0,0 +1,158 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api_ninja.agents import routing
+from api_ninja.agents.routing import DEFAULT_MODEL, ModelRouter
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in list(os.environ):
+        if name.startswith(("LLM_MODEL", "LLM_ESCALATION_MODEL")):
+            monkeypatch.delenv(name)
+
+
+class Calls(list):
+    """The models run_agent was called with; `outputs` queues each model's results."""
+
+    def __init__(self):
+        super().__init__()
+        self.outputs = {}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replaces run_agent; each model returns the output queued for it, or raises it."""
+    calls = Calls()
+
+    def fake_run_agent(model, **kwargs):
+        calls.append(model)
+        output = calls.outputs[model].pop(0)
+        if isinstance(output, Exception):
+            raise output
+        return SimpleNamespace(final_output=output)
+
+    monkeypatch.setattr(routing, "run_agent", fake_run_agent)
+    return calls
+
+
+def test_model_precedence(monkeypatch):
+    router = ModelRouter({"planner": "explicit"})
+    assert router.model("evaluator") == DEFAULT_MODEL
+
+    monkeypatch.setenv("LLM_MODEL", "everyone")
+    assert router.model("evaluator") == "everyone"
+
+    monkeypatch.setenv("LLM_MODEL_EVALUATOR", "evaluator-env")
+    assert router.model("evaluator") == "evaluator-env"
+    assert router.model("generator") == "everyone"
+
+    monkeypatch.setenv("LLM_MODEL_PLANNER", "planner-env")
+    assert router.model("planner") == "explicit"
+
+
+def test_parse_assigns_roles_and_escalation_defaults():
+    router = ModelRouter.parse(["scorer=small"], ["big", "planner=huge"])
+    assert router.model("scorer") == "small"
+    assert router.escalation_model("planner") == "huge"
+    assert router.escalation_model("evaluator") == "big"
+    with pytest.raises(ValueError):
+        ModelRouter.parse(["judge=small"])
+
+
+def test_escalation_model_equal_to_the_primary_is_ignored():
+    router = ModelRouter({"planner": "same"}, {"planner": "same"})
+    assert router.escalation_model("planner") is None
+
+
+def test_parse_error_escalates_once(calls):
+    calls.outputs.update(cheap=["not json"], strong=['{"ok": true}'])
+    router = ModelRouter({"generator": "cheap"}, {"generator": "strong"})
+
+    def parse(output):
+        if not output.startswith("{"):
+            raise ValueError("not JSON")
+        return output
+
+    assert router.run("generator", parse=parse) == '{"ok": true}'
+    assert calls == ["cheap", "strong"]
+    stats = router.stats["generator"]
+    assert (stats.calls, stats.parse_failures, stats.escalations) == (2, 1, 1)
+    assert len(stats.latencies_ms) == 2
+
+
+def test_parse_error_without_escalation_model_is_raised(calls):
+    calls.outputs.update(cheap=["not json"])
+    router = ModelRouter({"generator": "cheap"})
+    with pytest.raises(ValueError):
+        router.run("generator", parse=int)
+    assert calls == ["cheap"]
+    assert router.stats["generator"].parse_failures == 1
+
+
+def test_other_errors_are_not_escalated(calls):
+    calls.outputs.update(cheap=[ConnectionError("down")])
+    router = ModelRouter({"generator": "cheap"}, {"generator": "strong"})
+    with pytest.raises(ConnectionError):
+        router.run("generator")
+    assert calls == ["cheap"]
+    stats = router.stats["generator"]
+    assert (stats.calls, stats.parse_failures, stats.escalations) == (1, 0, 0)
+
+
+def test_rejected_output_escalates(calls):
+    calls.outputs.update(cheap=["UNSURE"], strong=["PASS"])
+    router = ModelRouter({"evaluator": "cheap"}, {"evaluator": "strong"})
+    assert router.run("evaluator", accept=lambda verdict: verdict != "UNSURE") == "PASS"
+    assert calls == ["cheap", "strong"]
+    assert router.stats["evaluator"].escalations == 1
+
+
+def test_accepted_output_is_returned(calls):
+    calls.outputs.update(cheap=["PASS"])
+    router = ModelRouter({"evaluator": "cheap"}, {"evaluator": "strong"})
+    assert router.run("evaluator", accept=lambda verdict: verdict != "UNSURE") == "PASS"
+    assert calls == ["cheap"]
+
+
+def test_summary_rows_report_roles_that_made_calls(calls):
+    calls.outputs.update(cheap=["not json", "1"], strong=["2"])
+    router = ModelRouter({"generator": "cheap"}, {"generator": "strong"})
+    router.run("generator", parse=int)
+    router.run("generator", parse=int)
+    [(label, value)] = router.summary_rows()
+    assert label == "generator (cheap)"
+    assert value.startswith("3 calls, p50 ")
+    assert value.endswith(", 1 unparseable (33%), 1 escalated")
+
+
+def test_escalate_false_leaves_parse_errors_to_the_caller(calls):
+    calls.outputs.update(cheap=["not json"])
+    router = ModelRouter({"generator": "cheap"}, {"generator": "strong"})
+    with pytest.raises(ValueError):
+        router.run("generator", parse=int, escalate=False)
+    assert calls == ["cheap"]
+    assert router.stats["generator"].escalations == 0
+
+
+def test_escalated_call_gets_the_rest_of_the_timeout(monkeypatch):
+    timeouts = []
+
+    def slow_run_agent(model, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        time.sleep(0.05)
+        return SimpleNamespace(final_output="not json" if model == "cheap" else "1")
+
+    monkeypatch.setattr(routing, "run_agent", slow_run_agent)
+    router = ModelRouter({"generator": "cheap"}, {"generator": "strong"})
+    assert router.run("generator", parse=int, timeout=1.0) == 1
+    assert timeouts[0] == 1.0
+    assert 0.5 < timeouts[1] <= 0.95
+
+    timeouts.clear()
+    with pytest.raises(TimeoutError):
+        router.run("generator", parse=int, timeout=0.01)
+    assert len(timeouts) == 1
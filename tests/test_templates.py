@@ -0,0 +1,120 @@
+import pytest
+
+from api_ninja.core import APINinja
+from api_ninja.models import ApiCallModel, RequestTemplateModel
+from api_ninja.templates import UnresolvedBinding, lookup, resolve, resolve_request
+from api_ninja.timeouts import Deadlines, Timeouts
+
+STEPS = [
+    {"status": 201, "body": {"id": 42, "name": "Ada", "tags": ["a", "b"]}},
+    {"status": 200, "body": {"items": [{"id": "x1"}, {"id": "x2"}], "next-page": 2}},
+]
+
+
+def template(**overrides) -> RequestTemplateModel:
+    fields = {
+        "method": "GET",
+        "path": "/users/{user_id}",
+        "payload_description": "",
+        "headers_description": "",
+        "expected_status": 200,
+        "response_check": "",
+        "resolved_path": "/users/{{$.steps[0].body.id}}",
+        "payload_json": "{}",
+        "parameters_json": "{}",
+        "headers_json": "{}",
+    }
+    return RequestTemplateModel(**{**fields, **overrides})
+
+
+def test_lookup_follows_names_indexes_and_quoted_keys():
+    assert lookup("$.steps[0].body.id", STEPS) == 42
+    assert lookup("$.steps[-1].body.items[1].id", STEPS) == "x2"
+    assert lookup("$.steps[1].body['next-page']", STEPS) == 2
+    assert lookup('$.steps[0].body["tags"][0]', STEPS) == "a"
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["$.steps[5].body.id", "$.steps[0].body.missing", "$.steps[0].body.id.deeper", "steps"],
+)
+def test_lookup_raises_for_missing_values(expression):
+    with pytest.raises(UnresolvedBinding):
+        lookup(expression, STEPS)
+
+
+def test_whole_string_binding_keeps_the_value_type():
+    assert resolve("{{$.steps[0].body.id}}", STEPS) == 42
+    assert resolve(" {{ $.steps[0].body.tags }} ", STEPS) == ["a", "b"]
+
+
+def test_bindings_inside_text_and_nested_values_are_substituted():
+    value = {"owner": "user-{{$.steps[0].body.id}}", "ids": ["{{$.steps[1].body.items[0].id}}"]}
+    assert resolve(value, STEPS) == {"owner": "user-42", "ids": ["x1"]}
+
+
+def test_resolve_request_builds_request_details():
+    request = resolve_request(
+        template(
+            method="PUT",
+            payload_json='{"name": "{{$.steps[0].body.name}}", "age": 36}',
+            parameters_json='{"page": "{{$.steps[1].body.next-page}}"}',
+            headers_json='{"X-Trace": "t-{{$.steps[0].status}}"}',
+        ),
+        STEPS,
+    )
+    assert request == {
+        "method": "PUT",
+        "path": "/users/42",
+        "payload": {"name": "Ada", "age": 36},
+        "parameters": {"page": 2},
+        "headers": {"X-Trace": "t-201"},
+    }
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"resolved_path": "/users/{{$.steps[3].body.id}}"},
+        {"resolved_path": "/users/{user_id}"},
+        {"payload_json": "{not json"},
+    ],
+)
+def test_resolve_request_raises_when_it_cannot_resolve(overrides):
+    with pytest.raises(UnresolvedBinding):
+        resolve_request(template(**overrides), STEPS)
+
+
+class FakeRequestGenerator:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, step, context, openapi_spec, usage, files=None, timeout=None):
+        self.calls.append(step)
+        return {"method": step.method, "path": "/users/7", "payload": None}
+
+
+@pytest.fixture
+def ninja():
+    ninja = APINinja({"paths": {}}, "http://api.test")
+    ninja.request_generator_agent = FakeRequestGenerator()
+    return ninja
+
+
+def test_generate_request_resolves_templates_without_a_model_call(ninja):
+    details, _ = ninja.generate_request(template(), STEPS, "", Deadlines(Timeouts()), usage=None)
+    assert details["path"] == "/users/42"
+    assert ninja.request_generator_agent.calls == []
+
+
+def test_generate_request_falls_back_to_the_generator_on_unresolved_bindings(ninja):
+    call = template(resolved_path="/users/{{$.steps[9].body.id}}")
+    details, _ = ninja.generate_request(call, STEPS, "", Deadlines(Timeouts()), usage=None)
+    assert details["path"] == "/users/7"
+    assert ninja.request_generator_agent.calls == [call]
+
+
+def test_generate_request_uses_the_generator_for_plain_calls(ninja):
+    call = ApiCallModel(**template().model_dump(include=set(ApiCallModel.model_fields)))
+    ninja.generate_request(call, [], "", Deadlines(Timeouts()), usage=None)
+    assert ninja.request_generator_agent.calls == [call]
@@ -0,0 +1,102 @@
+import pytest
+
+from api_ninja import timeouts as timeouts_module
+from api_ninja.timeouts import Deadlines, PhaseTimeout, Timeouts
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(timeouts_module.time, "monotonic", clock)
+    return clock
+
+
+def test_parse_sets_and_lifts_limits():
+    parsed = Timeouts.parse(["http=5", "LLM = 60", "step=none", "flow=0", "run=90.5"])
+    assert parsed == Timeouts(http=5.0, llm=60.0, step=None, flow=None, run=90.5)
+
+
+@pytest.mark.parametrize("spec", ["http=-1", "llm=-0.5", "step=nan", "flow=soon", "run"])
+def test_parse_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        Timeouts.parse([spec])
+
+
+def test_parse_rejects_unknown_phases():
+    with pytest.raises(ValueError, match="expected one of"):
+        Timeouts.parse(["connect=5"])
+
+
+def test_call_gets_its_own_limit_without_enclosing_deadlines(clock):
+    deadlines = Deadlines(Timeouts(http=5, llm=60))
+    assert deadlines.budget("http", "GET /users") == (5, "http")
+    assert deadlines.budget("llm", "planning") == (60, "llm")
+
+
+def test_call_gets_what_is_left_of_the_tightest_enclosing_deadline(clock):
+    deadlines = Deadlines(Timeouts(http=30, step=20, flow=100))
+    deadlines.open("flow")
+    deadlines.open("step")
+    clock.now += 15
+    assert deadlines.budget("http", "GET /users") == (5, "step")
+
+    deadlines.close("step")
+    assert deadlines.budget("http", "GET /users") == (30, "http")
+    clock.now += 80
+    assert deadlines.budget("http", "GET /users") == (5, "flow")
+
+
+def test_run_deadline_is_shared_across_flows(clock):
+    timeouts = Timeouts(http=30, run=50)
+    first = Deadlines(timeouts, run_ends_at=clock.now + 50)
+    clock.now += 40
+    second = Deadlines(timeouts, run_ends_at=first._ends["run"])
+    assert second.budget("http", "GET /users") == (10, "run")
+
+
+def test_passed_deadline_raises_phase_timeout(clock):
+    deadlines = Deadlines(Timeouts(step=10))
+    deadlines.open("step")
+    clock.now += 10
+    with pytest.raises(PhaseTimeout) as raised:
+        deadlines.budget("llm", "request generation")
+    assert raised.value.phase == "step"
+    assert raised.value.seconds == 10
+    assert str(raised.value) == "request generation exceeded the step timeout (10s)"
+
+
+def test_unlimited_scopes_are_not_tracked(clock):
+    deadlines = Deadlines(Timeouts(http=None, llm=None))
+    deadlines.open("step")
+    deadlines.open("flow")
+    clock.now += 10_000
+    assert deadlines.budget("http", "GET /users") == (None, "http")
+
+
+def test_fork_drops_the_scope_until_it_is_opened(clock):
+    deadlines = Deadlines(Timeouts(step=10, flow=100))
+    deadlines.open("flow")
+    deadlines.open("step")
+    clock.now += 8
+
+    forked = deadlines.fork("step")
+    # Started early, the next step's work is only bound by the flow deadline.
+    assert forked.budget("llm", "next request") == (92, "flow")
+    # The original step deadline is untouched.
+    assert deadlines.budget("llm", "evaluation") == (2, "step")
+
+    clock.now += 5
+    with pytest.raises(PhaseTimeout):
+        deadlines.budget("llm", "evaluation")
+    forked.open("step")
+    assert forked.budget("llm", "next request") == (10, "step")
+    clock.now += 4
+    assert forked.budget("llm", "next request") == (6, "step")
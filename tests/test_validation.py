@@ -0,0 +1,126 @@
+import yaml
+
+from api_ninja.validation import SchemaCompiler, ValidatorRegistry
+
+SPEC = {
+    "paths": {},
+    "components": {
+        "schemas": {
+            "Node": {
+                "type": "object",
+                "required": ["name"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "children": {"type": "array", "items": {"$ref": "#/components/schemas/Node"}},
+                },
+            },
+            "Cat": {
+                "type": "object",
+                "required": ["kind", "lives"],
+                "properties": {"kind": {"type": "string"}, "lives": {"type": "integer"}},
+            },
+            "Dog": {
+                "type": "object",
+                "required": ["kind", "good"],
+                "properties": {"kind": {"type": "string"}, "good": {"type": "boolean"}},
+            },
+        }
+    },
+}
+
+
+def errors_for(schema, value, spec=SPEC):
+    errors = []
+    SchemaCompiler(spec).compile(schema)(value, "", errors)
+    return errors
+
+
+def test_ref_resolves_to_the_component_schema():
+    assert errors_for({"$ref": "#/components/schemas/Node"}, {"name": "root"}) == []
+    assert errors_for({"$ref": "#/components/schemas/Node"}, {"name": 1}) == [
+        "/name: expected string, got int"
+    ]
+
+
+def test_recursive_ref_validates_nested_levels():
+    tree = {"name": "a", "children": [{"name": "b", "children": [{"name": "c"}]}]}
+    assert errors_for({"$ref": "#/components/schemas/Node"}, tree) == []
+
+    tree["children"][0]["children"][0] = {"children": []}
+    errors = errors_for({"$ref": "#/components/schemas/Node"}, tree)
+    assert len(errors) == 1
+    assert errors[0].startswith("/children/0/children/0")
+    assert "name" in errors[0]
+
+
+def test_nullable_enum_accepts_null_and_listed_values_only():
+    schema = {"type": "string", "enum": ["on", "off"], "nullable": True}
+    assert errors_for(schema, None) == []
+    assert errors_for(schema, "on") == []
+    assert errors_for(schema, "dim") == ["/: 'dim' is not one of ['on', 'off']"]
+
+
+def test_enum_without_nullable_rejects_null():
+    schema = {"type": "string", "enum": ["on", "off"]}
+    assert errors_for(schema, None) != []
+
+
+def test_discriminator_picks_the_branch_by_property():
+    schema = {
+        "oneOf": [{"$ref": "#/components/schemas/Cat"}, {"$ref": "#/components/schemas/Dog"}],
+        "discriminator": {"propertyName": "kind"},
+    }
+    assert errors_for(schema, {"kind": "Cat", "lives": 9}) == []
+    assert errors_for(schema, {"kind": "Dog", "good": True}) == []
+    # Only the selected branch is reported, not every oneOf alternative.
+    assert errors_for(schema, {"kind": "Dog", "lives": 9}) == [
+        "/: missing required property 'good'"
+    ]
+    assert errors_for(schema, {"kind": "Fish"}) == ["/: unknown kind 'Fish'"]
+    assert errors_for(schema, {"lives": 9}) == ["/: missing discriminator property 'kind'"]
+
+
+def test_discriminator_mapping_uses_short_names():
+    schema = {
+        "oneOf": [{"$ref": "#/components/schemas/Cat"}, {"$ref": "#/components/schemas/Dog"}],
+        "discriminator": {"propertyName": "kind", "mapping": {"cat": "Cat", "dog": "Dog"}},
+    }
+    assert errors_for(schema, {"kind": "cat", "lives": 9}) == []
+    assert errors_for(schema, {"kind": "dog", "lives": 9}) == [
+        "/: missing required property 'good'"
+    ]
+
+
+def test_registry_reads_int_response_keys_from_yaml():
+    spec = yaml.safe_load(
+        """
+        paths:
+          /users/{id}:
+            get:
+              responses:
+                200:
+                  content:
+                    application/json:
+                      schema: {type: object, required: [id]}
+                4XX:
+                  content:
+                    application/json:
+                      schema: {type: object, required: [detail]}
+        """
+    )
+    registry = ValidatorRegistry(spec)
+    registry.compile_all()
+    assert registry.validate_response("/users/7", "GET", 200, {"id": 7}) == []
+    assert registry.validate_response("/users/7", "GET", 200, {}) == [
+        "/: missing required property 'id'"
+    ]
+    assert registry.validate_response("/users/7", "GET", 404, {}) == [
+        "/: missing required property 'detail'"
+    ]
+    assert registry.validate_response("/users/7", "GET", 500, {}) is None
+
+
+def test_registry_leaves_the_callers_spec_alone():
+    spec = {"paths": {"/ping": {"get": {"responses": {204: {"description": "No Content"}}}}}}
+    ValidatorRegistry(spec).compile_all()
+    assert list(spec["paths"]["/ping"]["get"]["responses"]) == [204]